@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Payload bundle benchmark
+Installing from a payload bundle appended to the installer, against the
+PyInstaller one-file pattern of unpacking every resource to a temp dir at
+launch and then copying it into place. Also times opening the bundle, which
+should only read its trailer and index.
+
+Usage: python benchmarks/bench_bundle.py [--size-mb 64] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bundle import Bundle, build_bundle  # noqa: E402
+from copy_engine import CopyEngine  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def best_of(rounds, func):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        src = tmp / "resource"
+        src.mkdir()
+        # An incompressible exe, a compressible DLL and a small icon
+        (src / "VirtuKey.exe").write_bytes(os.urandom(args.size_mb * MB // 2))
+        (src / "VirtualDesktopAccessor.dll").write_bytes(b"VirtualDesktopAccessor " * (args.size_mb * MB // 46))
+        (src / "Icon.png").write_bytes(os.urandom(64 * 1024))
+        files = {path.name: path for path in src.iterdir()}
+
+        exe = tmp / "setup.exe"
+        exe.write_bytes(os.urandom(8 * MB))
+        build_bundle(files, exe, append=True)
+        install_dir = tmp / "VirtuKey"
+        unpack_dir = tmp / "_MEI"
+
+        def unpack_then_copy():
+            shutil.rmtree(install_dir, ignore_errors=True)
+            shutil.rmtree(unpack_dir, ignore_errors=True)
+            unpack_dir.mkdir()
+            bundle = Bundle.open(exe)
+            for name in bundle.names():
+                bundle.extract(name, unpack_dir / name)
+            CopyEngine(hash_files=True).copy([(unpack_dir / name, install_dir / name) for name in files])
+
+        def stream():
+            shutil.rmtree(install_dir, ignore_errors=True)
+            bundle = Bundle.open(exe)
+            engine = CopyEngine(hash_files=True)
+            engine.copy([(bundle.entry(name), install_dir / name) for name in files])
+            assert all(engine.digests[install_dir / name] == bundle.entry(name).sha256 for name in files)
+
+        open_time = best_of(args.rounds, lambda: Bundle.open(exe))
+        old_time = best_of(args.rounds, unpack_then_copy)
+        new_time = best_of(args.rounds, stream)
+        written_old = sum(p.stat().st_size for p in files.values()) * 2
+        written_new = written_old // 2
+
+    print(f"payload: {args.size_mb} MB, bundle appended to an 8 MB exe, {os.cpu_count()} CPU(s)")
+    print(f"{'open bundle (index only)':<30} {open_time * 1000:9.3f} ms")
+    print(f"{'unpack to temp, then copy':<30} {old_time * 1000:9.1f} ms  {written_old / MB:6.1f} MB written")
+    print(f"{'stream from bundle':<30} {new_time * 1000:9.1f} ms  {written_new / MB:6.1f} MB written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Control channel benchmark
+Starts a stand-in VirtuKey that runs the reference ControlServer and takes
+--exit-ms to shut down, then measures the downtime window of the old
+terminate-and-poll loop against a "shutdown" request on the control channel.
+
+Usage: python benchmarks/bench_control_channel.py [--exit-ms 30] [--rounds 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from control_channel import ControlClient  # noqa: E402
+
+STAND_IN = """
+import os, signal, sys, time
+sys.path.insert(0, sys.argv[3])
+from control_channel import ControlServer
+delay = float(sys.argv[1])
+def stop(*_):
+    time.sleep(delay)
+    os._exit(0)  # the OS closes the held connection: that is the acknowledgement
+signal.signal(signal.SIGTERM, stop)
+ControlServer(control_file=sys.argv[2], on_shutdown=stop).start()
+print("ready", flush=True)
+while True:
+    time.sleep(1)
+"""
+
+
+def spawn(exit_ms, control_file):
+    proc = subprocess.Popen([sys.executable, "-c", STAND_IN, str(exit_ms / 1000.0), control_file, str(ROOT)],
+                            stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()
+    return proc
+
+
+def old_shutdown(proc):
+    """terminate() followed by the 100 ms poll loop"""
+    proc.terminate()
+    for _ in range(50):
+        if proc.poll() is not None:
+            return
+        time.sleep(0.1)
+    proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--exit-ms", type=float, default=30)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    old_times, new_times = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        control_file = os.path.join(tmp, "VirtuKey.ctl")
+        for _ in range(args.rounds):
+            proc = spawn(args.exit_ms, control_file)
+            start = time.perf_counter()
+            old_shutdown(proc)
+            old_times.append(time.perf_counter() - start)
+
+            proc = spawn(args.exit_ms, control_file)
+            start = time.perf_counter()
+            ControlClient(control_file).shutdown()
+            new_times.append(time.perf_counter() - start)
+            proc.wait()
+
+    print(f"stand-in takes {args.exit_ms:g} ms to exit, best of {args.rounds}")
+    print(f"  terminate + 100 ms polling   {min(old_times) * 1000:8.1f} ms")
+    print(f"  control channel shutdown     {min(new_times) * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
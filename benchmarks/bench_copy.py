@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Copy engine benchmark
+Compares the old sequential shutil.copy2 loop with CopyEngine at several
+worker counts, over payload shapes from a handful of files to hundreds.
+
+Usage: python benchmarks/bench_copy.py [--dir /path/on/target/fs] [--workers 1,4,8]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from copy_engine import CopyEngine, format_bytes  # noqa: E402
+
+# (label, file count, bytes per file)
+SCENARIOS = [
+    ("3 files x 2 MB", 3, 2 * 1024 * 1024),
+    ("8 files x 32 MB", 8, 32 * 1024 * 1024),
+    ("300 files x 64 KB", 300, 64 * 1024),
+    ("800 files x 4 KB", 800, 4 * 1024),
+]
+
+
+def make_payload(root, count, size):
+    source = Path(root) / "source"
+    source.mkdir()
+    block = os.urandom(min(size, 1024 * 1024))
+    for i in range(count):
+        with open(source / f"file{i:04d}.bin", 'wb') as f:
+            remaining = size
+            while remaining:
+                n = min(remaining, len(block))
+                f.write(block[:n])
+                remaining -= n
+    return source
+
+
+def sequential_copy(pairs):
+    """The original perform_installation loop"""
+    for source, dest in pairs:
+        shutil.copy2(source, dest)
+
+
+def timed(label, func, pairs, dest_dir, repeat):
+    best = None
+    for _ in range(repeat):
+        shutil.rmtree(dest_dir, ignore_errors=True)
+        dest_dir.mkdir()
+        start = time.perf_counter()
+        func(pairs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dir", default=None, help="directory on the filesystem to benchmark")
+    parser.add_argument("--workers", default="1,4,8", help="comma separated worker counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    for label, count, size in SCENARIOS:
+        with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+            source = make_payload(tmp, count, size)
+            dest_dir = Path(tmp) / "dest"
+            pairs = [(p, dest_dir / p.name) for p in sorted(source.iterdir())]
+            total = count * size
+
+            base = timed("sequential", sequential_copy, pairs, dest_dir, args.repeat)
+            print(f"{label} ({format_bytes(total)})")
+            print(f"  sequential copy2      {base * 1000:8.1f} ms  {format_bytes(total / base)}/s")
+            for workers in worker_counts:
+                engine = CopyEngine(max_workers=workers, on_progress=lambda p: None)
+                elapsed = timed(f"engine x{workers}", engine.copy, pairs, dest_dir, args.repeat)
+                print(f"  CopyEngine x{workers:<2}        {elapsed * 1000:8.1f} ms  "
+                      f"{format_bytes(total / elapsed)}/s  ({base / elapsed:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
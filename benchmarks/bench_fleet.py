@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Fleet deployment benchmark
+Installs a synthetic payload into --profiles temporary user profiles one
+after another (the old one-installer-per-profile loop) and with run_fleet
+at increasing worker counts, reporting the speedup of each.
+
+Usage: python benchmarks/bench_fleet.py [--profiles 32] [--payload-mb 8] [--jobs 1,2,4,8]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fleet  # noqa: E402
+from install_core import PAYLOAD_FILES  # noqa: E402
+
+
+def make_payload(root, total_mb):
+    payload = Path(root) / "payload"
+    payload.mkdir()
+    sizes = [int(total_mb * 1024 * 1024 * share) for share in (0.7, 0.25, 0.05)]
+    for name, size in zip(PAYLOAD_FILES, sizes):
+        (payload / name).write_bytes(os.urandom(size))
+    return payload
+
+
+def make_targets(root, count, payload):
+    plan = {"payload_dir": str(payload),
+            "options": {"desktop_shortcut": False, "startmenu_shortcut": False},
+            "targets": [{"profile": str(Path(root) / "users" / f"user{i:03d}")} for i in range(count)]}
+    targets, _ = fleet.parse_plan(plan)
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=32)
+    parser.add_argument("--payload-mb", type=float, default=8)
+    parser.add_argument("--jobs", default="1,2,4,8")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = make_payload(tmp, args.payload_mb)
+        targets = make_targets(tmp, args.profiles, payload)
+
+        def reset():
+            shutil.rmtree(Path(tmp) / "users", ignore_errors=True)
+            if hasattr(os, "sync"):
+                os.sync()
+
+        reset()
+        start = time.perf_counter()
+        sequential = [fleet.run_target(t) for t in targets]
+        baseline = time.perf_counter() - start
+        assert all(r["status"] == fleet.STATUS_OK for r in sequential), sequential[0]
+
+        print(f"{args.profiles} profiles x {args.payload_mb:g} MB payload, {os.cpu_count()} CPUs")
+        print(f"  sequential (one profile at a time)  {baseline:7.2f} s")
+        for jobs in [int(j) for j in args.jobs.split(",")]:
+            reset()
+            report = fleet.run_fleet(targets, jobs)
+            if not report.ok:
+                print(report.summary())
+                return 1
+            print(f"  run_fleet, {jobs:2d} workers               {report.elapsed:7.2f} s  "
+                  f"({baseline / report.elapsed:4.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
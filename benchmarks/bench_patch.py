@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Binary patch upgrade benchmark
+Upgrades an installed file to a new build that differs by a number of
+small scattered edits (like a rebuilt VirtuKey.exe), once by copying the
+full file and once by applying a .vkpatch. Reports what an upgrade has to
+ship and write in each case, and how long each takes.
+
+Usage: python benchmarks/bench_patch.py [--size-mb 4] [--edits 200] [--rounds 3]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from patch import apply_patch, make_patch  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def best_of(rounds, setup, func):
+    times = []
+    for _ in range(rounds):
+        setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=4)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        old = bytearray(rng.randbytes(args.size_mb * MB))
+        new = bytearray(old)
+        for _ in range(args.edits):
+            pos = rng.randrange(len(new) - 8)
+            new[pos:pos + 4] = rng.randbytes(4)  # e.g. a relocated address
+        (tmp / "old.exe").write_bytes(old)
+        (tmp / "new.exe").write_bytes(new)
+
+        start = time.perf_counter()
+        patch_size = make_patch(tmp / "old.exe", tmp / "new.exe", tmp / "new.exe.vkpatch")
+        make_time = time.perf_counter() - start
+
+        installed = tmp / "installed.exe"
+
+        def reset():
+            shutil.copyfile(tmp / "old.exe", installed)
+
+        copy_time = best_of(args.rounds, reset, lambda: shutil.copyfile(tmp / "new.exe", installed))
+        patch_time = best_of(args.rounds, reset,
+                             lambda: apply_patch(tmp / "new.exe.vkpatch", installed, installed))
+        assert installed.read_bytes() == new
+
+    size = len(new)
+    print(f"file: {args.size_mb} MB, {args.edits} edits, {os.cpu_count()} CPU(s); patch made in {make_time:.2f} s")
+    print(f"{'':<12} {'shipped':>12} {'read':>12} {'written':>12} {'time':>10}")
+    print(f"{'full copy':<12} {size:>12,} {size:>12,} {size:>12,} {copy_time * 1000:7.1f} ms")
+    print(f"{'patch':<12} {patch_size:>12,} {size + patch_size:>12,} {size:>12,} {patch_time * 1000:7.1f} ms")
+    print(f"patch is {size / patch_size:.0f}x smaller than the file")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
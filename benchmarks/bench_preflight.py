@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Preflight benchmark
+Compares what clicking Install costs with the old inline check
+(validate_install_path in the worker) against the preflight engine, whose
+probes were started when the wizard opened. Also times a path change,
+which should re-run only the two path probes.
+
+Usage: python benchmarks/bench_preflight.py [--rounds 20] [--read-ms 50]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import install_core  # noqa: E402
+from preflight import Preflight, PATH_PROBES, SYSTEM_PROBES  # noqa: E402
+
+
+def ms(seconds):
+    return f"{seconds * 1000:8.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--read-ms", type=float, default=50,
+                        help="time the user spends on the wizard before clicking Install")
+    args = parser.parse_args()
+
+    inline, at_click, full, path_change = [], [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.rounds):
+            target = Path(tmp) / f"round{i}" / "VirtuKey"
+
+            start = time.perf_counter()
+            install_core.validate_install_path(target)
+            inline.append(time.perf_counter() - start)
+
+            preflight = Preflight()
+            start = time.perf_counter()
+            preflight.start(str(target))
+            preflight.results()
+            full.append(time.perf_counter() - start)
+            preflight.shutdown()
+
+            preflight = Preflight()
+            preflight.start(str(target.with_name("Other")))
+            time.sleep(args.read_ms / 1000.0)
+            start = time.perf_counter()
+            preflight.errors()
+            at_click.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            preflight.set_install_path(str(target))
+            preflight.errors()
+            path_change.append(time.perf_counter() - start)
+            assert len(preflight.futures) == len(SYSTEM_PROBES) + 2 * len(PATH_PROBES)
+            preflight.shutdown()
+
+    print(f"{'inline check at click (old)':<36} {ms(statistics.median(inline))}")
+    print(f"{'all probes, concurrent':<36} {ms(statistics.median(full))}")
+    print(f"{'preflight at click':<36} {ms(statistics.median(at_click))}")
+    print(f"{'path change (path probes only)':<36} {ms(statistics.median(path_change))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
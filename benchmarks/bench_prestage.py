@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Pre-staging benchmark
+Time from the Install click to the files being in place, with the payload
+copied after the click (old) and pre-staged while the user was reading the
+wizard. Shortcuts, registry and the manifest are left out: both paths do
+them the same way.
+
+Usage: python benchmarks/bench_prestage.py [--size-mb 64] [--files 3] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import install_core  # noqa: E402
+from copy_engine import CopyEngine  # noqa: E402
+from prestage import Prestager  # noqa: E402
+from staging import adopt_staging  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = Path(tmp) / "payload"
+        payload.mkdir()
+        install_core.PAYLOAD_FILES = [f"file{i}.bin" for i in range(args.files)]
+        for name in install_core.PAYLOAD_FILES:
+            (payload / name).write_bytes(os.urandom(args.size_mb * MB))
+        sources = install_core.payload_sources(payload)
+        target = Path(tmp) / "apps" / "VirtuKey"
+
+        copy_after, prestaged = [], []
+        for _ in range(args.rounds):
+            shutil.rmtree(target.parent, ignore_errors=True)
+            start = time.perf_counter()
+            target.mkdir(parents=True)
+            CopyEngine().copy([(source, target / name) for name, source in sources.items()])
+            copy_after.append(time.perf_counter() - start)
+
+            shutil.rmtree(target.parent, ignore_errors=True)
+            prestager = Prestager(payload_dir=payload)
+            prestager.stage(target)
+            prestager.job.join()  # the user is still reading the license
+            start = time.perf_counter()
+            adopt_staging(prestager.take(target), target)
+            prestaged.append(time.perf_counter() - start)
+
+    print(f"payload: {args.files} x {args.size_mb} MB")
+    print(f"{'copy after the click (old)':<30} {min(copy_after) * 1000:9.2f} ms")
+    print(f"{'pre-staged, rename only':<30} {min(prestaged) * 1000:9.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
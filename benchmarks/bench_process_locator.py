@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Process locator benchmark
+Runs each locator tier against a synthetic process table (default 10,000
+entries) and compares them with the original process_iter(['pid', 'name', 'exe'])
+loop. Fetching exe is simulated as expensive and often access-denied.
+
+Usage: python benchmarks/bench_process_locator.py [--processes 10000] [--exe-cost-us 40]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from processes import ProcessLocator, parse_tasklist_csv  # noqa: E402
+
+
+class AccessDenied(Exception):
+    pass
+
+
+class FakeProcess:
+    def __init__(self, pid, name):
+        self.pid = pid
+        self._name = name
+        self.info = {}
+
+
+class FakeProcessTable:
+    """psutil.process_iter stand-in: attrs are fetched eagerly, exe is slow"""
+
+    def __init__(self, count, exe_cost_us, target_index):
+        self.procs = [FakeProcess(4 + i * 4, f"svchost{i % 50}.exe") for i in range(count)]
+        if target_index is not None:
+            self.procs[target_index]._name = "VirtuKey.exe"
+        self.exe_cost = exe_cost_us / 1e6
+
+    def _exe(self, proc):
+        deadline = time.perf_counter() + self.exe_cost
+        while time.perf_counter() < deadline:
+            pass
+        if proc.pid % 3 == 0:
+            raise AccessDenied()
+        return f"C:\\Windows\\System32\\{proc._name}"
+
+    def process_iter(self, attrs):
+        for proc in self.procs:
+            info = {}
+            for attr in attrs:
+                if attr == 'pid':
+                    info['pid'] = proc.pid
+                elif attr == 'name':
+                    info['name'] = proc._name
+                elif attr == 'exe':
+                    try:
+                        info['exe'] = self._exe(proc)
+                    except AccessDenied:
+                        info['exe'] = None
+            proc.info = info
+            yield proc
+
+    def name_of(self, pid):
+        for proc in self.procs:
+            if proc.pid == pid:
+                return proc._name
+        return None
+
+    def tasklist_csv(self):
+        lines = ['"Image Name","PID","Session Name","Session#","Mem Usage"']
+        for proc in self.procs:
+            lines.append(f'"{proc._name}","{proc.pid}","Console","1","10,240 K"')
+        return "\n".join(lines) + "\n"
+
+
+def original_scan(table):
+    """The loop is_virtukey_running used before the locator"""
+    for proc in table.process_iter(['pid', 'name', 'exe']):
+        if proc.info['name'] and 'VirtuKey.exe' in proc.info['name']:
+            return True, proc.info['pid']
+    return False, None
+
+
+def timed(func, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=10000)
+    parser.add_argument("--exe-cost-us", type=float, default=40.0)
+    args = parser.parse_args()
+
+    # Worst case for a scan: VirtuKey is the last entry in the table
+    table = FakeProcessTable(args.processes, args.exe_cost_us, args.processes - 1)
+    target_pid = table.procs[-1].pid
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pid_file = os.path.join(tmp, "VirtuKey.pid")
+        with open(pid_file, "w") as f:
+            f.write(str(target_pid))
+
+        locator = ProcessLocator(pid_file=pid_file, process_iter=table.process_iter,
+                                 name_of=lambda pid: "VirtuKey.exe" if pid == target_pid else None)
+        csv_text = table.tasklist_csv()
+
+        rows = [
+            ("original scan (pid, name, exe)", lambda: original_scan(table)),
+            ("tier 1: PID file", locator.from_pid_file),
+            ("tier 2: name-only scan", locator.scan),
+            (f"tier 3: parse {args.processes}-row tasklist CSV", lambda: parse_tasklist_csv(csv_text)),
+        ]
+        print(f"{args.processes} processes, exe fetch {args.exe_cost_us:g} us, VirtuKey last")
+        baseline = None
+        for label, func in rows:
+            elapsed, result = timed(func)
+            baseline = baseline or elapsed
+            print(f"  {label:<40} {elapsed * 1000:9.3f} ms  ({baseline / elapsed:7.1f}x)  -> {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Repair benchmark
+Damages an installation in a few typical ways (nothing, one deleted file,
+the DLL overwritten, every file gone) and fixes it with a repair, a
+staged reinstall and a clean reinstall (remove everything, copy again).
+Reports the time and the bytes read and written by each; a repair's I/O
+should follow the damage, a clean reinstall's the payload size. The I/O
+columns come from /proc/self/io and show "-" where that isn't available.
+
+Usage: python benchmarks/bench_repair.py [--size-mb 64] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import install_core as core  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def io_counters():
+    """(bytes read, bytes written) by this process so far, or None"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def damage_none(install_dir):
+    pass
+
+
+def damage_icon(install_dir):
+    (install_dir / "Icon.png").unlink()
+
+
+def damage_dll(install_dir):
+    path = install_dir / "VirtualDesktopAccessor.dll"
+    with open(path, "r+b") as f:
+        f.write(b"quarantined")
+
+
+def damage_all(install_dir):
+    for name in core.PAYLOAD_FILES:
+        (install_dir / name).unlink()
+
+
+SCENARIOS = [("intact", damage_none), ("Icon.png deleted", damage_icon),
+             ("DLL overwritten", damage_dll), ("every file deleted", damage_all)]
+
+
+def measure(rounds, prepare, fix):
+    """Best time over rounds, with the I/O of that round"""
+    best = None
+    for _ in range(rounds):
+        prepare()
+        before = io_counters()
+        start = time.perf_counter()
+        fix()
+        seconds = time.perf_counter() - start
+        after = io_counters()
+        io = None if before is None or after is None else (after[0] - before[0], after[1] - before[1])
+        if best is None or seconds < best[0]:
+            best = (seconds, io)
+    return best
+
+
+def format_io(io):
+    if io is None:
+        return f"{'-':>10} {'-':>10}"
+    return f"{io[0] / MB:7.1f} MB {io[1] / MB:7.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        payload = tmp / "payload"
+        payload.mkdir()
+        sizes = {"VirtuKey.exe": args.size_mb * MB // 2, "VirtualDesktopAccessor.dll": args.size_mb * MB // 2,
+                 "Icon.png": 64 * 1024}
+        for name, size in sizes.items():
+            (payload / name).write_bytes(os.urandom(size))
+        profile = tmp / "profile"
+        profile.mkdir()
+        install_dir = profile / "VirtuKey"
+
+        def options():
+            return core.InstallOptions(install_dir, create_desktop_shortcut=False, create_startmenu_shortcut=False,
+                                       profile_dir=profile, payload_dir=payload)
+
+        def fresh_install(damage):
+            def prepare():
+                shutil.rmtree(install_dir, ignore_errors=True)
+                core.perform_installation(options())
+                damage(install_dir)
+            return prepare
+
+        print(f"payload: {sum(sizes.values()) / MB:.1f} MB, best of {args.rounds}")
+        fixes = [("repair", lambda: core.perform_repair(options())),
+                 ("staged", lambda: core.perform_reinstallation(options())),
+                 ("clean", lambda: core.perform_reinstallation(options(), mode=core.REINSTALL_CLEAN))]
+        print(f"{'damage':<20} {'fix':<8} {'time':>11} {'read':>10} {'written':>10}")
+        for label, damage in SCENARIOS:
+            for fix_label, fix in fixes:
+                seconds, io = measure(args.rounds, fresh_install(damage), fix)
+                print(f"{label:<20} {fix_label:<8} {seconds * 1000:8.1f} ms {format_io(io)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Shell host benchmark
+Runs the same short scripts three ways: a new shell process for each (how
+the installer used to call PowerShell), one at a time through the
+persistent shell host, and all in one batch through it. Uses PowerShell
+where it is installed and sh (the host's stand-in) everywhere, and prints
+the runner's per-command metrics for the batched run.
+
+Usage: python benchmarks/bench_shell_host.py [--commands 50] [--rounds 3]
+"""
+
+import argparse
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shellhost import DIALECTS, SHELL_POWERSHELL, SHELL_SH, CommandMetrics, CommandRunner  # noqa: E402
+
+SCRIPTS = {SHELL_SH: "echo VirtuKey", SHELL_POWERSHELL: "Write-Output VirtuKey"}
+ONE_SHOT = {SHELL_SH: ["sh", "-c"], SHELL_POWERSHELL: ["powershell", "-NoProfile", "-NonInteractive", "-Command"]}
+
+
+def best_of(rounds, func):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    shells = [shell for shell in (SHELL_POWERSHELL, SHELL_SH) if shutil.which(DIALECTS[shell].argv[0])]
+    print(f"{args.commands} commands per run, best of {args.rounds}")
+    print(f"{'shell':<12} {'process each':>14} {'host, one by one':>18} {'host, batched':>15}")
+    for shell in shells:
+        script = SCRIPTS[shell]
+        runner = CommandRunner()
+        runner.script(script, shell=shell)  # start the host outside the timings
+        scripts = [(f"command{i}", script) for i in range(args.commands)]
+
+        def one_shot():
+            for _ in range(args.commands):
+                subprocess.run(ONE_SHOT[shell] + [script], capture_output=True, check=True)
+
+        def one_by_one():
+            for name, text in scripts:
+                runner.script(text, name, shell).check()
+
+        def batched():
+            assert all(result.ok for result in runner.batch(scripts, shell))
+
+        times = [best_of(args.rounds, func) for func in (one_shot, one_by_one, batched)]
+        print(f"{shell:<12}" + "".join(f"{t * 1000:{width - 3}.1f} ms" for t, width in zip(times, (15, 19, 16))))
+        runner.metrics = CommandMetrics()  # just the batch below
+        runner.batch(scripts, shell)
+        stats = runner.metrics.to_dict()["commands"]
+        slowest = max(stats.items(), key=lambda item: item[1]["max"])
+        print(f"{'':<12} batch metrics: {len(stats)} commands, {sum(s['failures'] for s in stats.values())} "
+              f"failed, slowest {slowest[0]} {slowest[1]['max'] * 1000:.2f} ms")
+        runner.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
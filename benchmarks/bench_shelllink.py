@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Shell link writer benchmark
+Times in-process .lnk generation and round-trips every link through the reader.
+On Windows, --powershell also times the old one-process-per-shortcut path.
+
+Usage: python benchmarks/bench_shelllink.py [--count 10000] [--powershell]
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shelllink import ShellLink  # noqa: E402
+
+INSTALL_DIR = r"C:\Users\benchmark\AppData\Local\VirtuKey"
+
+
+def sample_link(i):
+    exe = INSTALL_DIR + r"\VirtuKey.exe"
+    return ShellLink(exe, arguments=f"--profile {i}", working_dir=INSTALL_DIR,
+                     description="VirtuKey - Virtual Desktop Manager", icon_location=exe)
+
+
+def bench_native(count):
+    links = [sample_link(i) for i in range(count)]
+    start = time.perf_counter()
+    blobs = [link.to_bytes() for link in links]
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = [ShellLink.from_bytes(blob) for blob in blobs]
+    read_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(links, parsed) if a != b)
+    return write_time, read_time, mismatches
+
+
+def bench_powershell(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for i in range(count):
+            script = (f'$s = (New-Object -comObject WScript.Shell).CreateShortcut("{tmp}\\bench{i}.lnk"); '
+                      f'$s.TargetPath = "{INSTALL_DIR}\\VirtuKey.exe"; $s.Save()')
+            subprocess.run(["powershell", "-Command", script], check=True, capture_output=True)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--powershell", action="store_true",
+                        help="also time PowerShell shortcut creation (Windows only)")
+    args = parser.parse_args()
+
+    write_time, read_time, mismatches = bench_native(args.count)
+    print(f"native write: {args.count} links in {write_time * 1000:.1f} ms "
+          f"({write_time / args.count * 1e6:.1f} us/link)")
+    print(f"native read:  {args.count} links in {read_time * 1000:.1f} ms "
+          f"({read_time / args.count * 1e6:.1f} us/link)")
+
+    if args.powershell:
+        ps_count = min(args.count, 3)
+        ps_time = bench_powershell(ps_count)
+        print(f"powershell:   {ps_count} links in {ps_time * 1000:.1f} ms "
+              f"({ps_time / ps_count * 1000:.1f} ms/link)")
+
+    if mismatches:
+        print(f"FAIL: {mismatches} links did not round-trip")
+        return 1
+    print("OK: all links round-tripped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
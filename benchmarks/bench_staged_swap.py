@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Reinstall downtime benchmark
+Upgrades every payload file and measures how long the install directory is
+unusable: the whole remove-and-copy for a clean reinstall, against only
+the directory renames for a staged reinstall.
+
+Usage: python benchmarks/bench_staged_swap.py [--files 3] [--sizes-mb 1,16,256]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from copy_engine import CopyEngine  # noqa: E402
+from staging import build_staging, verify_staging, staging_paths, swap_directories, discard_tree  # noqa: E402
+
+
+def write_payload(source, count, size):
+    source.mkdir(exist_ok=True)
+    for i in range(count):
+        (source / f"file{i:04d}.bin").write_bytes(os.urandom(size))
+    return {p.name: p for p in source.iterdir()}
+
+
+def sync():
+    if hasattr(os, "sync"):
+        os.sync()
+
+
+def clean_downtime(sources, install_dir):
+    start = time.perf_counter()
+    shutil.rmtree(install_dir, ignore_errors=True)
+    install_dir.mkdir()
+    CopyEngine().copy([(src, install_dir / name) for name, src in sources.items()])
+    return time.perf_counter() - start, time.perf_counter() - start
+
+
+def staged_downtime(sources, install_dir):
+    staging_dir, retired_dir = staging_paths(install_dir)
+    start = time.perf_counter()
+    copied = build_staging(sources, install_dir, staging_dir, CopyEngine())
+    verify_staging(copied)
+    swap_start = time.perf_counter()
+    retired = swap_directories(staging_dir, install_dir, retired_dir)
+    swap_end = time.perf_counter()
+    discard_tree(retired)
+    return time.perf_counter() - start, swap_end - swap_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--sizes-mb", default="1,16,256")
+    args = parser.parse_args()
+
+    print(f"{'payload':>16} {'clean total':>12} {'clean down':>11} {'staged total':>13} {'staged down':>12}")
+    for size_mb in [float(s) for s in args.sizes_mb.split(",")]:
+        size = int(size_mb * 1024 * 1024)
+        with tempfile.TemporaryDirectory() as tmp:
+            install_dir = Path(tmp) / "VirtuKey"
+            sources = write_payload(Path(tmp) / "payload", args.files, size)
+            clean_downtime(sources, install_dir)
+
+            sources = write_payload(Path(tmp) / "payload", args.files, size)
+            sync()
+            clean_total, clean_down = clean_downtime(sources, install_dir)
+
+            sources = write_payload(Path(tmp) / "payload", args.files, size)
+            sync()
+            staged_total, staged_down = staged_downtime(sources, install_dir)
+
+        label = f"{args.files} x {size_mb:g} MB"
+        print(f"{label:>16} {clean_total * 1000:10.1f}ms {clean_down * 1000:9.1f}ms "
+              f"{staged_total * 1000:11.1f}ms {staged_down * 1000:10.3f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
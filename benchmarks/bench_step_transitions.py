@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Wizard step transition timing
+Walks the install wizard Back and Next through the welcome, license,
+options and summary steps, timing each show_step plus the layout pass.
+The first visit builds a page; every later visit must swap a cached page
+in under one frame (16 ms).
+
+Usage: python benchmarks/bench_step_transitions.py [--rounds 20]
+On Linux without a display an Xvfb server is started (see headless.py).
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from headless import ensure_display  # noqa: E402
+
+FRAME_MS = 16.0
+STEPS = [0, 1, 2, 3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    problem = ensure_display()
+    if problem:
+        print(f"SKIPPED: {problem}")
+        return 2
+    try:
+        import installer_gui
+        installer = installer_gui.VirtuKeyInstaller()
+    except Exception as e:
+        print(f"SKIPPED: no Tk display available ({e})")
+        return 2
+    root = installer.root
+    root.withdraw()
+
+    def transition(step):
+        start = time.perf_counter()
+        installer.show_step(step)
+        root.update_idletasks()
+        return (time.perf_counter() - start) * 1000.0
+
+    first = {}
+    cached = []
+    for round_no in range(args.rounds):
+        path = STEPS + STEPS[-2::-1]  # forward to the summary, then back to welcome
+        for step in path:
+            elapsed = transition(step)
+            if step == 1 and hasattr(installer, 'accept_license'):
+                installer.accept_license.set(True)
+            if round_no == 0 and step not in first:
+                first[step] = elapsed
+            else:
+                cached.append(elapsed)
+    root.destroy()
+
+    cached.sort()
+    worst = cached[-1]
+    median = cached[len(cached) // 2]
+    print("first visit (build):  " + ", ".join(f"step {s} {ms:.1f} ms" for s, ms in sorted(first.items())))
+    print(f"cached transitions:   {len(cached)}, median {median:.2f} ms, worst {worst:.2f} ms")
+    if worst >= FRAME_MS:
+        print(f"FAIL: a cached transition took {worst:.1f} ms (budget {FRAME_MS:.0f} ms)")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
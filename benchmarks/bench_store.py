@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Shared content store benchmark
+Installs the payload into one user profile after another, once with a
+private copy per profile and once hard-linked from a shared content store.
+Reports the first and the average later install, and the disk space the
+payload takes across all profiles.
+
+Usage: python benchmarks/bench_store.py [--users 20] [--size-mb 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import install_core as core  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def install_users(base, payload_dir, users, store_dir=None):
+    times = []
+    for i in range(users):
+        profile = base / f"user{i:03d}"
+        profile.mkdir()
+        options = core.InstallOptions(profile / "VirtuKey", create_desktop_shortcut=False,
+                                      create_startmenu_shortcut=False, profile_dir=profile,
+                                      payload_dir=payload_dir, store_dir=store_dir)
+        start = time.perf_counter()
+        core.perform_installation(options)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def disk_usage(*roots):
+    """Bytes on disk, counting every inode once"""
+    seen = set()
+    total = 0
+    for dirpath, _, filenames in (walk for root in roots for walk in os.walk(root)):
+        for name in filenames:
+            st = os.stat(os.path.join(dirpath, name))
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_size
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        payload = tmp / "payload"
+        payload.mkdir()
+        sizes = {"VirtuKey.exe": args.size_mb * MB // 2, "VirtualDesktopAccessor.dll": args.size_mb * MB // 2,
+                 "Icon.png": 64 * 1024}
+        for name, size in sizes.items():
+            (payload / name).write_bytes(os.urandom(size))
+
+        results = []
+        for label, store_dir in (("private copies", None), ("shared store", tmp / "store")):
+            base = tmp / label.replace(" ", "-")
+            base.mkdir()
+            times = install_users(base, payload, args.users, store_dir)
+            usage = disk_usage(base, *([store_dir] if store_dir else []))
+            results.append((label, times, usage))
+
+    print(f"{args.users} users, {sum(sizes.values()) / MB:.1f} MB payload, {os.cpu_count()} CPU(s)")
+    print(f"{'':<16} {'first user':>12} {'later users':>12} {'disk used':>12}")
+    for label, times, usage in results:
+        later = sum(times[1:]) / max(len(times) - 1, 1)
+        print(f"{label:<16} {times[0] * 1000:9.1f} ms {later * 1000:9.1f} ms {usage / MB:9.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
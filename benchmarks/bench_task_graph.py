@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Install step graph benchmark
+Runs the install and uninstall step graphs (see taskgraph.py) once on a
+single worker, i.e. strictly in order as before, and once with every
+independent step in parallel. Writing a shortcut and writing or deleting
+the Run-key value are given a fixed latency (--step-ms, roughly what the
+PowerShell shortcut fallback or a slow registry hive costs on Windows) so
+the overlap shows on any platform; the payload copy is real.
+
+Usage: python benchmarks/bench_task_graph.py [--step-ms 150] [--size-mb 32] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import install_core as core  # noqa: E402
+from copy_engine import CopyEngine  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--step-ms", type=float, default=150.0)
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    delay = args.step_ms / 1000
+
+    def slow_shortcut(shortcut_path, target, *_, **__):
+        time.sleep(delay)
+        Path(shortcut_path).write_text(str(target))
+
+    def slow_startup(install_path, user_sid=None):
+        time.sleep(delay)
+        return [{"hive": "HKCU", "key": core.RUN_KEY_PATH, "name": "VirtuKey", "value": str(install_path)}]
+
+    def slow_settings_removal(user_sid=None):
+        time.sleep(delay)
+
+    core.create_shortcut = slow_shortcut
+    core._write_startup = slow_startup
+    core.remove_user_settings = slow_settings_removal
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        payload = tmp / "payload"
+        payload.mkdir()
+        for name in core.PAYLOAD_FILES:
+            (payload / name).write_bytes(os.urandom(args.size_mb * MB // len(core.PAYLOAD_FILES)))
+        profile = tmp / "profile"
+        install_dir = profile / "VirtuKey"
+        options = core.InstallOptions(install_dir, auto_start=True, remove_settings=True,
+                                      profile_dir=profile, payload_dir=payload)
+        sources = core.payload_sources(payload)
+
+        def install(workers):
+            shutil.rmtree(profile, ignore_errors=True)
+            (profile / "Desktop").mkdir(parents=True)
+            install_dir.mkdir()
+
+            def copy_payload():
+                CopyEngine().copy([(source, install_dir / name) for name, source in sources.items()])
+            graph = core.install_steps(options, payload=copy_payload)
+            graph.max_workers = workers
+            start = time.perf_counter()
+            graph.run()
+            return time.perf_counter() - start, graph
+
+        def uninstall(workers):
+            install(None)
+            graph = core.uninstall_steps(options)
+            graph.max_workers = workers
+            start = time.perf_counter()
+            graph.run()
+            shutil.rmtree(graph.value("entomb"), ignore_errors=True)
+            return time.perf_counter() - start, graph
+
+        print(f"payload: {args.size_mb} MB, shortcut/registry steps: {args.step_ms:.0f} ms each, "
+              f"best of {args.rounds}")
+        print(f"{'graph':<10} {'in order':>12} {'parallel':>12} {'longest step':>14}")
+        for label, run in (("install", install), ("uninstall", uninstall)):
+            times = {}
+            for workers in (1, None):
+                best = None
+                for _ in range(args.rounds):
+                    seconds, graph = run(workers)
+                    if best is None or seconds < best[0]:
+                        best = (seconds, graph)
+                times[workers] = best
+            longest = max(r.elapsed for r in times[None][1].results.values())
+            print(f"{label:<10} {times[1][0] * 1000:9.1f} ms {times[None][0] * 1000:9.1f} ms "
+                  f"{longest * 1000:11.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
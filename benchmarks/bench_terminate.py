@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Termination benchmark
+Starts N stand-in processes that take --exit-ms to shut down after a polite
+request and stops them with the old per-PID 100 ms polling loop (plus the
+1 s confirmation sleep) and with terminate_processes.
+
+Usage: python benchmarks/bench_terminate.py [--instances 4] [--exit-ms 30]
+POSIX only: the stand-ins rely on a SIGTERM handler.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from processes import terminate_processes  # noqa: E402
+
+STAND_IN = """
+import signal, sys, time
+delay = float(sys.argv[1])
+def stop(*_):
+    time.sleep(delay)
+    sys.exit(0)
+signal.signal(signal.SIGTERM, stop)
+print("ready", flush=True)
+while True:
+    time.sleep(1)
+"""
+
+
+def spawn(count, exit_ms):
+    procs = [subprocess.Popen([sys.executable, "-c", STAND_IN, str(exit_ms / 1000.0)],
+                              stdout=subprocess.PIPE, text=True) for _ in range(count)]
+    for proc in procs:
+        proc.stdout.readline()  # wait until the handler is installed
+    return procs
+
+
+def old_terminate(procs):
+    """terminate_virtukey_process + handle_running_virtukey, one PID at a time"""
+    for proc in procs:
+        proc.terminate()
+        for _ in range(50):
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+        else:
+            proc.kill()
+            time.sleep(0.5)
+    time.sleep(1)  # "Double-check it's really closed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--instances", type=int, default=4)
+    parser.add_argument("--exit-ms", type=float, default=30)
+    args = parser.parse_args()
+
+    procs = spawn(args.instances, args.exit_ms)
+    start = time.perf_counter()
+    old_terminate(procs)
+    old_time = time.perf_counter() - start
+
+    procs = spawn(args.instances, args.exit_ms)
+    result = terminate_processes([p.pid for p in procs])
+    for proc in procs:
+        proc.wait()
+
+    print(f"{args.instances} instances, {args.exit_ms:g} ms to exit each")
+    print(f"  old polling loop       {old_time * 1000:8.1f} ms")
+    print(f"  terminate_processes    {result.elapsed * 1000:8.1f} ms  {result}")
+    return 0 if result.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - UI responsiveness check
+Copies a large payload on an InstallWorker while a Tk timer measures how late
+the main loop services its events. Fails if any tick is 50 ms late or worse.
+
+Usage: python benchmarks/bench_ui_latency.py [--size-mb 512]
+On Linux without a display an Xvfb server is started (see headless.py).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from copy_engine import CopyEngine  # noqa: E402
+from headless import ensure_display  # noqa: E402
+from install_worker import InstallWorker  # noqa: E402
+
+TICK_MS = 10
+POLL_MS = 30
+LATENCY_LIMIT_MS = 50.0
+
+
+def make_payload(directory, size_mb):
+    """Write a file of size_mb MiB of incompressible data"""
+    source = Path(directory) / "payload.bin"
+    block = os.urandom(1024 * 1024)
+    with open(source, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(block)
+    return source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=512)
+    args = parser.parse_args()
+
+    problem = ensure_display()
+    if problem:
+        print(f"SKIPPED: {problem}")
+        return 2
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"SKIPPED: no Tk display available ({e})")
+        return 2
+    root.withdraw()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_payload(tmp, args.size_mb)
+        dest = Path(tmp) / "installed.bin"
+
+        def job(progress, cancel):
+            engine = CopyEngine(cancel=cancel, on_progress=lambda p: progress(None, p.fraction))
+            engine.copy([(source, dest)])
+
+        worker = InstallWorker(job)
+        lateness = []
+        expected = [0.0]
+        started = time.perf_counter()
+
+        def tick():
+            now = time.perf_counter()
+            lateness.append(max(0.0, (now - expected[0]) * 1000.0))
+            expected[0] = now + TICK_MS / 1000.0
+            if not worker.finished:
+                root.after(TICK_MS, tick)
+
+        def poll():
+            _, _, final = worker.drain()
+            if final is None:
+                root.after(POLL_MS, poll)
+            else:
+                root.quit()
+
+        expected[0] = time.perf_counter() + TICK_MS / 1000.0
+        worker.start()
+        root.after(TICK_MS, tick)
+        root.after(POLL_MS, poll)
+        root.mainloop()
+        worker.join()
+        elapsed = time.perf_counter() - started
+
+    root.destroy()
+    lateness.sort()
+    worst = lateness[-1] if lateness else 0.0
+    p99 = lateness[int(len(lateness) * 0.99)] if lateness else 0.0
+    print(f"copied {args.size_mb} MiB in {elapsed:.2f}s; {len(lateness)} ticks, "
+          f"p99 lateness {p99:.1f} ms, worst {worst:.1f} ms")
+    if worst >= LATENCY_LIMIT_MS:
+        print(f"FAIL: main loop stalled for {worst:.1f} ms (limit {LATENCY_LIMIT_MS:.0f} ms)")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
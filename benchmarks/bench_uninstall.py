@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Uninstall latency benchmark
+How long the user waits for the install folder to disappear: synchronous
+rmtree (old) against renaming it to a tombstone that is deleted in the
+background, for growing tree sizes. The tombstone time should stay flat.
+
+Usage: python benchmarks/bench_uninstall.py [--counts 100,1000,10000] [--rounds 3]
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from staging import entomb, delete_in_background  # noqa: E402
+
+
+def make_tree(root, count):
+    root.mkdir(parents=True)
+    per_dir = 500
+    for i in range(count):
+        folder = root / f"d{i // per_dir:03d}"
+        folder.mkdir(exist_ok=True)
+        (folder / f"f{i:05d}.dat").write_bytes(b"x" * 4096)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", default="100,1000,10000")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'files':>7} {'rmtree (old)':>14} {'tombstone':>12} {'background delete':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / "VirtuKey"
+        for count in (int(c) for c in args.counts.split(",")):
+            old, new, background = [], [], []
+            for _ in range(args.rounds):
+                make_tree(target, count)
+                start = time.perf_counter()
+                shutil.rmtree(target)
+                old.append(time.perf_counter() - start)
+
+                make_tree(target, count)
+                start = time.perf_counter()
+                thread = delete_in_background([entomb(target)])
+                new.append(time.perf_counter() - start)
+                thread.join()
+                background.append(time.perf_counter() - start)
+            print(f"{count:>7} {min(old) * 1000:11.2f} ms {min(new) * 1000:9.2f} ms {min(background) * 1000:15.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Copy verification benchmark
+Copy time without hashing; with hash_files on a first run, where no
+source hash is known yet and so nothing is hashed; verified against known
+source hashes (hashed in flight, or read back after a kernel copy); and
+with a naive verify pass that hashes both sides afterwards. Also times a
+second run's lookups in the verification cache, which should be one stat
+per file. Verifying costs one SHA-256 pass over the copy, so its overhead
+depends on how fast the CPU hashes compared with how fast the disk copies.
+
+Usage: python benchmarks/bench_verify.py [--size-mb 256] [--files 3] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from copy_engine import CopyEngine  # noqa: E402
+from reconcile import file_sha256  # noqa: E402
+from verify_cache import VerifyCache  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def best_of(rounds, func):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir = Path(tmp) / "src"
+        dst_dir = Path(tmp) / "dst"
+        src_dir.mkdir()
+        block = os.urandom(MB)
+        for i in range(args.files):
+            with open(src_dir / f"file{i}.bin", "wb") as f:
+                for _ in range(args.size_mb):
+                    f.write(block)
+        pairs = [(src_dir / f"file{i}.bin", dst_dir / f"file{i}.bin") for i in range(args.files)]
+
+        def plain():
+            shutil.rmtree(dst_dir, ignore_errors=True)
+            CopyEngine().copy(pairs)
+
+        known = {source: file_sha256(source) for source, _ in pairs}
+
+        def first_run():
+            shutil.rmtree(dst_dir, ignore_errors=True)
+            CopyEngine(hash_files=True, known_digest=lambda source: None).copy(pairs)
+
+        def verified():
+            shutil.rmtree(dst_dir, ignore_errors=True)
+            CopyEngine(hash_files=True, known_digest=known.get).copy(pairs)
+
+        def reread():
+            plain()
+            for source, dest in pairs:
+                file_sha256(source)
+                file_sha256(dest)
+
+        copy_time = best_of(args.rounds, plain)
+        first_time = best_of(args.rounds, first_run)
+        verified_time = best_of(args.rounds, verified)
+        reread_time = best_of(args.rounds, reread)
+
+        engine = CopyEngine(hash_files=True, known_digest=known.get)
+        shutil.rmtree(dst_dir, ignore_errors=True)
+        engine.copy(pairs)
+        cache = VerifyCache(Path(tmp) / "cache.json")
+        cache.record_copies(pairs, engine.digests)
+        assert all(engine.digests[dest] == file_sha256(dest) for _, dest in pairs)
+        lookup_time = best_of(args.rounds, lambda: [cache.digest(dest) for _, dest in pairs])
+
+    def overhead(seconds):
+        return f"{(seconds / copy_time - 1) * 100:+6.1f}%"
+
+    print(f"payload: {args.files} x {args.size_mb} MB, {os.cpu_count()} CPU(s)")
+    print(f"{'copy only':<32} {copy_time * 1000:9.1f} ms")
+    print(f"{'copy, no source hash known':<32} {first_time * 1000:9.1f} ms {overhead(first_time)}")
+    print(f"{'copy verified against known hash':<32} {verified_time * 1000:9.1f} ms {overhead(verified_time)}")
+    print(f"{'copy + hash both sides (naive)':<32} {reread_time * 1000:9.1f} ms {overhead(reread_time)}")
+    print(f"{'cached re-verify':<32} {lookup_time * 1000:9.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Copy strategy benchmark
+Times CopyEngine with each copy strategy forced on its own (reflink clone,
+copy_file_range, sendfile, buffered) and with the normal fallback chain,
+on every directory given, e.g. one each on tmpfs, ext4 and btrfs. A
+strategy the filesystem refuses shows as "n/a". Also reports the strategy
+the engine ends up using, and both with hashing on: buffered hashes the
+stream, the chain (given the source hashes, as the verification cache
+would) reads each copy back to check it. Without known source hashes the
+chain streams too, so that case is the buffered+hash column.
+
+Usage: python benchmarks/bench_zero_copy.py [--dir /tmp --dir /mnt/btrfs] [--size-mb 256] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from copy_engine import (CopyEngine, STRATEGY_BUFFERED, available_strategies,  # noqa: E402
+                         format_bytes)
+from reconcile import file_sha256  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def filesystem_type(path):
+    try:
+        out = subprocess.run(["stat", "-f", "-c", "%T", str(path)], capture_output=True, text=True)
+        return out.stdout.strip() or "?"
+    except OSError:
+        return "?"
+
+
+def run(pairs, dest_dir, rounds, strategy=None, hash_files=False, known_digest=None):
+    """Best time, or None if the forced strategy was refused; also the strategy used"""
+    times = []
+    used = None
+    for _ in range(rounds):
+        shutil.rmtree(dest_dir, ignore_errors=True)
+        engine = CopyEngine(hash_files=hash_files, zero_copy=strategy != STRATEGY_BUFFERED,
+                            known_digest=known_digest)
+        if strategy not in (None, STRATEGY_BUFFERED):
+            engine.strategies = [strategy]
+        start = time.perf_counter()
+        engine.copy(pairs)
+        times.append(time.perf_counter() - start)
+        used = sorted(set(engine.used.values()))
+        if strategy is not None and used != [strategy]:
+            return None, used
+    return min(times), used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dir", action="append", help="directory on the filesystem to test (repeatable)")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    dirs = args.dir or [tempfile.gettempdir()] + (["/dev/shm"] if os.path.isdir("/dev/shm") else [])
+    strategies = available_strategies()
+    total = args.files * args.size_mb * MB
+    print(f"payload: {args.files} x {args.size_mb} MB; strategies here: {', '.join(strategies)}")
+    columns = strategies + ["chain", "buffered+hash", "chain+hash"]
+    print(f"{'filesystem':<16}" + "".join(f"{c:>17}" for c in columns) + "  used")
+    for base in dirs:
+        with tempfile.TemporaryDirectory(dir=base) as tmp:
+            src_dir = Path(tmp) / "src"
+            dest_dir = Path(tmp) / "dst"
+            src_dir.mkdir()
+            block = os.urandom(MB)
+            for i in range(args.files):
+                with open(src_dir / f"file{i}.bin", "wb") as f:
+                    for _ in range(args.size_mb):
+                        f.write(block)
+            pairs = [(src_dir / f"file{i}.bin", dest_dir / f"file{i}.bin") for i in range(args.files)]
+
+            cells = []
+            for strategy in strategies:
+                seconds, _ = run(pairs, dest_dir, args.rounds, strategy)
+                cells.append("n/a" if seconds is None else f"{seconds * 1000:.1f} ms")
+            chain, used = run(pairs, dest_dir, args.rounds)
+            streamed, _ = run(pairs, dest_dir, args.rounds, STRATEGY_BUFFERED, hash_files=True)
+            known = {source: file_sha256(source) for source, _ in pairs}
+            hashed, _ = run(pairs, dest_dir, args.rounds, hash_files=True, known_digest=known.get)
+            cells += [f"{seconds * 1000:.1f} ms" for seconds in (chain, streamed, hashed)]
+            label = f"{filesystem_type(base)} {base}"
+            print(f"{label[:15]:<16}" + "".join(f"{c:>17}" for c in cells) + "  " + ",".join(used))
+    print(f"({format_bytes(total)} per run)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
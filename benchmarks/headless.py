@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Headless display for the Tk benchmarks
+On Linux without a DISPLAY (CI runners, SSH sessions) an Xvfb server is
+started for the life of the benchmark process, so the wizard and the main
+loop run exactly as they would on a desktop. Windows and macOS always
+have a display.
+"""
+
+import atexit
+import os
+import select
+import shutil
+import subprocess
+import sys
+
+XVFB_SCREEN = "1280x1024x24"
+XVFB_START_TIMEOUT = 10.0  # seconds for Xvfb to report its display number
+
+
+def ensure_display():
+    """Make sure Tk has a display; returns None, or why there can't be one"""
+    if sys.platform in ("win32", "darwin") or os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return "no DISPLAY and Xvfb is not installed (apt install xvfb)"
+    # -displayfd: Xvfb picks a free display itself and writes its number once it accepts clients
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen([xvfb, "-displayfd", str(write_fd), "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"],
+                              pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    atexit.register(_stop, server)
+    try:
+        number = _read_display(read_fd)
+    finally:
+        os.close(read_fd)
+    if not number:
+        return "Xvfb did not start"
+    os.environ["DISPLAY"] = f":{number}"
+    return None
+
+
+def _read_display(fd):
+    data = b""
+    while not data.endswith(b"\n"):
+        ready, _, _ = select.select([fd], [], [], XVFB_START_TIMEOUT)
+        if not ready:
+            return None
+        chunk = os.read(fd, 16)
+        if not chunk:
+            return None
+        data += chunk
+    return data.strip().decode("ascii")
+
+
+def _stop(server):
+    server.terminate()
+    try:
+        server.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        server.kill()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Benchmark suite
+Times the install, reinstall (staged, delta and clean) and uninstall paths of
+install_core plus process detection and shutdown, against temp directories
+with stand-ins for winreg, PowerShell and the process table. Results are
+written to JSON and compared with a stored baseline; anything slower than
+the baseline by more than --threshold (and --floor-ms) is flagged.
+
+Usage:
+  python benchmarks/run_benchmarks.py                      # compare with benchmarks/baseline.json
+  python benchmarks/run_benchmarks.py --full               # add the ~1.2 GB payload
+  python benchmarks/run_benchmarks.py --save-baseline      # record a new baseline
+  python benchmarks/run_benchmarks.py --filter install/ --repeat 5 --output out.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+import install_core  # noqa: E402
+from bench_process_locator import FakeProcess, FakeProcessTable  # noqa: E402
+from processes import ProcessLocator  # noqa: E402
+
+DEFAULT_BASELINE = HERE / "baseline.json"
+KB = 1024
+MB = 1024 * KB
+
+# (label, file count, bytes per file)
+SIZE_CASES = [("3x4KB", 3, 4 * KB), ("3x1MB", 3, MB), ("3x64MB", 3, 64 * MB)]
+FULL_SIZE_CASES = [("3x400MB", 3, 400 * MB)]
+COUNT_CASES = [("100x4KB", 100, 4 * KB), ("1000x4KB", 1000, 4 * KB), ("10000x4KB", 10000, 4 * KB)]
+PROCESS_TABLE_SIZE = 10000
+SHUTDOWN_INSTANCES = 4
+
+
+class _FakeKey:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeWinreg:
+    """The slice of winreg install_core uses, backed by a dict"""
+
+    HKEY_CURRENT_USER = "HKCU"
+    HKEY_USERS = "HKU"
+    KEY_SET_VALUE = 0x0002
+    REG_SZ = 1
+
+    def __init__(self):
+        self.values = {}
+
+    def OpenKey(self, hive, path, reserved=0, access=0):
+        return _FakeKey((hive, path))
+
+    def SetValueEx(self, key, name, reserved, value_type, value):
+        self.values[(key.path, name)] = value
+
+    def DeleteValue(self, key, name):
+        try:
+            del self.values[(key.path, name)]
+        except KeyError:
+            raise FileNotFoundError(name)
+
+
+def fake_powershell_shortcut(shortcut_path, target, working_dir, description, arguments="", icon_location=""):
+    """Stand-in for the PowerShell fallback: just drop a file where the link would go"""
+    Path(shortcut_path).write_bytes(b"L\0\0\0")
+
+
+class StandIns:
+    """Swap install_core's Windows dependencies for fakes while benchmarking"""
+
+    def __init__(self, tmp, table):
+        self.tmp = tmp
+        self.table = table
+        self.saved = {}
+
+    def __enter__(self):
+        pid_file = os.path.join(self.tmp, "VirtuKey.pid")
+        table = self.table
+        replacements = {
+            "winreg": FakeWinreg(),
+            "_create_shortcut_powershell": fake_powershell_shortcut,
+            "ProcessLocator": lambda: ProcessLocator(pid_file=pid_file, process_iter=table.process_iter,
+                                                     name_of=table.name_of),
+            "PAYLOAD_FILES": list(install_core.PAYLOAD_FILES),
+        }
+        for name, value in replacements.items():
+            self.saved[name] = getattr(install_core, name)
+            setattr(install_core, name, value)
+        # The control channel and PID file live in TMP; keep them in the sandbox
+        self.saved_tmp = os.environ.get("TMP")
+        os.environ["TMP"] = self.tmp
+        return self
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(install_core, name, value)
+        if self.saved_tmp is None:
+            os.environ.pop("TMP", None)
+        else:
+            os.environ["TMP"] = self.saved_tmp
+        return False
+
+
+def drop_caches():
+    if hasattr(os, "sync"):
+        os.sync()
+
+
+def make_payload(root, count, size):
+    payload = Path(root) / "payload"
+    shutil.rmtree(payload, ignore_errors=True)
+    payload.mkdir(parents=True)
+    block = os.urandom(min(size, MB))
+    names = []
+    for i in range(count):
+        name = f"file{i:05d}.bin"
+        with open(payload / name, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                f.write(block[:remaining])
+                remaining -= len(block)
+        names.append(name)
+    return payload, names
+
+
+def bench_payload(tmp, label, count, size, repeat):
+    """Best-of-repeat timings for install, both reinstall modes and uninstall of one payload"""
+    payload, names = make_payload(tmp, count, size)
+    install_core.PAYLOAD_FILES = names
+    profile = Path(tmp) / "profile"
+    options = install_core.InstallOptions(Path(tmp) / "install", auto_start=True,
+                                          remove_settings=True, profile_dir=profile, payload_dir=payload)
+    steps = [
+        ("install", lambda: install_core.perform_installation(options)),
+        ("reinstall-staged", lambda: install_core.perform_reinstallation(options)),
+        ("reinstall-delta", lambda: install_core.perform_reinstallation(options, mode=install_core.REINSTALL_DELTA)),
+        ("reinstall-clean", lambda: install_core.perform_reinstallation(options, mode=install_core.REINSTALL_CLEAN)),
+        ("uninstall", lambda: install_core.perform_uninstallation(options)),
+    ]
+    best = {}
+    for _ in range(repeat):
+        shutil.rmtree(profile, ignore_errors=True)
+        shutil.rmtree(options.install_path, ignore_errors=True)
+        (profile / "Desktop").mkdir(parents=True)
+        for name, func in steps:
+            drop_caches()
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best[name] = min(best.get(name, elapsed), elapsed)
+            if name == "uninstall" and result is not None:
+                # The tombstone is deleted in the background; keep it out of the next timing
+                result.join()
+    shutil.rmtree(payload, ignore_errors=True)
+    return {f"{name}/{label}": {"seconds": seconds, "files": count, "bytes": count * size}
+            for name, seconds in best.items()}
+
+
+def bench_detection(tmp, table, repeat):
+    """is_virtukey_running via the PID file and via a full name-only scan"""
+    pid_file = Path(tmp) / "VirtuKey.pid"
+    results = {}
+    for label, write_pid in (("pid-file", True), (f"scan-{PROCESS_TABLE_SIZE}", False)):
+        if write_pid:
+            pid_file.write_text(str(table.procs[-1].pid))
+        elif pid_file.exists():
+            pid_file.unlink()
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            running, _ = install_core.is_virtukey_running()
+            elapsed = time.perf_counter() - start
+            assert running
+            best = elapsed if best is None else min(best, elapsed)
+        results[f"is_running/{label}"] = {"seconds": best}
+    return results
+
+
+def bench_shutdown(table, repeat):
+    """close_running_virtukey against real stand-in processes (POSIX only)"""
+    if os.name != "posix":
+        return {}
+    from bench_terminate import spawn
+
+    best = None
+    # The detection target has a made-up PID; it must never be signalled
+    target = table.procs[-1]
+    target._name = "svchost.exe"
+    try:
+        for _ in range(repeat):
+            procs = spawn(SHUTDOWN_INSTANCES, 20)
+            # Put the stand-ins into the fake table under VirtuKey's name
+            extra = [FakeProcess(p.pid, "VirtuKey.exe") for p in procs]
+            table.procs.extend(extra)
+            start = time.perf_counter()
+            install_core.close_running_virtukey()
+            elapsed = time.perf_counter() - start
+            for proc in procs:
+                proc.wait()
+            del table.procs[-len(extra):]
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        target._name = "VirtuKey.exe"
+    return {f"close_running/{SHUTDOWN_INSTANCES}-instances": {"seconds": best}}
+
+
+def run_suite(args):
+    cases = SIZE_CASES + (FULL_SIZE_CASES if args.full else []) + COUNT_CASES
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        table = FakeProcessTable(PROCESS_TABLE_SIZE, 0, PROCESS_TABLE_SIZE - 1)
+        # install_core prints its non-critical warnings; keep the report readable
+        with StandIns(tmp, table), contextlib.redirect_stdout(io.StringIO()):
+            for label, count, size in cases:
+                if args.filter and not any(args.filter in f"{step}/{label}" for step in
+                                           ("install", "reinstall-staged", "reinstall-delta", "reinstall-clean", "uninstall")):
+                    continue
+                print(f"  payload {label}...", file=sys.stderr, flush=True)
+                results.update(bench_payload(tmp, label, count, size, args.repeat))
+            print("  process detection and shutdown...", file=sys.stderr, flush=True)
+            results.update(bench_detection(tmp, table, args.repeat))
+            results.update(bench_shutdown(table, args.repeat))
+    if args.filter:
+        results = {name: r for name, r in results.items() if args.filter in name}
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold, floor):
+    """Print a table against the baseline; returns the names that regressed"""
+    regressions = []
+    base_results = baseline["results"] if baseline else {}
+    print(f"{'benchmark':<34} {'time':>11} {'baseline':>11} {'change':>8}")
+    for name, result in sorted(report["results"].items()):
+        seconds = result["seconds"]
+        base = base_results.get(name)
+        if base is None:
+            print(f"{name:<34} {seconds * 1000:9.2f}ms {'-':>11} {'new':>8}")
+            continue
+        change = seconds / base["seconds"] - 1 if base["seconds"] else 0.0
+        flag = ""
+        if change > threshold and (seconds - base["seconds"]) * 1000 > floor:
+            regressions.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<34} {seconds * 1000:9.2f}ms {base['seconds'] * 1000:9.2f}ms {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--full", action="store_true", help="include the GB-scale payload")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best is kept")
+    parser.add_argument("--filter", help="only benchmarks whose name contains this text")
+    parser.add_argument("--output", default="bench-results.json", help="where to write this run's JSON")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--floor-ms", type=float, default=2.0,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+    baseline = None
+    if not args.save_baseline:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError):
+            print(f"No baseline at {args.baseline}; showing this run only")
+
+    regressions = compare(report, baseline, args.threshold, args.floor_ms)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"FAIL: {len(regressions)} benchmark(s) slower than the baseline by more than "
+              f"{args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Payload bundle
+All payload files in one indexed archive instead of a loose resource
+folder, so a one-file installer no longer unpacks its payload to a temp
+dir on every launch. Each entry is compressed on its own and found through
+an index at the end of the archive; installing one streams it from its
+offset straight into the install directory.
+
+    entry data ... | index (JSON) | b"VKBUNDL1" | bundle size (u64 LE) | index size (u64 LE)
+
+Offsets in the index count from the start of the bundle, and the trailer
+says how long the bundle is, so the same bytes work as a file of their own
+(payload.vkb) or appended to the installer executable. Opening a bundle
+reads only the trailer and the index.
+
+    python bundle.py build OUT.vkb FILE...     (--append to add to an existing exe)
+    python bundle.py list BUNDLE
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+BUNDLE_MAGIC = b"VKBUNDL1"
+BUNDLE_FILE_NAME = "payload.vkb"
+BUNDLE_VERSION = 1
+TRAILER = struct.Struct("<8sQQ")
+
+METHOD_STORED = "stored"
+METHOD_ZLIB = "zlib"
+COMPRESS_LEVEL = 9
+CHUNK_SIZE = 1024 * 1024
+
+
+class BundleError(Exception):
+    """Not a bundle, or a damaged one"""
+
+
+class EntryStat:
+    """The two stat() fields the installer compares payload files by"""
+
+    def __init__(self, size, mtime_ns):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+
+
+class BundleEntry:
+    """One payload file inside a bundle
+
+    Stands in for a payload Path wherever sources are handled: it has a
+    name, stat() and open(), and its SHA-256 is known from the index.
+    """
+
+    def __init__(self, bundle, name, offset, length, size, method, sha256, mtime_ns):
+        self.bundle = bundle
+        self.name = name
+        self.offset = offset    # from the start of the bundle
+        self.length = length    # stored (compressed) bytes
+        self.size = size        # bytes once extracted
+        self.method = method
+        self.sha256 = sha256
+        self.mtime_ns = mtime_ns
+
+    def stat(self):
+        return EntryStat(self.size, self.mtime_ns)
+
+    def open(self, mode="rb"):
+        """A streaming reader for the entry's content"""
+        if mode != "rb":
+            raise ValueError("bundle entries are read-only")
+        return io.BufferedReader(EntryReader(self), CHUNK_SIZE)
+
+    def __str__(self):
+        return f"{self.bundle.path}:{self.name}"
+
+    def __repr__(self):
+        return f"BundleEntry({str(self)!r})"
+
+
+class EntryReader(io.RawIOBase):
+    """Seeks to one entry and inflates it as it is read, never holding more than a chunk"""
+
+    def __init__(self, entry):
+        self.entry = entry
+        self._file = open(entry.bundle.path, "rb")
+        self._file.seek(entry.bundle.start + entry.offset)
+        self._remaining = entry.length  # stored bytes not yet read from the file
+        self._inflate = zlib.decompressobj() if entry.method == METHOD_ZLIB else None
+        self._pending = b""             # read but not yet inflated
+
+    def readable(self):
+        return True
+
+    def _read_stored(self, size):
+        data = self._file.read(min(size, self._remaining))
+        if not data:
+            raise BundleError(f"{self.entry} is truncated")
+        self._remaining -= len(data)
+        return data
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        if not len(view):
+            return 0
+        if self._inflate is None:
+            if not self._remaining:
+                return 0
+            count = self._file.readinto(view[:min(len(view), self._remaining)])
+            if not count:
+                raise BundleError(f"{self.entry} is truncated")
+            self._remaining -= count
+            return count
+        while True:
+            if not self._pending and self._remaining:
+                self._pending = self._read_stored(CHUNK_SIZE)
+            try:
+                data = self._inflate.decompress(self._pending, len(view))
+            except zlib.error as e:
+                raise BundleError(f"{self.entry} is damaged: {e}")
+            self._pending = self._inflate.unconsumed_tail
+            if data:
+                view[:len(data)] = data
+                return len(data)
+            if not self._pending and not self._remaining:
+                if not self._inflate.eof:
+                    raise BundleError(f"{self.entry} is truncated")
+                return 0
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class Bundle:
+    """An opened bundle: its location in the file and its index"""
+
+    def __init__(self, path, start, entries):
+        self.path = Path(path)
+        self.start = start      # where the bundle begins (non-zero when appended to an exe)
+        self.entries = entries  # name -> BundleEntry
+
+    @classmethod
+    def open(cls, path):
+        """Read the trailer and index of the bundle ending at the end of path"""
+        try:
+            with open(path, "rb") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end < TRAILER.size:
+                    raise BundleError(f"{path} has no payload bundle")
+                f.seek(end - TRAILER.size)
+                magic, bundle_size, index_size = TRAILER.unpack(f.read(TRAILER.size))
+                if magic != BUNDLE_MAGIC:
+                    raise BundleError(f"{path} has no payload bundle")
+                if bundle_size > end or index_size > bundle_size - TRAILER.size:
+                    raise BundleError(f"{path} has a damaged payload bundle")
+                f.seek(end - TRAILER.size - index_size)
+                index = json.loads(f.read(index_size).decode("utf-8"))
+        except OSError as e:
+            raise BundleError(f"Cannot read {path}: {e}")
+        except (ValueError, UnicodeDecodeError) as e:
+            raise BundleError(f"{path} has a damaged bundle index: {e}")
+
+        if not isinstance(index, dict) or index.get("version") != BUNDLE_VERSION:
+            raise BundleError(f"{path} has an unsupported bundle version")
+        bundle = cls(path, end - bundle_size, {})
+        data_size = bundle_size - TRAILER.size - index_size
+        try:
+            for item in index["entries"]:
+                entry = BundleEntry(bundle, item["name"], item["offset"], item["length"], item["size"],
+                                    item["method"], item["sha256"], item["mtime_ns"])
+                if entry.offset < 0 or entry.offset + entry.length > data_size or \
+                        entry.method not in (METHOD_STORED, METHOD_ZLIB):
+                    raise BundleError(f"{path} has a damaged entry for {entry.name}")
+                bundle.entries[entry.name] = entry
+        except (KeyError, TypeError) as e:
+            raise BundleError(f"{path} has a damaged bundle index: {e}")
+        return bundle
+
+    def names(self):
+        return list(self.entries)
+
+    def entry(self, name):
+        try:
+            return self.entries[name]
+        except KeyError:
+            raise BundleError(f"{name} is not in {self.path}")
+
+    def extract(self, name, dest):
+        """Stream one entry into dest, checking its hash; returns the SHA-256"""
+        entry = self.entry(name)
+        dest = Path(dest)
+        digest = hashlib.sha256()
+        try:
+            with entry.open() as src, open(dest, "wb") as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            os.utime(dest, ns=(entry.mtime_ns, entry.mtime_ns))
+            if digest.hexdigest() != entry.sha256:
+                raise BundleError(f"{entry} does not match its recorded hash")
+        except BaseException:
+            # Damaged data can fail the inflate half way; never leave part of a file behind
+            try:
+                dest.unlink()
+            except OSError:
+                pass
+            raise
+        return entry.sha256
+
+
+def as_source(source):
+    """A payload source as used by the copy and compare steps: a BundleEntry or a Path"""
+    return source if isinstance(source, BundleEntry) else Path(source)
+
+
+def copy_source_stat(source, dest):
+    """Give dest the source's timestamps (shutil.copystat for files)"""
+    if isinstance(source, BundleEntry):
+        os.utime(dest, ns=(source.mtime_ns, source.mtime_ns))
+    else:
+        shutil.copystat(source, dest)
+
+
+def _write_entry(out, path):
+    """Append one file to out, compressed if that makes it smaller; returns its index item"""
+    start = out.tell()
+    digest = hashlib.sha256()
+    deflate = zlib.compressobj(COMPRESS_LEVEL)
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+            out.write(deflate.compress(chunk))
+        out.write(deflate.flush())
+        method = METHOD_ZLIB
+        if out.tell() - start >= size:
+            # Already compressed (PNGs, packed exes): store it as it is
+            out.seek(start)
+            out.truncate()
+            f.seek(0)
+            shutil.copyfileobj(f, out, CHUNK_SIZE)
+            method = METHOD_STORED
+    return {"offset": start, "length": out.tell() - start, "size": size, "method": method,
+            "sha256": digest.hexdigest(), "mtime_ns": os.stat(path).st_mtime_ns}
+
+
+def build_bundle(files, out_path, append=False):
+    """Write a bundle of files (name -> path) to out_path, or append it to out_path"""
+    with open(out_path, "r+b" if append else "wb") as f:
+        base = f.seek(0, os.SEEK_END)
+        out = _Relative(f, base)
+        entries = []
+        for name, path in files.items():
+            item = _write_entry(out, path)
+            item["name"] = name
+            entries.append(item)
+        index = json.dumps({"version": BUNDLE_VERSION, "entries": entries}).encode("utf-8")
+        out.write(index)
+        out.write(TRAILER.pack(BUNDLE_MAGIC, out.tell() + TRAILER.size, len(index)))
+        return out.tell()
+
+
+class _Relative:
+    """File wrapper whose tell/seek/truncate count from where the bundle starts"""
+
+    def __init__(self, f, base):
+        self.f = f
+        self.base = base
+
+    def write(self, data):
+        return self.f.write(data)
+
+    def tell(self):
+        return self.f.tell() - self.base
+
+    def seek(self, offset):
+        return self.f.seek(self.base + offset) - self.base
+
+    def truncate(self):
+        return self.f.truncate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or list a VirtuKey payload bundle.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="bundle payload files")
+    build.add_argument("out")
+    build.add_argument("files", nargs="+")
+    build.add_argument("--append", action="store_true", help="append to OUT (e.g. the installer exe)")
+    listing = commands.add_parser("list", help="show a bundle's index")
+    listing.add_argument("bundle")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        size = build_bundle({Path(p).name: p for p in args.files}, args.out, args.append)
+        print(f"{args.out}: {size} byte bundle, {len(args.files)} files")
+    else:
+        bundle = Bundle.open(args.bundle)
+        for entry in bundle.entries.values():
+            print(f"{entry.name:<32} {entry.size:>12} {entry.length:>12} {entry.method:<7} {entry.sha256[:16]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
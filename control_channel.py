@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Control channel
+A small request/response protocol over a loopback socket so the installer
+can ask a running VirtuKey to exit instead of killing it.
+
+Discovery: VirtuKey writes %TMP%\\VirtuKey.ctl containing
+    {"port": 51234, "token": "<random hex>", "pid": 4242}
+Wire format: one JSON object per line in each direction.
+    -> {"token": "...", "command": "status" | "reload" | "shutdown"}
+    <- {"ok": true, "pid": 4242, "state": "running" | "reloading" | "exiting"}
+After acknowledging "shutdown" the server keeps the connection open until
+the process is gone, so EOF on the client side means "VirtuKey has exited".
+
+VirtuKey.ahk serves the VirtuKey side with Winsock. ControlServer is a
+Python equivalent that runs on any OS, so the protocol can be exercised
+without Windows.
+"""
+
+import json
+import os
+import secrets
+import socket
+import tempfile
+import threading
+import time
+
+CONTROL_FILE_NAME = "VirtuKey.ctl"
+COMMANDS = ("status", "reload", "shutdown")
+CONNECT_TIMEOUT = 0.5
+MAX_LINE = 4096
+
+
+def default_control_file():
+    """Same directory as the PID file: AutoHotkey's A_Temp (TMP, then TEMP)"""
+    temp_dir = os.environ.get("TMP") or os.environ.get("TEMP") or tempfile.gettempdir()
+    return os.path.join(temp_dir, CONTROL_FILE_NAME)
+
+
+class ControlError(Exception):
+    """No VirtuKey listening, or it answered with an error"""
+
+
+def _read_line(sock, deadline):
+    data = b""
+    while not data.endswith(b"\n"):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ControlError("Timed out waiting for VirtuKey to answer")
+        try:
+            sock.settimeout(remaining)
+            chunk = sock.recv(MAX_LINE)
+        except socket.timeout:
+            raise ControlError("Timed out waiting for VirtuKey to answer")
+        except OSError as e:
+            raise ControlError(f"Lost the connection to VirtuKey: {e}")
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_LINE:
+            raise ControlError("Oversized control message")
+    return data
+
+
+class ControlClient:
+    """Installer side of the channel"""
+
+    def __init__(self, control_file=None, timeout=2.0):
+        self.control_file = control_file or default_control_file()
+        self.timeout = timeout
+
+    def _endpoint(self):
+        try:
+            with open(self.control_file, "r", encoding="utf-8-sig") as f:
+                info = json.load(f)
+            return int(info["port"]), str(info["token"])
+        except (OSError, ValueError, KeyError, TypeError):
+            raise ControlError("VirtuKey control channel is not available")
+
+    def _connect(self):
+        port, token = self._endpoint()
+        try:
+            sock = socket.create_connection(("127.0.0.1", port), timeout=CONNECT_TIMEOUT)
+        except OSError as e:
+            raise ControlError(f"Could not reach VirtuKey: {e}")
+        return sock, token
+
+    def _exchange(self, sock, token, command, deadline):
+        message = json.dumps({"token": token, "command": command}) + "\n"
+        try:
+            sock.settimeout(max(deadline - time.monotonic(), 0.001))
+            sock.sendall(message.encode("utf-8"))
+        except OSError as e:
+            raise ControlError(f"Could not send to VirtuKey: {e}")
+        line = _read_line(sock, deadline)
+        if not line:
+            raise ControlError("VirtuKey closed the connection without answering")
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            raise ControlError("Malformed reply from VirtuKey")
+        # A stale control file can point at some other program's port
+        if not isinstance(reply, dict):
+            raise ControlError("Malformed reply from VirtuKey")
+        if not reply.get("ok"):
+            raise ControlError(str(reply.get("error", "VirtuKey refused the request")))
+        return reply
+
+    def request(self, command):
+        """Send status or reload and return the reply"""
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown control command: {command}")
+        deadline = time.monotonic() + self.timeout
+        sock, token = self._connect()
+        with sock:
+            return self._exchange(sock, token, command, deadline)
+
+    def shutdown(self, timeout=5.0):
+        """Ask VirtuKey to exit; returns its reply once it has actually exited"""
+        deadline = time.monotonic() + timeout
+        sock, token = self._connect()
+        with sock:
+            reply = self._exchange(sock, token, "shutdown", deadline)
+            # Server holds the connection until the process is gone
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ControlError("VirtuKey acknowledged shutdown but did not exit in time")
+                    sock.settimeout(remaining)
+                    if not sock.recv(MAX_LINE):
+                        break
+            except ConnectionResetError:
+                pass  # process died with the socket open: also an exit
+            except socket.timeout:
+                raise ControlError("VirtuKey acknowledged shutdown but did not exit in time")
+            except OSError as e:
+                raise ControlError(f"Lost the connection to VirtuKey: {e}")
+        return reply
+
+
+class ControlServer:
+    """VirtuKey-side server, as VirtuKey.ahk implements it
+
+    on_reload() and on_shutdown() run on the connection thread; the shutdown
+    acknowledgement's connection is closed only after on_shutdown returns,
+    which is when a real process would have exited.
+    """
+
+    def __init__(self, control_file=None, on_reload=None, on_shutdown=None, pid=None):
+        self.control_file = control_file or default_control_file()
+        self.on_reload = on_reload
+        self.on_shutdown = on_shutdown
+        self.pid = pid or os.getpid()
+        self.token = secrets.token_hex(16)
+        self.state = "running"
+        self.stopped = threading.Event()
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        """Bind to a free loopback port, publish the control file, serve in the background"""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(8)
+        port = self._sock.getsockname()[1]
+
+        tmp_path = self.control_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"port": port, "token": self.token, "pid": self.pid}, f)
+        os.replace(tmp_path, self.control_file)
+
+        self._thread = threading.Thread(target=self._serve, name="VirtuKeyControl", daemon=True)
+        self._thread.start()
+        return port
+
+    def stop(self):
+        """Stop listening and withdraw the control file"""
+        self.stopped.set()
+        try:
+            os.unlink(self.control_file)
+        except OSError:
+            pass
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+
+    def _serve(self):
+        while not self.stopped.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _reply(self, conn, **fields):
+        try:
+            conn.sendall((json.dumps(fields) + "\n").encode("utf-8"))
+        except OSError:
+            pass  # the client went away; nothing to tell it
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                line = _read_line(conn, time.monotonic() + 5.0)
+                request = json.loads(line)
+            except (ControlError, OSError, ValueError):
+                return
+            if not isinstance(request, dict):
+                self._reply(conn, ok=False, error="request must be a JSON object")
+                return
+            if not secrets.compare_digest(str(request.get("token", "")), self.token):
+                self._reply(conn, ok=False, error="bad token")
+                return
+
+            command = request.get("command")
+            if command == "status":
+                self._reply(conn, ok=True, pid=self.pid, state=self.state)
+            elif command == "reload":
+                self.state = "reloading"
+                self._reply(conn, ok=True, pid=self.pid, state=self.state)
+                if self.on_reload is not None:
+                    self.on_reload()
+                self.state = "running"
+            elif command == "shutdown":
+                self.state = "exiting"
+                self._reply(conn, ok=True, pid=self.pid, state=self.state)
+                if self.on_shutdown is not None:
+                    self.on_shutdown()
+                self.stop()
+            else:
+                self._reply(conn, ok=False, error=f"unknown command: {command}")
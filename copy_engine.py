@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Payload copy engine
+Copies many files on a bounded thread pool with reusable buffers, reporting
+per-chunk progress plus aggregate throughput and ETA. With hash_files a
+file whose source hash is already known is verified against it: hashed as
+it streams through, or read back once the kernel has copied it. A file
+with no known hash has nothing to be checked against and is copied
+without hashing, at full speed.
+
+Where the OS can copy without the data passing through the process, it
+does: a reflink clone first (Btrfs, XFS; nothing is copied at all), then
+copy_file_range, then sendfile, and only then a buffered copy. Each file's
+strategy is kept in CopyEngine.used.
+"""
+
+import errno
+import hashlib
+import mmap
+import os
+import queue
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from pathlib import Path
+
+from bundle import BundleEntry, as_source, copy_source_stat
+from reconcile import MMAP_THRESHOLD, file_sha256
+from staging import remove_file
+from tracing import span
+
+DEFAULT_WORKERS = 4
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 0.1  # seconds between aggregate progress callbacks
+SMALL_PAYLOAD = 8 * 1024 * 1024  # below this, pool start-up costs more than it saves
+HASH_QUEUE_DEPTH = 4  # chunks a file's hasher thread may lag behind its writer
+
+# Copy strategies, fastest first
+STRATEGY_CLONE = "clone"
+STRATEGY_COPY_RANGE = "copy_file_range"
+STRATEGY_SENDFILE = "sendfile"
+STRATEGY_BUFFERED = "buffered"
+FICLONE = 0x40049409  # linux/fs.h; fcntl.FICLONE from Python 3.12
+# errno values meaning "not here", as opposed to a real I/O failure
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY,
+                      errno.ETXTBSY, errno.EBADF, errno.EPERM, getattr(errno, "ENOTSUP", errno.EOPNOTSUPP)}
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def available_strategies():
+    """Strategies this platform can attempt, in the order they are tried"""
+    strategies = []
+    if sys.platform.startswith("linux"):
+        if fcntl is not None:
+            strategies.append(STRATEGY_CLONE)
+        if hasattr(os, "copy_file_range"):
+            strategies.append(STRATEGY_COPY_RANGE)
+        if hasattr(os, "sendfile"):
+            strategies.append(STRATEGY_SENDFILE)
+    strategies.append(STRATEGY_BUFFERED)
+    return strategies
+
+
+class CopyError(Exception):
+    """A single file failed to copy; the original exception is kept in .error"""
+
+    def __init__(self, source, dest, error):
+        super().__init__(f"Error copying {as_source(source).name}: {error}")
+        self.source = source
+        self.dest = dest
+        self.error = error
+
+
+class CopyProgress:
+    """Aggregate progress snapshot handed to on_progress"""
+
+    def __init__(self, bytes_done, bytes_total, files_done, files_total, elapsed, current):
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.files_done = files_done
+        self.files_total = files_total
+        self.elapsed = elapsed
+        self.current = current
+
+    @property
+    def fraction(self):
+        return self.bytes_done / self.bytes_total if self.bytes_total else 1.0
+
+    @property
+    def throughput(self):
+        """Bytes per second since the copy started"""
+        return self.bytes_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Seconds left at the current throughput, None until there is a rate"""
+        rate = self.throughput
+        if rate <= 0:
+            return None
+        return (self.bytes_total - self.bytes_done) / rate
+
+
+def format_bytes(count):
+    """Human readable byte count (1.5 MB)"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024.0
+
+
+def describe_progress(p):
+    """One-line status text for a CopyProgress"""
+    text = f"Copying files... {format_bytes(p.bytes_done)} of {format_bytes(p.bytes_total)}"
+    if p.throughput > 0:
+        text += f" ({format_bytes(p.throughput)}/s"
+        if p.eta is not None:
+            text += f", {int(p.eta + 0.5)} s left"
+        text += ")"
+    return text
+
+
+class CopyEngine:
+    """Copy (source, dest) pairs concurrently with copy2 metadata semantics
+
+    on_chunk(dest, nbytes) fires from worker threads for every chunk written;
+    on_progress(CopyProgress) is throttled to PROGRESS_INTERVAL and always
+    fires once at the end. cancel is an optional CancelToken checked per chunk.
+    Sources are file paths or bundle entries (see bundle.py).
+
+    With hash_files=True every file whose source hash known_digest(source)
+    knows (e.g. VerifyCache.lookup) is hashed, and digests maps its dest
+    Path to the SHA-256 as copied. Data copied by the kernel never passes
+    through here, so such a file is read back and must match. Files with
+    no known hash get no digest. Set zero_copy=False to always stream.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                 on_chunk=None, on_progress=None, cancel=None, progress_interval=PROGRESS_INTERVAL,
+                 hash_files=False, zero_copy=True, known_digest=None):
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.progress_interval = progress_interval
+        self.hash_files = hash_files
+        self.known_digest = known_digest
+        self.strategies = []  # fast strategies to try, in order
+        if zero_copy:
+            self.strategies = [s for s in available_strategies() if s != STRATEGY_BUFFERED]
+        self.completed = []
+        self.digests = {}
+        self.used = {}        # dest Path -> strategy that copied it
+        self._unsupported = set()  # (strategy, source device, dest device) seen failing
+
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._buffers = queue.Queue()
+        self._bytes_done = 0
+        self._bytes_total = 0
+        self._files_done = 0
+        self._files_total = 0
+        self._started = 0.0
+        self._last_report = 0.0
+        self._current = None
+
+    def copy(self, pairs):
+        """Copy every (source, dest) pair; returns the final CopyProgress
+
+        Raises CopyError for the first failure (or InstallCancelled); files in
+        flight are removed, files already finished are listed in self.completed.
+        """
+        jobs = []
+        for source, dest in pairs:
+            source = as_source(source)
+            jobs.append((source, dest, source.stat().st_size))
+        # Largest first keeps the pool busy until the very end
+        jobs.sort(key=lambda job: job[2], reverse=True)
+
+        self.completed = []
+        self.digests = {}
+        self.used = {}
+        self._abort.clear()
+        self._bytes_done = 0
+        self._bytes_total = sum(size for _, _, size in jobs)
+        self._files_done = 0
+        self._files_total = len(jobs)
+        self._started = time.perf_counter()
+        self._last_report = 0.0
+
+        # One reusable buffer per worker, never more
+        workers = min(self.max_workers, len(jobs)) or 1
+        if self._bytes_total < SMALL_PAYLOAD:
+            workers = 1
+        while not self._buffers.empty():
+            self._buffers.get_nowait()
+        for _ in range(workers):
+            self._buffers.put(bytearray(self.chunk_size))
+
+        if workers == 1:
+            for job in jobs:
+                self._copy_one(*job)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="VirtuKeyCopy") as pool:
+                futures = [pool.submit(self._copy_one, *job) for job in jobs]
+                done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+                if pending:
+                    self._abort.set()
+                    for future in pending:
+                        future.cancel()
+                    wait(pending)
+                # Surface the first real failure, preferring it over secondary aborts
+                for future in futures:
+                    if future.done() and not future.cancelled() and future.exception() is not None:
+                        raise future.exception()
+
+        self._report(force=True)
+        return self.snapshot()
+
+    def _copy_one(self, source, dest, size):
+        with span("copy_file", file=Path(dest).name, bytes=size) as s:
+            self._copy_file(source, dest, size)
+            s.set(strategy=self.used.get(Path(dest)))
+
+    def _copy_file(self, source, dest, size):
+        if self._abort.is_set():
+            return
+        buffer = self._buffers.get()
+        view = memoryview(buffer)
+        digest = hashlib.sha256() if self.hash_files else None
+        sha256 = None
+        try:
+            self._current = Path(dest).name
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            # Bundle entries are inflated as they stream, so only plain files can skip user space
+            plain = not isinstance(source, BundleEntry)
+            if digest is not None:
+                # Hashing a file nobody knows the hash of would only record it, not check it
+                expected = self.known_digest(source) if self.known_digest is not None else None
+                if expected is None:
+                    digest = None
+            _detach(dest)
+            with source.open('rb') as src, open(dest, 'wb') as dst:
+                strategy = self._copy_fast(src, dst, dest, size) if plain and self.strategies else None
+                if strategy is None:
+                    strategy = STRATEGY_BUFFERED
+                    if digest is not None and size >= MMAP_THRESHOLD and plain:
+                        self._copy_mapped(src, dst, dest, size, digest)
+                    else:
+                        self._copy_buffered(src, dst, dest, buffer, view, digest)
+                elif digest is not None:
+                    digest = None
+                    sha256 = expected
+            if sha256 is not None and file_sha256(dest) != sha256:
+                raise OSError(errno.EIO, "the copied data does not match the source")
+            copy_source_stat(source, dest)
+        except BaseException as e:
+            # Never leave a truncated file behind
+            try:
+                os.unlink(dest)
+            except OSError:
+                pass
+            if isinstance(e, _Aborted):
+                return
+            self._abort.set()
+            if isinstance(e, OSError):
+                raise CopyError(source, dest, e)
+            raise
+        finally:
+            view.release()
+            self._buffers.put(buffer)
+
+        with self._lock:
+            self._files_done += 1
+            self.completed.append(Path(dest))
+            self.used[Path(dest)] = strategy
+            if digest is not None:
+                self.digests[Path(dest)] = digest.hexdigest()
+            elif sha256 is not None:
+                self.digests[Path(dest)] = sha256
+
+    def _checkpoint(self):
+        if self.cancel is not None:
+            self.cancel.check()
+        if self._abort.is_set():
+            raise _Aborted()
+
+    def _advance(self, dest, count):
+        if self.on_chunk is not None:
+            self.on_chunk(dest, count)
+        with self._lock:
+            self._bytes_done += count
+        self._report()
+
+    def _copy_buffered(self, src, dst, dest, buffer, view, digest):
+        while True:
+            self._checkpoint()
+            count = src.readinto(buffer)
+            if not count:
+                break
+            dst.write(view[:count])
+            if digest is not None:
+                digest.update(view[:count])
+            self._advance(dest, count)
+
+    def _copy_fast(self, src, dst, dest, size):
+        """Try the kernel-side strategies in order; returns the one that worked, or None
+
+        A strategy that fails before writing anything is remembered as
+        unsupported between these two devices and skipped for later files.
+        """
+        src_fd = src.fileno()
+        dst_fd = dst.fileno()
+        devices = (os.fstat(src_fd).st_dev, os.fstat(dst_fd).st_dev)
+        for strategy in self.strategies:
+            if (strategy,) + devices in self._unsupported:
+                continue
+            self._checkpoint()
+            # Only a failure before any data moved falls through to the next strategy;
+            # anything later has already advanced both files and the progress
+            try:
+                if strategy == STRATEGY_CLONE:
+                    self._clone(src_fd, dst_fd)
+                    self._advance(dest, size)
+                    return strategy
+                if self._copy_range(strategy, src_fd, dst_fd, dest, size):
+                    return strategy
+            except _Unsupported:
+                pass
+            self._unsupported.add((strategy,) + devices)
+        return None
+
+    @staticmethod
+    def _clone(src_fd, dst_fd):
+        """Reflink the whole file; it either happens completely or not at all"""
+        try:
+            fcntl.ioctl(dst_fd, getattr(fcntl, "FICLONE", FICLONE), src_fd)
+        except OSError as e:
+            if e.errno in UNSUPPORTED_ERRNOS:
+                raise _Unsupported()
+            raise
+
+    def _copy_range(self, strategy, src_fd, dst_fd, dest, size):
+        """copy_file_range or sendfile in chunks, so cancel and progress still work"""
+        offset = 0
+        while True:
+            self._checkpoint()
+            try:
+                if strategy == STRATEGY_COPY_RANGE:
+                    count = os.copy_file_range(src_fd, dst_fd, self.chunk_size)
+                else:
+                    count = os.sendfile(dst_fd, src_fd, offset, self.chunk_size)
+            except OSError as e:
+                if offset == 0 and e.errno in UNSUPPORTED_ERRNOS:
+                    raise _Unsupported()
+                raise
+            if not count:
+                break
+            offset += count
+            self._advance(dest, count)
+        if offset == 0 and size:
+            raise _Unsupported()  # some filesystems report EOF instead of an error
+        return True
+
+    def _copy_mapped(self, src, dst, dest, size, digest):
+        """Write a large file from a memory map while a helper thread hashes the same pages
+
+        Both write() and sha256 release the GIL, so on a multi-core machine
+        the hash runs alongside the write instead of after it.
+        """
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            whole = memoryview(mapped)
+            chunks = queue.Queue(maxsize=HASH_QUEUE_DEPTH)
+            hasher = threading.Thread(target=_hash_chunks, args=(digest, chunks),
+                                      name="VirtuKeyHash", daemon=True)
+            hasher.start()
+            try:
+                for offset in range(0, size, self.chunk_size):
+                    self._checkpoint()
+                    chunk = whole[offset:offset + self.chunk_size]
+                    try:
+                        dst.write(chunk)
+                    except BaseException:
+                        chunk.release()
+                        raise
+                    chunks.put(chunk)
+                    self._advance(dest, len(chunk))
+            finally:
+                chunks.put(None)
+                hasher.join()
+                whole.release()
+
+    def strategy_counts(self):
+        """How many files of the last copy() each strategy handled"""
+        counts = {}
+        for strategy in self.used.values():
+            counts[strategy] = counts.get(strategy, 0) + 1
+        return counts
+
+    def snapshot(self):
+        """Current aggregate progress"""
+        with self._lock:
+            return self._snapshot(time.perf_counter())
+
+    def _snapshot(self, now):
+        return CopyProgress(self._bytes_done, self._bytes_total, self._files_done,
+                            self._files_total, now - self._started, self._current)
+
+    def _report(self, force=False):
+        if self.on_progress is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            if not force and now - self._last_report < self.progress_interval:
+                return
+            self._last_report = now
+            snapshot = self._snapshot(now)
+        self.on_progress(snapshot)
+
+
+class _Aborted(Exception):
+    """Internal: another worker failed, stop quietly"""
+
+
+class _Unsupported(Exception):
+    """Internal: this copy strategy doesn't work between these files"""
+
+
+def _hash_chunks(digest, chunks):
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return
+        digest.update(chunk)
+        chunk.release()  # the map can only close once every view is gone
+
+
+def _detach(dest):
+    """Unlink dest first if writing into it would change another file too
+
+    A hard link (e.g. into the shared store) shares its bytes with every
+    other link; a read-only file can't be opened for writing on Windows.
+    """
+    try:
+        st = os.lstat(dest)
+    except FileNotFoundError:
+        return
+    if st.st_nlink > 1 or not st.st_mode & stat.S_IWUSR:
+        remove_file(dest)
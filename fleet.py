@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Fleet deployment
+Installs into (or removes from) many user profiles at once, e.g. when
+preparing a shared VDI image. A plan file lists the targets; each one runs
+in a worker process so a failure, or a crash, only affects that profile.
+
+Plan file (JSON):
+    {
+      "action": "install",            # default for every target: install | uninstall | reinstall | repair
+      "max_workers": 8,               # optional, defaults to the CPU count
+      "payload_dir": "\\\\server\\share\\VirtuKey",   # optional payload folder or .vkb bundle
+      "patch_dir": "\\\\server\\share\\VirtuKey\\patches",   # optional, default <payload_dir>\\patches
+      "shared_store": true,            # optional: link from %ProgramData%\\VirtuKey\\store, or give a folder
+      "options": {"desktop_shortcut": true, "startmenu_shortcut": true,
+                  "autostart": false, "remove_settings": false},
+      "targets": [
+        {"profile": "C:\\Users\\alice", "sid": "S-1-5-21-...-1001"},
+        {"profile": "C:\\Users\\bob", "action": "uninstall", "install_path": "D:\\Apps\\VirtuKey"}
+      ]
+    }
+Per-target keys override the plan-wide ones. Several entries for the same
+profile run one after another, in plan order, in the same worker. "sid" is
+only needed for autostart or settings removal; that user's hive must be
+loaded under HKEY_USERS.
+"""
+
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+ACTIONS = ("install", "uninstall", "reinstall", "repair")
+OPTION_KEYS = ("desktop_shortcut", "startmenu_shortcut", "autostart", "remove_settings")
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"  # nothing installed to remove or repair
+
+
+def load_plan(path):
+    """Read a plan file and return (targets, max_workers); each target is a plain dict"""
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            plan = json.load(f)
+    except (OSError, ValueError) as e:
+        raise Exception(f"Could not read plan file {path}: {e}")
+    return parse_plan(plan)
+
+
+def parse_plan(plan):
+    """Validate a plan and flatten defaults into every target"""
+    if not isinstance(plan, dict) or not isinstance(plan.get("targets"), list):
+        raise Exception("Plan must be an object with a \"targets\" list.")
+
+    defaults = dict(plan.get("options") or {})
+    unknown = set(defaults) - set(OPTION_KEYS)
+    if unknown:
+        raise Exception(f"Unknown plan options: {', '.join(sorted(unknown))}")
+
+    targets = []
+    for i, entry in enumerate(plan["targets"]):
+        if not isinstance(entry, dict) or not entry.get("profile"):
+            raise Exception(f"Target {i + 1} needs a \"profile\" directory.")
+        action = entry.get("action", plan.get("action", "install"))
+        if action not in ACTIONS:
+            raise Exception(f"Target {i + 1}: unknown action {action!r}")
+        options = dict(defaults)
+        options.update({k: entry[k] for k in OPTION_KEYS if k in entry})
+        targets.append({
+            "profile": str(entry["profile"]),
+            "sid": entry.get("sid"),
+            "action": action,
+            "install_path": entry.get("install_path"),
+            "payload_dir": entry.get("payload_dir", plan.get("payload_dir")),
+            "patch_dir": entry.get("patch_dir", plan.get("patch_dir")),
+            "shared_store": entry.get("shared_store", plan.get("shared_store")),
+            "options": options,
+        })
+
+    max_workers = plan.get("max_workers")
+    if max_workers is not None and (not isinstance(max_workers, int) or max_workers < 1):
+        raise Exception("\"max_workers\" must be a positive integer.")
+    return targets, max_workers
+
+
+def _store_dir(shared_store):
+    """The plan's "shared_store": true for the default store, a folder, or false/absent for none"""
+    if not shared_store:
+        return None
+    if shared_store is True:
+        from store import default_store_dir
+        return str(default_store_dir())
+    return str(shared_store)
+
+
+def run_target(target):
+    """Deploy to one profile; runs in a worker process and never raises"""
+    import install_core as core
+
+    start = time.perf_counter()
+    options = target["options"]
+    install_path = target["install_path"] or core.default_install_path(target["profile"])
+    result = {"profile": target["profile"], "action": target["action"], "install_path": install_path,
+              "status": STATUS_FAILED, "error": None, "files": [], "warnings": [], "elapsed": 0.0}
+
+    install_options = core.InstallOptions(
+        install_path,
+        create_desktop_shortcut=options.get("desktop_shortcut", True),
+        create_startmenu_shortcut=options.get("startmenu_shortcut", True),
+        auto_start=options.get("autostart", False),
+        remove_settings=options.get("remove_settings", False),
+        profile_dir=target["profile"], user_sid=target["sid"], payload_dir=target["payload_dir"],
+        patch_dir=target["patch_dir"], store_dir=_store_dir(target["shared_store"]))
+
+    # install_core reports non-critical problems with print(); keep them per target
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            if (install_options.auto_start or install_options.remove_settings) and not target["sid"]:
+                # Without a SID the value would land in the deploying admin's HKCU
+                print("Warning: no \"sid\" for this profile; registry changes skipped")
+                install_options.auto_start = False
+                install_options.remove_settings = False
+
+            # Worker processes exit hard, so nothing is left to background threads here
+            core.sweep_tombstones(target["profile"], background=False)
+            if target["action"] == "install":
+                core.validate_install_path(install_path)
+                record = core.perform_installation(install_options)
+            elif not core.is_installed_at(install_path, core.InstallManifest.load(
+                    core.manifest_path(target["profile"]))):
+                result["status"] = STATUS_SKIPPED
+                record = None
+            elif target["action"] == "reinstall":
+                record = core.perform_reinstallation(install_options)
+            elif target["action"] == "repair":
+                record = core.perform_repair(install_options).record
+            else:
+                core.perform_uninstallation(install_options, background_delete=False)
+                record = None
+        if result["status"] != STATUS_SKIPPED:
+            result["status"] = STATUS_OK
+        if record is not None:
+            result["files"] = sorted(record.files)
+    except Exception as e:
+        result["error"] = str(e)
+
+    result["warnings"] = [line for line in output.getvalue().splitlines() if line.strip()]
+    result["elapsed"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_profile(targets):
+    """Every target of one profile, in plan order (they share a manifest and folders)"""
+    return [run_target(target) for target in targets]
+
+
+def _failed(target, error):
+    return {"profile": target["profile"], "action": target["action"], "install_path": target["install_path"],
+            "status": STATUS_FAILED, "error": error, "files": [], "warnings": [], "elapsed": 0.0}
+
+
+class FleetReport:
+    """Aggregated outcome of a fleet run, in plan order"""
+
+    def __init__(self, results, elapsed, max_workers):
+        self.results = results
+        self.elapsed = elapsed
+        self.max_workers = max_workers
+
+    def count(self, status):
+        return sum(1 for r in self.results if r["status"] == status)
+
+    @property
+    def ok(self):
+        return self.count(STATUS_FAILED) == 0
+
+    def summary(self):
+        return (f"{len(self.results)} targets in {self.elapsed:.2f}s with {self.max_workers} workers: "
+                f"{self.count(STATUS_OK)} ok, {self.count(STATUS_FAILED)} failed, "
+                f"{self.count(STATUS_SKIPPED)} skipped")
+
+    def to_dict(self):
+        return {
+            "ok": self.ok,
+            "targets": len(self.results),
+            "succeeded": self.count(STATUS_OK),
+            "failed": self.count(STATUS_FAILED),
+            "skipped": self.count(STATUS_SKIPPED),
+            "max_workers": self.max_workers,
+            "elapsed": round(self.elapsed, 3),
+            "results": self.results,
+        }
+
+
+def _run_isolated(group):
+    """One profile's targets in a process of its own, so a crash can't take others with it"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(run_profile, group).result()
+
+
+def run_fleet(targets, max_workers=None, progress=None):
+    """Run every target on a bounded process pool; progress(result, done, total) after each
+
+    If a worker dies (a crash, os._exit, the OOM killer) the shared pool
+    breaks and every unfinished profile with it, so those are run again,
+    each in a process of its own; only a profile that crashes there too
+    is reported as failed.
+    """
+    start = time.perf_counter()
+    groups = {}
+    for i, target in enumerate(targets):
+        groups.setdefault(os.path.normcase(os.path.abspath(target["profile"])), []).append(i)
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(groups) or 1))
+    results = [None] * len(targets)
+    done = 0
+    unfinished = []
+
+    def report(indexes, group_results):
+        nonlocal done
+        for i, result in zip(indexes, group_results):
+            results[i] = result
+            done += 1
+            if progress is not None:
+                progress(result, done, len(targets))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_profile, [targets[i] for i in indexes]): indexes
+                   for indexes in groups.values()}
+        for future in as_completed(futures):
+            indexes = futures[future]
+            try:
+                group_results = future.result()
+            except BrokenProcessPool:
+                unfinished.append(indexes)
+                continue
+            except Exception as e:
+                group_results = [_failed(targets[i], f"Worker failed: {e}") for i in indexes]
+            report(indexes, group_results)
+
+    if unfinished:
+        unfinished.sort()  # plan order
+        with ThreadPoolExecutor(max_workers=max_workers) as threads:
+            futures = {threads.submit(_run_isolated, [targets[i] for i in indexes]): indexes
+                       for indexes in unfinished}
+            for future in as_completed(futures):
+                indexes = futures[future]
+                try:
+                    group_results = future.result()
+                except Exception as e:
+                    group_results = [_failed(targets[i], f"Worker failed: {e}") for i in indexes]
+                report(indexes, group_results)
+
+    return FleetReport(results, time.perf_counter() - start, max_workers)
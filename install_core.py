@@ -0,0 +1,1144 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Core install/uninstall logic
+Shared by the GUI wizard and background workers; never touches Tk.
+"""
+
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+from bundle import BUNDLE_FILE_NAME, Bundle, BundleError, as_source, copy_source_stat
+from control_channel import ControlClient, ControlError
+from copy_engine import CopyEngine, CopyError, describe_progress
+from manifest import InstallManifest, InstallRecord, manifest_path
+from patch import PatchError, apply_patch, patch_for, read_header
+from processes import ProcessLocator, terminate_processes
+from reconcile import plan_sync, apply_sync, file_sha256
+from shellhost import default_runner
+from shelllink import ShellLinkError, read_shortcut, shortcut_for, write_shortcut
+from staging import (build_staging, verify_staging, swap_directories, adopt_staging, staging_paths,
+                     leftover_dirs, discard_tree, entomb, delete_tombstones, delete_in_background,
+                     remove_tree)
+from store import ContentStore, StoreCopier
+from taskgraph import TaskGraph
+from tracing import span, traced
+from verify_cache import VerifyCache, cache_path
+
+# winreg only exists on Windows; registry steps become warnings elsewhere
+try:
+    import winreg
+except ImportError:
+    winreg = None
+
+PAYLOAD_FILES = ["VirtuKey.exe", "VirtualDesktopAccessor.dll", "Icon.png"]
+PATCH_DIR_NAME = "patches"  # <name>.vkpatch upgrades, beside the payload
+RUN_KEY_PATH = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Run"
+
+# Reinstall strategies
+REINSTALL_STAGED = "staged"  # build beside the install, verify, swap by rename
+REINSTALL_DELTA = "delta"    # reconcile in place
+REINSTALL_CLEAN = "clean"    # remove everything, copy again
+
+
+def profile_home(profile_dir=None):
+    """Root of the user profile being installed into (the current user's by default)"""
+    return Path(profile_dir) if profile_dir else Path.home()
+
+
+def default_install_path(profile_dir=None):
+    """Default per-user installation directory (no admin rights required)"""
+    if profile_dir is None:
+        return os.path.join(os.path.expanduser("~"), "AppData", "Local", "VirtuKey")
+    return os.path.join(str(profile_dir), "AppData", "Local", "VirtuKey")
+
+
+def startmenu_dir(profile_dir=None):
+    """Per-user Start Menu folder that holds the VirtuKey shortcuts"""
+    return (profile_home(profile_dir) / "AppData" / "Roaming" / "Microsoft" / "Windows" /
+            "Start Menu" / "Programs" / "VirtuKey")
+
+
+def desktop_dir(profile_dir=None):
+    """Desktop folder of the user profile"""
+    return profile_home(profile_dir) / "Desktop"
+
+
+def get_resource_path(filename):
+    """Get path to resource file, works for both development and PyInstaller bundle"""
+    if hasattr(sys, '_MEIPASS'):
+        # Running as PyInstaller bundle
+        return os.path.join(sys._MEIPASS, 'resource', filename)
+    else:
+        # Running as script
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resource', filename)
+
+
+class InstallOptions:
+    """Snapshot of the wizard choices, safe to hand to a worker thread"""
+
+    def __init__(self, install_path, create_desktop_shortcut=True, create_startmenu_shortcut=True,
+                 auto_start=False, remove_shortcuts=True, remove_settings=False,
+                 profile_dir=None, user_sid=None, payload_dir=None, patch_dir=None, store_dir=None):
+        self.install_path = str(install_path)
+        self.create_desktop_shortcut = create_desktop_shortcut
+        self.create_startmenu_shortcut = create_startmenu_shortcut
+        self.auto_start = auto_start
+        self.remove_shortcuts = remove_shortcuts
+        self.remove_settings = remove_settings
+        # Installing into another user's profile (fleet mode); None means the current user
+        self.profile_dir = str(profile_dir) if profile_dir else None
+        self.user_sid = user_sid        # that user's SID, for registry values under HKEY_USERS
+        self.payload_dir = payload_dir  # payload source folder instead of the bundled resources
+        self.patch_dir = patch_dir      # binary patches folder instead of the one beside the payload
+        self.store_dir = str(store_dir) if store_dir else None  # shared content store to link from (store.py)
+
+
+class InstallCancelled(Exception):
+    """Raised inside a running job once the user has asked to cancel it"""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag checked by long-running steps"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """Raise InstallCancelled if cancellation was requested"""
+        if self._event.is_set():
+            raise InstallCancelled("Operation cancelled by user")
+
+
+def _report(progress, message, fraction=None):
+    if progress is not None:
+        progress(message, fraction)
+
+
+def _check(cancel):
+    if cancel is not None:
+        cancel.check()
+
+
+@traced("validate_install_path")
+def validate_install_path(install_path):
+    """Make sure the installation directory can be created and written to"""
+    install_path = str(install_path).strip()
+    if not install_path:
+        raise Exception("Please specify an installation directory.")
+
+    test_dir = Path(install_path)
+    try:
+        # Try to create the directory to test permissions
+        test_dir.mkdir(parents=True, exist_ok=True)
+
+        # Test write permissions
+        with span("permission_probe"):
+            test_file = test_dir / "permission_test.tmp"
+            test_file.write_text("test")
+            test_file.unlink()
+
+    except PermissionError:
+        raise Exception(f"Cannot write to the selected directory:\n{install_path}\n\n"
+                        f"Please choose a different location or run as administrator.")
+    except Exception as e:
+        raise Exception(f"Cannot access the installation directory:\n{str(e)}\n\n"
+                        f"Please choose a different location.")
+
+
+def bundle_candidates(payload_dir=None):
+    """Where a payload bundle may be, most preferred first"""
+    if payload_dir:
+        payload_dir = Path(payload_dir)
+        return [payload_dir] if payload_dir.is_file() else [payload_dir / BUNDLE_FILE_NAME]
+    candidates = [Path(get_resource_path(BUNDLE_FILE_NAME))]
+    if getattr(sys, 'frozen', False):
+        # A one-file build carries the bundle appended to the executable itself
+        candidates.insert(0, Path(sys.executable))
+    return candidates
+
+
+def open_payload_bundle(payload_dir=None):
+    """The first readable payload bundle, or None to use loose files"""
+    for candidate in bundle_candidates(payload_dir):
+        if not candidate.is_file():
+            continue
+        try:
+            return Bundle.open(candidate)
+        except BundleError as e:
+            if candidate.suffix.lower() != ".exe":
+                print(f"Warning: Ignoring payload bundle: {e}")
+    return None
+
+
+@traced("payload_sources")
+def payload_sources(payload_dir=None):
+    """Map each payload file name to its source; fails if any is missing
+
+    Sources are entries of a payload bundle when there is one (see
+    bundle.py), otherwise files in payload_dir or the resource folder.
+    """
+    bundle = open_payload_bundle(payload_dir)
+    if bundle is not None:
+        missing = [name for name in PAYLOAD_FILES if name not in bundle.entries]
+        if missing:
+            raise Exception(f"Source file not found: {missing[0]} in {bundle.path}")
+        return {name: bundle.entries[name] for name in PAYLOAD_FILES}
+
+    sources = {}
+    for file_name in PAYLOAD_FILES:
+        if payload_dir:
+            source_file = Path(payload_dir) / file_name
+        else:
+            source_file = Path(get_resource_path(file_name))
+        if not source_file.exists():
+            raise Exception(f"Source file not found: {source_file}")
+        sources[file_name] = source_file
+    return sources
+
+
+def patch_dir_for(payload_dir=None, patch_dir=None):
+    """Where upgrade patches are looked up; a missing folder just means no patches"""
+    if patch_dir:
+        return Path(patch_dir)
+    if payload_dir:
+        return Path(payload_dir) / PATCH_DIR_NAME
+    return Path(get_resource_path(PATCH_DIR_NAME))
+
+
+def make_patcher(patch_dir, cache):
+    """Build patcher(name, source, installed, dest) -> True if dest was made by patching
+
+    A patch is only used when it produces exactly the payload's source file
+    from exactly the installed build; any problem means a full copy instead.
+    """
+    def patcher(name, source, installed, dest):
+        patch_file = patch_for(patch_dir, name)
+        if patch_file is None or not Path(installed).is_file():
+            return False
+        try:
+            header = read_header(patch_file)
+            if (header.target_size != as_source(source).stat().st_size
+                    or cache.digest(source) != header.target_sha256):
+                raise PatchError(f"{patch_file.name} does not produce this version of {name}")
+            with span("apply_patch", file=name, bytes=patch_file.stat().st_size):
+                sha256 = apply_patch(patch_file, installed, dest, cache.digest(installed))
+            # Same timestamps a full copy would leave, for the delta check and the cache
+            copy_source_stat(source, dest)
+        except (PatchError, OSError) as e:
+            print(f"Warning: {e}; copying the full file instead")
+            return False
+        cache.store(dest, sha256)
+        return True
+    return patcher
+
+
+def _patcher_for(options, cache):
+    # A patched file would be a private copy; installs linked to the shared store stay linked
+    if options.store_dir:
+        return None
+    return make_patcher(patch_dir_for(options.payload_dir, options.patch_dir), cache)
+
+
+def make_copier(options, cache, cancel=None):
+    """The copy engine for a job; with a shared store, one that hard-links files from it"""
+    engine = CopyEngine(cancel=cancel, hash_files=True, known_digest=cache.lookup)
+    if not options.store_dir:
+        return engine
+    store = ContentStore(options.store_dir)
+    return StoreCopier(store, engine, store.load_cache().digest)
+
+
+@traced("perform_installation")
+def perform_installation(options, progress=None, cancel=None, delta=False, prestaged=None):
+    """Perform the actual installation
+
+    With delta=True the existing install is reconciled instead of overwritten:
+    only changed files are copied and only orphaned files deleted.
+    prestaged is a verified staging dir (see prestage.py) to move into place
+    instead of copying.
+    """
+    # Files are hashed as they stream; the cache keeps those hashes for later runs
+    cache = VerifyCache.load(cache_path(options.profile_dir))
+    engine = make_copier(options, cache, cancel)
+    install_dir = Path(options.install_path)
+    existed = install_dir.exists()
+    # Shortcuts and autostart of a first install are taken back if it fails; an earlier install keeps its own
+    fresh = not delta and not is_installed_at(install_dir, InstallManifest.load(manifest_path(options.profile_dir)))
+    adopted_dir = None
+    adopted = []
+    try:
+        sources = payload_sources(options.payload_dir)
+        if prestaged is not None:
+            _check(cancel)
+            _report(progress, "Moving files into place...", 0.0)
+            try:
+                with span("adopt_staging"):
+                    adopt_staging(prestaged, install_dir)
+                cache.move(prestaged, install_dir)
+            except OSError as e:
+                print(f"Warning: Could not use the prepared files, copying instead: {e}")
+                discard_tree(prestaged)
+            else:
+                if existed:
+                    adopted = [install_dir / name for name in sources]
+                else:
+                    adopted_dir = install_dir
+                # Outside the try: a failure to register is an install error, not a reason to copy again
+                return _register_installation(options, sources, progress, cancel, cache, undo=fresh)
+
+        # Create installation directory
+        _report(progress, "Creating installation directory...", 0.0)
+        install_dir.mkdir(parents=True, exist_ok=True)
+
+        def copy_payload():
+            # File copies account for the first 85% of the bar
+            engine.on_progress = lambda p: _report(progress, describe_progress(p), 0.85 * p.fraction)
+            try:
+                if delta:
+                    _report(progress, "Comparing installed files...", 0.0)
+                    with span("plan_sync", files=len(sources)) as s:
+                        plan = plan_sync(sources, install_dir, hash_func=cache.digest, known_digest=cache.lookup)
+                        s.set(plan=plan.summary())
+                    _report(progress, f"Updating files: {plan.summary()}", 0.0)
+                    patcher = _patcher_for(options, cache)
+                    if patcher is not None:
+                        plan.copy = [(source, dest) for source, dest in plan.copy
+                                     if not patcher(dest.relative_to(install_dir).as_posix(), source, dest, dest)]
+                    with span("apply_sync") as s:
+                        apply_sync(plan, engine)
+                        s.set(strategies=engine.strategy_counts())
+                    copied = plan.copy
+                else:
+                    copied = [(source, install_dir / name) for name, source in sources.items()]
+                    with span("copy_payload", files=len(sources)) as s:
+                        engine.copy(copied)
+                        s.set(strategies=engine.strategy_counts())
+            except CopyError as e:
+                raise Exception(_copy_error_message(e))
+            _record_copies(cache, copied, engine)
+
+        # Shortcuts and autostart don't need the copied bytes and run alongside the copy
+        return _register_installation(options, sources, progress, cancel, cache, payload=copy_payload,
+                                      undo=fresh)
+
+    except Exception as e:
+        cancelled = isinstance(e, InstallCancelled)
+        # Roll back the files this run already placed, on cancel and whenever a
+        # first install fails, so a broken copy never looks installed; a delta
+        # run only replaced outdated files with new ones, so those stay
+        if cancelled or fresh:
+            if adopted_dir is not None:
+                discard_tree(adopted_dir)  # the install folder the staging dir became
+            for dest_file in ([] if delta else engine.completed + adopted):
+                try:
+                    dest_file.unlink()
+                except OSError:
+                    pass
+            if not existed:
+                try:
+                    install_dir.rmdir()
+                except OSError:
+                    pass
+        if cancelled:
+            raise
+        raise Exception(f"Installation failed: {str(e)}")
+
+
+def _copy_error_message(e):
+    if isinstance(e.error, PermissionError):
+        return f"Permission denied when copying {Path(e.dest).name}. Please check folder permissions."
+    return str(e)
+
+
+def _record_copies(cache, copied, engine):
+    """Keep the streamed hashes; a copy that disagrees with a known source hash is an error"""
+    with span("record_digests", files=len(copied)):
+        mismatched = cache.record_copies(copied, engine.digests)
+    if mismatched:
+        # Never leave a file behind that doesn't match what it was copied from
+        for dest in mismatched:
+            try:
+                dest.unlink()
+            except OSError:
+                pass
+        raise Exception(f"{mismatched[0].name} was not copied intact. Please try again.")
+
+
+def _update_store_refs(options, record, previous=None):
+    """Tell the shared store which of its objects this install links to now"""
+    try:
+        if options.store_dir:
+            store = ContentStore(options.store_dir)
+            files = {name: info["sha256"] for name, info in record.files.items()}
+            with span("store_retain"):
+                store.retain(options.install_path, store.linked_hashes(options.install_path, files))
+            record.store = options.store_dir
+        if previous is not None and previous.store and previous.store != record.store:
+            ContentStore(previous.store).release(options.install_path)
+    except Exception as e:
+        print(f"Warning: Could not update the shared store's references: {e}")
+
+
+def _release_store(store_dir, install_path, background=False):
+    try:
+        with span("store_release"):
+            ContentStore(store_dir).release(install_path)
+    except Exception as e:
+        # Off the main thread stdout may already hold a --silent JSON result
+        print(f"Warning: Could not release files in the shared store: {e}",
+              file=sys.stderr if background else None)
+
+
+def _step(progress, message, func, *args):
+    def run():
+        _report(progress, message)
+        return func(*args)
+    return run
+
+
+def install_steps(options, progress=None, payload=None, undo=False):
+    """The install as a TaskGraph: payload() plus the shortcut and autostart steps
+
+    The shortcuts and the Run-key value only need the install path, so
+    none of them waits for another or for the payload. With undo they are
+    removed again if the payload fails or the job is cancelled.
+    """
+    graph = TaskGraph()
+    if payload is not None:
+        graph.add("payload", payload)
+    remove_links = (lambda paths: remove_recorded_shortcuts(paths, options.profile_dir)) if undo else None
+    if options.create_desktop_shortcut:
+        graph.add("desktop_shortcut",
+                  _step(progress, "Creating desktop shortcut...", _desktop_shortcut,
+                        options.install_path, options.profile_dir),
+                  critical=False, warning="Could not create desktop shortcut", undo=remove_links)
+    if options.create_startmenu_shortcut:
+        graph.add("startmenu_shortcut",
+                  _step(progress, "Creating Start Menu shortcuts...", _startmenu_shortcut,
+                        options.install_path, options.profile_dir),
+                  critical=False, warning="Could not create start menu shortcut", undo=remove_links)
+        graph.add("uninstall_shortcut",
+                  _step(progress, "Creating Start Menu shortcuts...", _uninstall_shortcut, options.profile_dir),
+                  critical=False, warning="Could not create uninstall shortcut", undo=remove_links)
+    if options.auto_start:
+        graph.add("autostart",
+                  _step(progress, "Registering automatic startup...", _write_startup,
+                        options.install_path, options.user_sid),
+                  critical=False, warning="Could not add to startup",
+                  undo=(lambda values: remove_user_settings(options.user_sid)) if undo else None)
+    return graph
+
+
+def _register_installation(options, sources, progress=None, cancel=None, cache=None, payload=None, undo=False):
+    """Shortcuts, autostart and the manifest record, alongside payload() if the files aren't in place yet"""
+    graph = install_steps(options, progress, payload, undo)
+    graph.run(cancel)
+    shortcuts = []
+    for name in ("desktop_shortcut", "startmenu_shortcut", "uninstall_shortcut"):
+        shortcuts += graph.value(name, [])
+    registry = graph.value("autostart", [])
+
+    # Record what this install put on the machine
+    _report(progress, "Recording installation...", 0.98)
+    if cache is None:
+        cache = VerifyCache.load(cache_path(options.profile_dir))
+    with span("record_manifest"):
+        manifest = InstallManifest.load(manifest_path(options.profile_dir))
+        record = InstallRecord.capture(options.install_path, sources, shortcuts, registry,
+                                       previous=manifest.get(options.install_path), hash_func=cache.digest)
+        _update_store_refs(options, record, manifest.get(options.install_path))
+        manifest.put(record)
+        manifest.save()
+    try:
+        if cache.dirty:
+            cache.save()
+    except OSError as e:
+        print(f"Warning: Could not save the verification cache: {e}")
+
+    _report(progress, "Installation complete.", 1.0)
+    return record
+
+
+@traced("perform_staged_reinstallation")
+def perform_staged_reinstallation(options, progress=None, cancel=None, before_swap=None, prestaged=None):
+    """Reinstall without touching the current files until the new ones are ready
+
+    The payload is staged and verified in a sibling directory, then two
+    renames switch versions. before_swap() runs right before the switch
+    (e.g. to close VirtuKey), so downtime is the renames plus a restart.
+    prestaged is a staging dir already built and verified in the background.
+    """
+    install_dir = Path(options.install_path)
+    staging_dir, retired_dir = staging_paths(install_dir)
+    if prestaged is not None:
+        staging_dir = Path(prestaged)
+    cache = VerifyCache.load(cache_path(options.profile_dir))
+    engine = make_copier(options, cache, cancel)
+    try:
+        for leftover in leftover_dirs(install_dir):
+            if leftover != staging_dir:
+                discard_tree(leftover)
+        sources = payload_sources(options.payload_dir)
+
+        if prestaged is None:
+            _report(progress, "Preparing the new version...", 0.0)
+            engine.on_progress = lambda p: _report(progress, describe_progress(p), 0.75 * p.fraction)
+            with span("stage_payload") as s:
+                patcher = _patcher_for(options, cache)
+                copied = build_staging(sources, install_dir, staging_dir, engine, cache.digest, patcher,
+                                       known_digest=cache.lookup)
+                s.set(copied=len(copied), strategies=engine.strategy_counts())
+
+            _check(cancel)
+            _report(progress, "Verifying the new files...", 0.78)
+            with span("verify_staging"):
+                verify_staging(copied, engine.digests, cache.lookup)
+            cache.record_copies(copied, engine.digests)
+
+        _check(cancel)
+        if before_swap is not None:
+            before_swap()
+        _report(progress, "Switching to the new version...", 0.85)
+        with span("swap_directories"):
+            retired = swap_directories(staging_dir, install_dir, retired_dir)
+        cache.move(staging_dir, install_dir)
+    except InstallCancelled:
+        discard_tree(staging_dir)
+        raise
+    except CopyError as e:
+        discard_tree(staging_dir)
+        raise Exception(f"Reinstallation failed: {_copy_error_message(e)}")
+    except Exception as e:
+        discard_tree(staging_dir)
+        raise Exception(f"Reinstallation failed: {str(e)}")
+
+    # The new version is live; the rest can no longer be rolled back, so it isn't cancellable
+    if retired is not None:
+        with span("discard_retired"):
+            discard_tree(retired)
+    try:
+        return _register_installation(options, sources, progress, cache=cache)
+    except Exception as e:
+        raise Exception(f"Reinstallation failed: {str(e)}")
+
+
+def _create_shortcut_powershell(shortcut_path, target, working_dir, description, arguments="", icon_location=""):
+    """Fallback: create a shortcut through WScript.Shell in the shared PowerShell host"""
+    ps_script = f'''
+$WshShell = New-Object -comObject WScript.Shell
+$Shortcut = $WshShell.CreateShortcut("{shortcut_path}")
+$Shortcut.TargetPath = "{target}"
+$Shortcut.WorkingDirectory = "{working_dir}"
+$Shortcut.Description = "{description}"
+'''
+    if arguments:
+        ps_script += f"$Shortcut.Arguments = '{arguments}'\n"
+    if icon_location:
+        ps_script += f'$Shortcut.IconLocation = "{icon_location}"\n'
+    ps_script += "$Shortcut.Save()\n"
+    default_runner().script(ps_script, name="create_shortcut").check()
+
+
+def create_shortcut(shortcut_path, target, working_dir, description, arguments="", icon_location=""):
+    """Write a .lnk in-process; PowerShell is only used for links the native writer can't express"""
+    with span("create_shortcut", path=shortcut_path) as s:
+        try:
+            link = shortcut_for(str(target), arguments, str(working_dir), description, str(icon_location))
+            write_shortcut(shortcut_path, link)
+        except ShellLinkError:
+            s.set(fallback="powershell")
+            _create_shortcut_powershell(shortcut_path, target, working_dir, description, arguments, icon_location)
+
+
+def _desktop_shortcut(install_path, profile_dir=None):
+    shortcut_path = desktop_dir(profile_dir) / "VirtuKey.lnk"
+    exe_path = Path(install_path) / "VirtuKey.exe"
+    create_shortcut(shortcut_path, exe_path, Path(install_path),
+                    "VirtuKey - Virtual Desktop Manager", icon_location=exe_path)
+    return [shortcut_path]
+
+
+def _startmenu_shortcut(install_path, profile_dir=None):
+    # Create VirtuKey folder in Start Menu
+    startmenu_path = startmenu_dir(profile_dir)
+    startmenu_path.mkdir(parents=True, exist_ok=True)
+    shortcut_path = startmenu_path / "VirtuKey.lnk"
+    exe_path = Path(install_path) / "VirtuKey.exe"
+    create_shortcut(shortcut_path, exe_path, Path(install_path),
+                    "VirtuKey - Virtual Desktop Manager", icon_location=exe_path)
+    return [shortcut_path]
+
+
+def _uninstall_shortcut(profile_dir=None):
+    startmenu_path = startmenu_dir(profile_dir)
+    startmenu_path.mkdir(parents=True, exist_ok=True)
+    uninstall_shortcut = startmenu_path / "Uninstall VirtuKey.lnk"
+    installer_path = Path(__file__).resolve().parent / "installer.py"
+
+    # A shell link needs an absolute target; unresolved names go through PowerShell
+    python_exe = shutil.which("python.exe") or "python.exe"
+    create_shortcut(uninstall_shortcut, python_exe, installer_path.parent,
+                    "Uninstall VirtuKey", arguments=f'"{installer_path}"')
+    return [uninstall_shortcut]
+
+
+def create_desktop_shortcut_file(install_path, profile_dir=None):
+    """Create desktop shortcut; returns the shortcut paths created"""
+    try:
+        return _desktop_shortcut(install_path, profile_dir)
+    except Exception as e:
+        # Non-critical error - don't fail installation
+        print(f"Warning: Could not create desktop shortcut: {e}")
+        return []
+
+
+def create_startmenu_shortcut_file(install_path, profile_dir=None):
+    """Create start menu shortcuts; returns the shortcut paths created"""
+    created = []
+    try:
+        created += _startmenu_shortcut(install_path, profile_dir)
+        # Also create an uninstall shortcut
+        created += _uninstall_shortcut(profile_dir)
+    except Exception as e:
+        # Non-critical error - don't fail installation
+        print(f"Warning: Could not create start menu shortcut: {e}")
+    return created
+
+
+def _run_key(user_sid=None):
+    """(hive handle, hive name, key path) of the Run key for the current user or a loaded user hive"""
+    if user_sid:
+        return winreg.HKEY_USERS, "HKU", f"{user_sid}\\{RUN_KEY_PATH}"
+    return winreg.HKEY_CURRENT_USER, "HKCU", RUN_KEY_PATH
+
+
+@traced("registry_write")
+def _write_startup(install_path, user_sid=None):
+    if winreg is None:
+        raise OSError("registry is not available on this platform")
+    exe_path = Path(install_path) / "VirtuKey.exe"
+
+    # Add to registry for the user's startup
+    hive, hive_name, key_path = _run_key(user_sid)
+    with winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE) as key:
+        winreg.SetValueEx(key, "VirtuKey", 0, winreg.REG_SZ, str(exe_path))
+    return [{"hive": hive_name, "key": key_path, "name": "VirtuKey", "value": str(exe_path)}]
+
+
+def add_to_startup(install_path, user_sid=None):
+    """Add to Windows startup using registry; returns the values written"""
+    try:
+        return _write_startup(install_path, user_sid)
+    except Exception as e:
+        # Non-critical error - don't fail installation
+        print(f"Warning: Could not add to startup: {e}")
+        return []
+
+
+def startup_value(user_sid=None):
+    """The VirtuKey value under the Run key, or None if it is missing or can't be read"""
+    if winreg is None:
+        return None
+    hive, _, key_path = _run_key(user_sid)
+    try:
+        with winreg.OpenKey(hive, key_path, 0, winreg.KEY_READ) as key:
+            value, _ = winreg.QueryValueEx(key, "VirtuKey")
+            return value
+    except OSError:
+        return None
+
+
+@traced("is_virtukey_running")
+def is_virtukey_running():
+    """Check if VirtuKey is currently running; returns (is_running, pid)"""
+    return ProcessLocator().is_running()
+
+
+@traced("close_running_virtukey")
+def close_running_virtukey(progress=None):
+    """Terminate every running VirtuKey instance and wait until they have exited"""
+    locator = ProcessLocator()
+    pids, _ = locator.find_all()
+    pid = locator.from_pid_file()
+    if pid is not None:
+        pids.append(pid)
+    if not pids:
+        return
+
+    _report(progress, "Closing VirtuKey...", 0.0)
+    # Ask politely over the control channel first; its reply arrives when
+    # VirtuKey has actually exited, so there is nothing to poll
+    with span("control_shutdown") as s:
+        try:
+            reply = ControlClient().shutdown()
+            pids = [p for p in pids if p != reply.get("pid")]
+        except ControlError as e:
+            s.set(unavailable=e)
+    if not pids:
+        return
+    result = terminate_processes(pids)
+    if not result.ok:
+        raise Exception("Could not close VirtuKey automatically. Please close it manually.")
+
+
+@traced("remove_install_dir")
+def remove_install_dir(install_path, progress=None, cancel=None):
+    """Remove the installation directory and everything in it"""
+    _check(cancel)
+    install_dir = Path(install_path)
+    if install_dir.exists():
+        _report(progress, "Removing installed files...", 0.1)
+        try:
+            remove_tree(install_dir)
+        except PermissionError:
+            raise Exception("Permission denied when removing installed files. Please close VirtuKey and try again.")
+
+
+@traced("entomb_install_dir")
+def entomb_install_dir(install_path, progress=None, cancel=None):
+    """Rename the installation directory to a tombstone; returns it, or None if there was nothing"""
+    _check(cancel)
+    install_dir = Path(install_path)
+    if not install_dir.exists():
+        return None
+    _report(progress, "Removing installed files...", 0.1)
+    try:
+        return entomb(install_dir)
+    except PermissionError:
+        raise Exception("Permission denied when removing installed files. Please close VirtuKey and try again.")
+
+
+def uninstall_steps(options, record=None, progress=None, cancel=None):
+    """The uninstall as a TaskGraph: the install folder first, then shortcuts and settings side by side
+
+    Nothing else is removed unless the folder could be moved aside (it
+    can't while VirtuKey still holds its files). cancel is only honoured
+    up to that rename; after it the uninstall runs to the end, so it never
+    stops with the files restored but the shortcuts already gone.
+    """
+    graph = TaskGraph()
+    graph.add("entomb", lambda: entomb_install_dir(options.install_path, progress, cancel))
+
+    def remove_shortcuts():
+        _report(progress, "Removing shortcuts...", 0.6)
+        if record is not None:
+            remove_recorded_shortcuts(record.shortcuts, options.profile_dir)
+        else:
+            remove_desktop_shortcut(options.profile_dir)
+            remove_startmenu_shortcut(options.profile_dir)
+
+    def remove_settings():
+        _report(progress, "Removing settings...", 0.8)
+        remove_user_settings(options.user_sid)
+
+    if options.remove_shortcuts:
+        graph.add("remove_shortcuts", remove_shortcuts, deps=("entomb",), critical=False,
+                  warning="Could not remove shortcuts")
+    if options.remove_settings:
+        graph.add("remove_settings", remove_settings, deps=("entomb",), critical=False,
+                  warning="Could not remove settings")
+    return graph
+
+
+@traced("perform_uninstallation")
+def perform_uninstallation(options, progress=None, cancel=None, background_delete=True):
+    """Perform the actual uninstallation
+
+    The manifest record says exactly which shortcuts and registry values this
+    install created; installs that predate the manifest use the fixed locations.
+    The install directory is renamed to a tombstone first, so the files are
+    gone at once whatever their size; with background_delete the tombstone is
+    deleted on the thread this returns (see sweep_tombstones for interrupted
+    deletes). Returns None when nothing is left to delete. Files shared
+    through the content store are released once their links are gone, and
+    the installer's own folder is removed once no install is left.
+    """
+    tombstone = None
+    store_dir = None
+    try:
+        manifest = InstallManifest.load(manifest_path(options.profile_dir))
+        record = manifest.get(options.install_path)
+
+        graph = uninstall_steps(options, record, progress, cancel)
+        try:
+            graph.run()
+        finally:
+            tombstone = graph.value("entomb")
+
+        if record is not None:
+            store_dir = record.store
+        if tombstone is not None and not background_delete:
+            delete_tombstones([tombstone])
+        changed = record is not None
+        if tombstone is not None and tombstone.exists():
+            # Recorded so the next run finishes the job if this process dies first
+            manifest.tombstones.append(str(tombstone))
+            changed = True
+        if record is not None:
+            manifest.remove(options.install_path)
+        if changed:
+            manifest.save()
+
+        _report(progress, "Uninstallation complete.", 1.0)
+
+    except InstallCancelled:
+        # Only possible before the folder was moved aside: nothing was changed
+        raise
+    except Exception as e:
+        raise Exception(f"Uninstallation failed: {str(e)}")
+
+    if tombstone is not None and background_delete:
+        def finish():
+            if store_dir:
+                _release_store(store_dir, options.install_path, background=True)
+            remove_installer_state(options.profile_dir, background=True)
+        return delete_in_background([tombstone], then=finish)
+    if store_dir:
+        _release_store(store_dir, options.install_path)
+    remove_installer_state(options.profile_dir)
+    return None
+
+
+def remove_installer_state(profile_dir=None, background=False):
+    """Delete the installer's own folder (manifest, verification cache) once nothing is installed
+
+    Kept while any install is recorded or a tombstone still waits to be
+    deleted; returns True if the folder was removed.
+    """
+    path = manifest_path(profile_dir)
+    try:
+        manifest = InstallManifest.load(path)
+        if manifest.records or any(Path(p).exists() for p in manifest.tombstones):
+            return False
+        if path.parent.exists():
+            shutil.rmtree(path.parent)
+        return True
+    except OSError as e:
+        print(f"Warning: Could not remove the installer's state folder: {e}",
+              file=sys.stderr if background else None)
+        return False
+
+
+def sweep_tombstones(profile_dir=None, background=True):
+    """Delete tombstones left by earlier uninstalls that didn't get to finish
+
+    Returns the background thread, or None when there was nothing to do or
+    background is False (then the deletion has happened already).
+    """
+    manifest = InstallManifest.load(manifest_path(profile_dir))
+    if not manifest.tombstones:
+        return None
+    pending = [Path(p) for p in manifest.tombstones if Path(p).exists()]
+    if not background:
+        delete_tombstones(pending)
+        pending = [p for p in pending if p.exists()]
+    if len(pending) != len(manifest.tombstones):
+        # Finished ones drop out of the list; the rest are retried next time
+        manifest.tombstones = [str(p) for p in pending]
+        try:
+            manifest.save()
+        except OSError as e:
+            print(f"Warning: Could not update the install manifest: {e}")
+    if pending and background:
+        return delete_in_background(pending)
+    return None
+
+
+@traced("perform_reinstallation")
+def perform_reinstallation(options, progress=None, cancel=None, mode=REINSTALL_STAGED, before_swap=None,
+                           prestaged=None):
+    """Reinstall: staged swap (default), reconcile in place (delta) or remove and copy again (clean)
+
+    before_swap() runs once the old files are about to be replaced; in the
+    staged mode that is after the new version is ready. prestaged is only
+    used by the staged mode.
+    """
+    if mode == REINSTALL_STAGED:
+        return perform_staged_reinstallation(options, progress, cancel, before_swap, prestaged)
+    if before_swap is not None:
+        before_swap()
+    if mode == REINSTALL_CLEAN:
+        remove_install_dir(options.install_path, progress, cancel)
+        return perform_installation(options, progress, cancel)
+    return perform_installation(options, progress, cancel, delta=True)
+
+
+class RepairReport:
+    """What a repair found wrong and put right"""
+
+    def __init__(self):
+        self.checked = 0        # payload files looked at
+        self.files = []         # payload files restored
+        self.shortcuts = []     # shortcuts recreated
+        self.registry = []      # registry values written again
+        self.mismatched = []    # restored from a payload of another version
+        self.record = None      # the install's manifest record once repaired
+
+    @property
+    def repaired(self):
+        return bool(self.files or self.shortcuts or self.registry)
+
+    def summary(self):
+        if not self.repaired:
+            return f"All {self.checked} files, shortcuts and settings are intact; nothing needed repair."
+        parts = []
+        if self.files:
+            parts.append(f"{len(self.files)} file(s) restored ({', '.join(self.files)})")
+        if self.shortcuts:
+            parts.append(f"{len(self.shortcuts)} shortcut(s) recreated")
+        if self.registry:
+            parts.append("automatic startup registered again")
+        return "; ".join(parts) + "."
+
+    def to_dict(self):
+        return {"checked": self.checked, "files": self.files, "shortcuts": self.shortcuts,
+                "registry": self.registry, "mismatched": self.mismatched}
+
+
+def damaged_files(install_dir, sources, record, cache, full_check=False):
+    """Payload files that are missing or no longer what was installed
+
+    A file whose size and mtime still match the manifest record is trusted
+    without being read, unless full_check; the rest are hashed (or answered
+    from the verification cache) and compared with the recorded hash. Files
+    the record doesn't know are compared with the payload instead.
+    full_check also bypasses the verification cache, which trusts stat too.
+    """
+    damaged = []
+    for name, source in sources.items():
+        path = Path(install_dir) / name
+        expected = record.files.get(name) if record is not None else None
+        try:
+            st = path.stat()
+        except OSError:
+            damaged.append(name)
+            continue
+        if expected is None:
+            source = as_source(source)
+            expected = {"size": source.stat().st_size, "mtime_ns": None, "sha256": cache.digest(source)}
+        if st.st_size != expected["size"]:
+            damaged.append(name)
+        elif full_check:
+            sha256 = file_sha256(path)
+            cache.store(path, sha256)
+            if sha256 != expected["sha256"]:
+                damaged.append(name)
+        elif st.st_mtime_ns != expected["mtime_ns"] and cache.digest(path) != expected["sha256"]:
+            damaged.append(name)
+    return damaged
+
+
+def _shortcut_intact(shortcut, exe_path):
+    """Is the shortcut there and, for the VirtuKey links, still pointing at the exe?"""
+    shortcut = Path(shortcut)
+    if not shortcut.is_file():
+        return False
+    if shortcut.name != "VirtuKey.lnk":
+        return True
+    try:
+        target = read_shortcut(shortcut).target
+    except (ShellLinkError, OSError, ValueError):
+        return False
+    return os.path.normcase(target) == os.path.normcase(str(exe_path))
+
+
+@traced("perform_repair")
+def perform_repair(options, progress=None, cancel=None, before_fix=None, full_check=False):
+    """Check an install against its manifest record and fix only what differs
+
+    Payload files that are missing or changed are copied again from the
+    payload, recorded shortcuts that are gone or point elsewhere are
+    recreated, and a recorded Run-key value that was removed or altered is
+    written again. Intact files are judged by stat against the record, so a
+    healthy install costs one stat per file; full_check hashes them all.
+    before_fix() runs before the first file is replaced (e.g. to close
+    VirtuKey). Returns a RepairReport.
+    """
+    report = RepairReport()
+    install_dir = Path(options.install_path)
+    try:
+        manifest = InstallManifest.load(manifest_path(options.profile_dir))
+        record = manifest.get(options.install_path)
+        if record is None and not is_installed_at(install_dir, manifest):
+            raise Exception(f"No VirtuKey installation was found at {install_dir}. Please install it instead.")
+        if record is not None and record.store and not options.store_dir:
+            options.store_dir = record.store  # stay linked to the store the install uses
+        cache = VerifyCache.load(cache_path(options.profile_dir))
+        sources = payload_sources(options.payload_dir)
+
+        _check(cancel)
+        _report(progress, "Checking installed files...", 0.0)
+        with span("check_files", files=len(sources)) as s:
+            damaged = damaged_files(install_dir, sources, record, cache, full_check)
+            s.set(damaged=len(damaged))
+        report.checked = len(sources)
+
+        if damaged:
+            _check(cancel)
+            if before_fix is not None:
+                before_fix()
+            for name in damaged:
+                expected = record.files.get(name) if record is not None else None
+                if expected is not None and cache.digest(sources[name]) != expected["sha256"]:
+                    report.mismatched.append(name)
+            _report(progress, f"Restoring {len(damaged)} file(s)...", 0.1)
+            if options.store_dir and record is not None:
+                dropped = ContentStore(options.store_dir).drop_damaged(
+                    install_dir, {name: record.files[name]["sha256"] for name in damaged if name in record.files})
+                if dropped:
+                    print(f"Warning: The shared store's copy of {', '.join(dropped)} was damaged too; "
+                          f"other installs linked to it need a repair as well")
+            install_dir.mkdir(parents=True, exist_ok=True)
+            engine = make_copier(options, cache, cancel)
+            engine.on_progress = lambda p: _report(progress, describe_progress(p), 0.1 + 0.7 * p.fraction)
+            copied = [(sources[name], install_dir / name) for name in damaged]
+            try:
+                with span("restore_files", files=len(copied)) as s:
+                    engine.copy(copied)
+                    s.set(strategies=engine.strategy_counts())
+            except CopyError as e:
+                raise Exception(_copy_error_message(e))
+            _record_copies(cache, copied, engine)
+            report.files = damaged
+            if report.mismatched:
+                print(f"Warning: {', '.join(report.mismatched)} came from a different VirtuKey version than "
+                      f"the rest of the installation; use Reinstall to update everything")
+
+        shortcuts = list(record.shortcuts) if record is not None else []
+        registry = list(record.registry) if record is not None else []
+        exe_path = install_dir / "VirtuKey.exe"
+
+        _check(cancel)
+        _report(progress, "Checking shortcuts...", 0.85)
+        broken = [s for s in shortcuts if not _shortcut_intact(s, exe_path)]
+        if any(Path(s).parent == desktop_dir(options.profile_dir) for s in broken):
+            report.shortcuts += [str(s) for s in create_desktop_shortcut_file(options.install_path,
+                                                                              options.profile_dir)]
+        if any(Path(s).parent == startmenu_dir(options.profile_dir) for s in broken):
+            report.shortcuts += [str(s) for s in create_startmenu_shortcut_file(options.install_path,
+                                                                                options.profile_dir)]
+        shortcuts += [s for s in report.shortcuts if s not in shortcuts]
+
+        _check(cancel)
+        if registry:
+            _report(progress, "Checking automatic startup...", 0.9)
+            if winreg is None:
+                print("Warning: Could not check automatic startup: registry is not available on this platform")
+            elif any(startup_value(options.user_sid) != entry["value"] for entry in registry):
+                written = add_to_startup(options.install_path, options.user_sid)
+                report.registry = [entry["value"] for entry in written]
+                registry = written or registry
+
+        if report.repaired or record is None:
+            _report(progress, "Recording installation...", 0.95)
+            with span("record_manifest"):
+                repaired = InstallRecord.capture(options.install_path, sources, shortcuts, registry,
+                                                 previous=record, hash_func=cache.digest)
+                if record is not None:
+                    repaired.installed_at = record.installed_at
+                _update_store_refs(options, repaired, record)
+                manifest.put(repaired)
+                manifest.save()
+            record = repaired
+        report.record = record
+        try:
+            if cache.dirty:
+                cache.save()
+        except OSError as e:
+            print(f"Warning: Could not save the verification cache: {e}")
+
+    except InstallCancelled:
+        raise  # every restored file was broken before; nothing to roll back
+    except Exception as e:
+        raise Exception(f"Repair failed: {str(e)}")
+
+    _report(progress, "Repair complete.", 1.0)
+    return report
+
+
+def find_installation(default_path=None):
+    """Return the install root of an existing installation, or None
+
+    One manifest read answers this for installs anywhere on disk; the
+    default-location probe only remains for installs made before the manifest.
+    """
+    record = InstallManifest.load().current()
+    if record is not None and os.path.isdir(record.install_path):
+        return record.install_path
+
+    install_dir = Path(default_path or default_install_path())
+    if is_installed_at(install_dir):
+        return str(install_dir)
+    return None
+
+
+def is_installed_at(install_path, manifest=None):
+    """True if the manifest records an install here or the payload is present"""
+    manifest = manifest or InstallManifest.load()
+    if manifest.get(install_path) is not None and os.path.isdir(install_path):
+        return True
+    install_dir = Path(install_path)
+    return (install_dir / "VirtuKey.exe").exists() or (install_dir / "VirtualDesktopAccessor.dll").exists()
+
+
+@traced("remove_shortcuts")
+def remove_recorded_shortcuts(shortcuts, profile_dir=None):
+    """Remove the shortcuts listed in a manifest record and their folder if emptied"""
+    for shortcut in shortcuts:
+        try:
+            Path(shortcut).unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: Could not remove shortcut {shortcut}: {e}")
+    try:
+        startmenu_dir(profile_dir).rmdir()
+    except OSError:
+        pass  # Missing or still holds other files
+
+
+def remove_desktop_shortcut(profile_dir=None):
+    """Remove desktop shortcut"""
+    try:
+        desktop_path = desktop_dir(profile_dir) / "VirtuKey.lnk"
+        if desktop_path.exists():
+            desktop_path.unlink()
+    except Exception as e:
+        print(f"Warning: Could not remove desktop shortcut: {e}")
+
+
+def remove_startmenu_shortcut(profile_dir=None):
+    """Remove start menu shortcut"""
+    try:
+        startmenu_path = startmenu_dir(profile_dir)
+        if startmenu_path.exists():
+            shutil.rmtree(startmenu_path)
+    except Exception as e:
+        print(f"Warning: Could not remove start menu shortcuts: {e}")
+
+
+def remove_user_settings(user_sid=None):
+    """Remove user settings and configuration"""
+    try:
+        if winreg is None:
+            raise OSError("registry is not available on this platform")
+        # Remove from startup registry
+        hive, _, key_path = _run_key(user_sid)
+        with winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE) as key:
+            try:
+                winreg.DeleteValue(key, "VirtuKey")
+            except FileNotFoundError:
+                pass  # Value doesn't exist, that's fine
+
+    except Exception as e:
+        print(f"Warning: Could not remove startup entry: {e}")
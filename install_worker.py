@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Background task runner
+Runs install jobs on a worker thread. The worker never touches Tk; the GUI
+drains the event queue from root.after callbacks.
+"""
+
+import queue
+import threading
+
+from install_core import CancelToken, InstallCancelled
+
+# Event kinds placed on InstallWorker.events
+EVENT_PROGRESS = "progress"
+EVENT_DONE = "done"
+EVENT_ERROR = "error"
+EVENT_CANCELLED = "cancelled"
+
+
+class InstallWorker(threading.Thread):
+    """Run job(progress, cancel) on its own thread and report through a queue"""
+
+    def __init__(self, job, name="VirtuKeyInstallWorker"):
+        # Not a daemon: closing the window must not kill a half-finished copy
+        super().__init__(name=name, daemon=False)
+        self.job = job
+        self.events = queue.Queue()
+        self.cancel_token = CancelToken()
+        self.finished = False
+
+    def run(self):
+        try:
+            result = self.job(self.report, self.cancel_token)
+            self.events.put((EVENT_DONE, result))
+        except InstallCancelled:
+            self.events.put((EVENT_CANCELLED, None))
+        except Exception as e:
+            self.events.put((EVENT_ERROR, str(e)))
+
+    def report(self, message, fraction=None):
+        """Progress callback handed to the job; message None keeps the last text"""
+        self.events.put((EVENT_PROGRESS, (message, fraction)))
+
+    def cancel(self):
+        """Ask the running job to stop at its next checkpoint"""
+        self.cancel_token.cancel()
+
+    def drain(self):
+        """Return all pending events without blocking, coalescing progress updates
+
+        Only the newest progress fraction matters to the UI, so a burst of
+        per-chunk updates collapses into one; the latest non-empty message is kept.
+        """
+        message = None
+        fraction = None
+        final = None
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == EVENT_PROGRESS:
+                if payload[0] is not None:
+                    message = payload[0]
+                if payload[1] is not None:
+                    fraction = payload[1]
+            else:
+                final = (kind, payload)
+        if final is not None:
+            self.finished = True
+        return message, fraction, final
@@ -0,0 +1,1179 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Simple and Clean Multi-Step GUI Installer
+Author: KamalSDhami
+Version: 1.0
+
+Launched through installer.py, which keeps tkinter out of silent runs.
+"""
+
+import tkinter as tk
+from tkinter import messagebox, filedialog, ttk
+import os
+from pathlib import Path
+
+from install_core import (InstallOptions, perform_installation,
+                          perform_uninstallation, perform_reinstallation, perform_repair,
+                          is_virtukey_running, close_running_virtukey, find_installation,
+                          sweep_tombstones)
+from install_worker import InstallWorker, EVENT_DONE, EVENT_CANCELLED
+from prestage import Prestager
+from preflight import Preflight, PROBE_INSTALL_DIR, PROBE_DISK_SPACE, STATUS_ERROR, STATUS_WARNING, MB
+from tracing import span
+
+# How often the Tk loop drains the worker's event queue
+WORKER_POLL_MS = 30
+
+# Typing in the path box re-probes it once the user pauses
+PATH_PROBE_DELAY_MS = 300
+PREFLIGHT_POLL_MS = 100
+# Install waits this long (seconds) for a path probe still running; the install checks again anyway
+PREFLIGHT_WAIT = 0.5
+
+# The install options page; pre-staging starts there, once the license is accepted
+OPTIONS_STEP = 2
+
+# Pages whose layout depends on the install/uninstall/reinstall/repair mode; rebuilt when it changes
+MODE_DEPENDENT_PAGES = ("summary", "complete")
+
+class VirtuKeyInstaller:
+    def __init__(self):
+        self.root = tk.Tk()
+        self.root.geometry("650x560")  # Further reduced height for better fit
+        self.root.resizable(False, False)
+        self.root.configure(bg='#f8fafc')  # Light gray background
+        
+        # Modern color scheme
+        self.colors = {
+            'primary': '#2563eb',      # Modern blue
+            'primary_hover': '#1d4ed8',
+            'secondary': '#64748b',    # Slate gray
+            'success': '#059669',      # Emerald green
+            'danger': '#dc2626',       # Red
+            'warning': '#d97706',      # Amber
+            'background': '#f8fafc',   # Very light gray
+            'surface': '#ffffff',      # White
+            'card': '#ffffff',         # White for cards
+            'border': '#e2e8f0',       # Light border
+            'text_primary': '#1e293b', # Dark text
+            'text_secondary': '#64748b', # Gray text
+            'text_muted': '#94a3b8'    # Light gray text
+        }
+        
+        # Installation variables
+        default_path = os.path.join(os.path.expanduser("~"), "AppData", "Local", "VirtuKey")
+        self.install_path = tk.StringVar(value=default_path)
+        self.create_desktop_shortcut = tk.BooleanVar(value=True)
+        self.create_startmenu_shortcut = tk.BooleanVar(value=True)
+        self.auto_start = tk.BooleanVar(value=False)
+        
+        # Background worker for install/uninstall/reinstall/repair (None when idle)
+        self.worker = None
+        
+        # What the last repair found and fixed (install_core.RepairReport)
+        self.repair_report = None
+        
+        # Built pages, reused across Back/Next: key -> (frame, refresh callback or None)
+        self.pages = {}
+        self.current_page = None
+        
+        # Earlier uninstalls may have left tombstones to delete; do it in the background
+        sweep_tombstones()
+        
+        # Check if already installed
+        self.is_installed = self.check_installation()
+        self.mode = "uninstall" if self.is_installed else "install"  # install or uninstall
+        
+        # Preflight checks run in the background while the user reads the wizard
+        self.preflight = Preflight()
+        self.preflight.start(self.install_path.get().strip())
+        self.path_probe_after = None
+        self.space_poll_after = None  # the one pending update_space_info poll
+        self.install_path.trace_add("write", self.on_install_path_changed)
+        
+        # Copies the payload next to the install path while the user is still deciding
+        self.prestager = Prestager()
+        
+        # Set window title based on mode
+        title = "VirtuKey Uninstaller" if self.is_installed else "VirtuKey Setup"
+        self.root.title(title)
+        
+        # Current step (0-4)
+        self.current_step = 0
+        self.total_steps = 5
+        
+        # Setup the UI
+        self.create_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.show_step(0)
+        
+    def create_ui(self):
+        # Modern header with gradient-like appearance - reduced height
+        header_frame = tk.Frame(self.root, bg=self.colors['primary'], height=80)
+        header_frame.pack(fill=tk.X)
+        header_frame.pack_propagate(False)
+        
+        # Header content container - reduced padding
+        header_content = tk.Frame(header_frame, bg=self.colors['primary'])
+        header_content.pack(expand=True, fill=tk.BOTH, padx=30, pady=15)
+        
+        # Logo and title with modern typography - smaller fonts
+        title_label = tk.Label(header_content, text="VirtuKey", 
+                              bg=self.colors['primary'], fg='white', 
+                              font=('Segoe UI', 20, 'bold'))
+        title_label.pack(side=tk.LEFT, pady=5)
+        
+        subtitle_label = tk.Label(header_content, text="Setup", 
+                                 bg=self.colors['primary'], fg='#e2e8f0', 
+                                 font=('Segoe UI', 12))
+        subtitle_label.pack(side=tk.LEFT, padx=(8, 0), pady=8)
+        
+        # Progress indicator (modern step dots)
+        self.progress_frame = tk.Frame(header_content, bg=self.colors['primary'])
+        self.progress_frame.pack(side=tk.RIGHT, pady=8)
+        
+        self.progress_dots = []
+        for i in range(self.total_steps):
+            dot_frame = tk.Frame(self.progress_frame, bg=self.colors['primary'], width=12, height=12)
+            dot_frame.pack(side=tk.LEFT, padx=3)
+            dot_frame.pack_propagate(False)
+            
+            dot = tk.Label(dot_frame, text="●", bg=self.colors['primary'], 
+                          fg='#94a3b8', font=('Arial', 8))
+            dot.pack(expand=True)
+            self.progress_dots.append(dot)
+        
+        # Main content area with card-like appearance - further reduced padding
+        content_container = tk.Frame(self.root, bg=self.colors['background'])
+        content_container.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
+        
+        # Content card with shadow effect (simulated with borders)
+        content_shadow = tk.Frame(content_container, bg='#d1d5db', height=2)
+        content_shadow.pack(fill=tk.X, pady=(2, 0))
+        
+        self.content_frame = tk.Frame(content_container, bg=self.colors['surface'], 
+                                     relief='flat', bd=0)
+        self.content_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 2))
+        
+        # Button area with modern styling - further reduced padding
+        button_container = tk.Frame(self.root, bg=self.colors['background'])
+        button_container.pack(fill=tk.X, padx=15, pady=(0, 10))
+        
+        # Button card - reduced height
+        button_shadow = tk.Frame(button_container, bg='#d1d5db', height=2)
+        button_shadow.pack(fill=tk.X, pady=(2, 0))
+        
+        button_frame = tk.Frame(button_container, bg=self.colors['surface'], height=60)
+        button_frame.pack(fill=tk.X, pady=(0, 2))
+        button_frame.pack_propagate(False)
+        
+        # Button content with proper spacing - further reduced padding
+        button_inner = tk.Frame(button_frame, bg=self.colors['surface'])
+        button_inner.pack(expand=True, fill=tk.BOTH, padx=20, pady=12)
+        
+        # Modern styled buttons
+        self.back_button = tk.Button(button_inner, text="← Back", 
+                                    command=self.go_back,
+                                    bg='#f1f5f9', fg=self.colors['text_secondary'],
+                                    font=('Segoe UI', 10, 'bold'),
+                                    padx=30, pady=12, relief='flat', bd=0,
+                                    state=tk.DISABLED, cursor='hand2')
+        # Don't pack initially - will be managed by show_step
+        
+        # Style disabled button
+        self.back_button.configure(bg='#f8fafc', fg='#cbd5e1')
+        
+        self.cancel_button = tk.Button(button_inner, text="Cancel", 
+                                      command=self.cancel_installation,
+                                      bg='#fef2f2', fg=self.colors['danger'],
+                                      font=('Segoe UI', 10, 'bold'),
+                                      padx=30, pady=12, relief='flat', bd=0,
+                                      cursor='hand2')
+        # Don't pack initially - will be managed by show_step
+        
+        self.next_button = tk.Button(button_inner, text="Next →", 
+                                    command=self.go_next,
+                                    bg=self.colors['primary'], fg='white',
+                                    font=('Segoe UI', 10, 'bold'),
+                                    padx=30, pady=12, relief='flat', bd=0,
+                                    cursor='hand2')
+        self.next_button.pack(side=tk.RIGHT)  # Next button always on the right
+        
+        # Add hover effects
+        self.add_button_hover_effects()
+        
+    def add_button_hover_effects(self):
+        """Add modern hover effects to buttons"""
+        def on_enter_next(e):
+            if self.next_button['state'] != 'disabled':
+                self.next_button.configure(bg=self.colors['primary_hover'])
+        
+        def on_leave_next(e):
+            if self.next_button['state'] != 'disabled':
+                self.next_button.configure(bg=self.colors['primary'])
+        
+        def on_enter_back(e):
+            if self.back_button['state'] != 'disabled':
+                self.back_button.configure(bg='#e2e8f0')
+        
+        def on_leave_back(e):
+            if self.back_button['state'] != 'disabled':
+                self.back_button.configure(bg='#f1f5f9')
+        
+        def on_enter_cancel(e):
+            self.cancel_button.configure(bg='#fee2e2')
+        
+        def on_leave_cancel(e):
+            self.cancel_button.configure(bg='#fef2f2')
+        
+        self.next_button.bind("<Enter>", on_enter_next)
+        self.next_button.bind("<Leave>", on_leave_next)
+        self.back_button.bind("<Enter>", on_enter_back)
+        self.back_button.bind("<Leave>", on_leave_back)
+        self.cancel_button.bind("<Enter>", on_enter_cancel)
+        self.cancel_button.bind("<Leave>", on_leave_cancel)
+        
+    def update_prestage(self):
+        """Keep a speculative copy going between the options page and the Install click"""
+        if self.mode in ("uninstall", "repair"):
+            self.prestager.discard()
+        elif OPTIONS_STEP <= self.current_step <= self.total_steps - 2 and self.worker is None:
+            self.prestager.stage(self.install_path.get().strip())
+            
+    def update_progress_dots(self):
+        """Update progress indicator dots"""
+        for i, dot in enumerate(self.progress_dots):
+            if i < self.current_step:
+                dot.configure(fg='#10b981')  # Completed - green
+            elif i == self.current_step:
+                dot.configure(fg='white')     # Current - white
+            else:
+                dot.configure(fg='#94a3b8')  # Future - gray
+        
+    def check_installation(self):
+        """Check if VirtuKey is already installed, adopting its recorded location"""
+        install_dir = find_installation(self.install_path.get())
+        if install_dir is None:
+            return False
+        self.install_path.set(install_dir)
+        return True
+        
+    def show_page(self, key, build):
+        """Show a cached page, building it on first use
+
+        build(parent) fills the page frame and may return a callback that
+        refreshes its variable parts; it runs every time the page is shown.
+        """
+        entry = self.pages.get(key)
+        if entry is None:
+            page = tk.Frame(self.content_frame, bg=self.colors['surface'])
+            entry = (page, build(page))
+            self.pages[key] = entry
+        page, refresh = entry
+        if refresh is not None:
+            refresh()
+        if self.current_page is not page:
+            if self.current_page is not None:
+                self.current_page.pack_forget()
+            page.pack(expand=True, fill=tk.BOTH)
+            self.current_page = page
+            
+    def invalidate_pages(self, keys):
+        """Drop cached pages so they are rebuilt the next time they are shown"""
+        for key in keys:
+            entry = self.pages.pop(key, None)
+            if entry is None:
+                continue
+            if self.current_page is entry[0]:
+                self.current_page = None
+            entry[0].destroy()
+            
+    def show_step(self, step):
+        """Show the specified installation step"""
+        self.current_step = step
+        
+        # Update progress dots
+        self.update_progress_dots()
+        
+        # Follow the choice made on the welcome page
+        if self.is_installed and hasattr(self, 'action_mode'):
+            mode = self.action_mode.get()
+            if mode != self.mode:
+                self.mode = mode
+                self.invalidate_pages(MODE_DEPENDENT_PAGES)
+        self.update_prestage()
+        
+        # Update buttons based on mode with modern styling
+        if step > 0:
+            # Pages 2+ - Show Back and Next, hide Cancel
+            self.back_button.config(state=tk.NORMAL, bg='#f1f5f9', fg=self.colors['text_secondary'])
+            self.back_button.pack(side=tk.LEFT)  # Show Back button on left
+            self.cancel_button.pack_forget()  # Hide Cancel button
+        else:
+            # Page 1 - Show Cancel and Next, hide Back
+            self.back_button.pack_forget()  # Hide Back button
+            self.cancel_button.pack(side=tk.LEFT)  # Show Cancel button on left
+        
+        # Reset Next button state first
+        self.next_button.config(state=tk.NORMAL)
+        
+        if step == self.total_steps - 1:  # Last step
+            self.next_button.config(text="Finish", command=self.finish_installation,
+                                   bg=self.colors['success'], fg='white')
+        elif step == self.total_steps - 2:  # Installation step
+            if self.mode == "uninstall":
+                self.next_button.config(text="Uninstall", command=self.start_uninstallation,
+                                       bg=self.colors['danger'], fg='white')
+            elif self.mode == "reinstall":
+                self.next_button.config(text="Reinstall", command=self.start_reinstallation,
+                                       bg=self.colors['warning'], fg='white')
+            elif self.mode == "repair":
+                self.next_button.config(text="Repair", command=self.start_repair,
+                                       bg=self.colors['primary'], fg='white')
+            else:
+                self.next_button.config(text="Install", command=self.start_installation,
+                                       bg=self.colors['success'], fg='white')
+        else:
+            self.next_button.config(text="Next →", command=self.go_next,
+                                   bg=self.colors['primary'], fg='white')
+        
+        # Show the appropriate content based on mode
+        if step == 0:
+            self.show_page("welcome", self.build_welcome)
+        elif step == 1:
+            if self.mode == "uninstall":
+                self.show_page("uninstall_options", self.build_uninstall_options)
+            else:
+                self.show_page("license", self.build_license)
+                # Next stays disabled until the license is accepted
+                self.on_license_accept()
+        elif step == 2:
+            if self.mode == "uninstall":
+                self.show_page("uninstall_summary", self.build_uninstall_summary)
+            else:
+                self.show_page("options", self.build_options)
+        elif step == 3:
+            self.show_page("summary", self.build_installation)
+        elif step == 4:
+            self.show_page("complete", self.build_complete)
+    
+    def build_welcome(self, parent):
+        """Welcome page with modern styling"""
+        # Main container with further reduced padding
+        container = tk.Frame(parent, bg=self.colors['surface'])
+        container.pack(expand=True, fill=tk.BOTH, padx=20, pady=15)
+        
+        if self.is_installed:
+            # Modern uninstall mode
+            # Icon/Header section
+            header_section = tk.Frame(container, bg=self.colors['surface'])
+            header_section.pack(fill=tk.X, pady=(0, 15))
+            
+            # Large icon
+            icon_label = tk.Label(header_section, text="⚠️", 
+                                 bg=self.colors['surface'], font=('Arial', 30))
+            icon_label.pack(pady=(0, 8))
+            
+            title = tk.Label(header_section, text="VirtuKey is already installed", 
+                            bg=self.colors['surface'], fg=self.colors['text_primary'], 
+                            font=('Segoe UI', 18, 'bold'))
+            title.pack(pady=(0, 8))
+            
+            subtitle = tk.Label(header_section, text="Choose what you'd like to do:", 
+                               bg=self.colors['surface'], fg=self.colors['text_secondary'], 
+                               font=('Segoe UI', 11))
+            subtitle.pack()
+            
+            # Mode selection cards
+            options_frame = tk.Frame(container, bg=self.colors['surface'])
+            options_frame.pack(fill=tk.X, pady=(12, 15))
+            
+            self.action_mode = tk.StringVar(value="uninstall")
+            
+            # Uninstall option card
+            uninstall_card = tk.Frame(options_frame, bg='#fef2f2', relief='flat', bd=1)
+            uninstall_card.pack(fill=tk.X, pady=(0, 8), padx=12)
+            
+            uninstall_rb = tk.Radiobutton(uninstall_card, text="🗑️  Uninstall VirtuKey", 
+                                         variable=self.action_mode, value="uninstall",
+                                         bg='#fef2f2', fg=self.colors['text_primary'],
+                                         font=('Segoe UI', 10, 'bold'), relief='flat')
+            uninstall_rb.pack(anchor=tk.W, pady=8, padx=12)
+            
+            uninstall_desc = tk.Label(uninstall_card, 
+                                     text="Remove VirtuKey from your computer completely",
+                                     bg='#fef2f2', fg=self.colors['text_secondary'],
+                                     font=('Segoe UI', 8))
+            uninstall_desc.pack(anchor=tk.W, padx=12, pady=(0, 8))
+            
+            # Reinstall option card
+            reinstall_card = tk.Frame(options_frame, bg='#eff6ff', relief='flat', bd=1)
+            reinstall_card.pack(fill=tk.X, pady=(0, 8), padx=12)
+            
+            reinstall_rb = tk.Radiobutton(reinstall_card, text="🔄  Reinstall VirtuKey", 
+                                         variable=self.action_mode, value="reinstall",
+                                         bg='#eff6ff', fg=self.colors['text_primary'],
+                                         font=('Segoe UI', 10, 'bold'), relief='flat')
+            reinstall_rb.pack(anchor=tk.W, pady=8, padx=12)
+            
+            reinstall_desc = tk.Label(reinstall_card, 
+                                     text="Replace every file with a fresh copy",
+                                     bg='#eff6ff', fg=self.colors['text_secondary'],
+                                     font=('Segoe UI', 8))
+            reinstall_desc.pack(anchor=tk.W, padx=12, pady=(0, 8))
+            
+            # Repair option card
+            repair_card = tk.Frame(options_frame, bg='#f0fdf4', relief='flat', bd=1)
+            repair_card.pack(fill=tk.X, padx=12)
+            
+            repair_rb = tk.Radiobutton(repair_card, text="🛠️  Repair VirtuKey", 
+                                      variable=self.action_mode, value="repair",
+                                      bg='#f0fdf4', fg=self.colors['text_primary'],
+                                      font=('Segoe UI', 10, 'bold'), relief='flat')
+            repair_rb.pack(anchor=tk.W, pady=8, padx=12)
+            
+            repair_desc = tk.Label(repair_card, 
+                                  text="Restore only missing or damaged files, shortcuts and startup settings",
+                                  bg='#f0fdf4', fg=self.colors['text_secondary'],
+                                  font=('Segoe UI', 8))
+            repair_desc.pack(anchor=tk.W, padx=12, pady=(0, 8))
+            
+            # Installation info card
+            info_card = tk.Frame(container, bg='#f8fafc', relief='flat', bd=1)
+            info_card.pack(fill=tk.X, pady=(12, 0), padx=12)
+            
+            info_title = tk.Label(info_card, text="Current Installation", 
+                                 bg='#f8fafc', fg=self.colors['text_primary'],
+                                 font=('Segoe UI', 9, 'bold'))
+            info_title.pack(anchor=tk.W, padx=12, pady=(8, 4))
+            
+            install_info = tk.Label(info_card, 
+                                   text=self.install_path.get(),
+                                   bg='#f8fafc', fg=self.colors['text_secondary'],
+                                   font=('Segoe UI', 8))
+            install_info.pack(anchor=tk.W, padx=12, pady=(0, 8))
+            
+        else:
+            # Modern install mode
+            # Hero section
+            hero_section = tk.Frame(container, bg=self.colors['surface'])
+            hero_section.pack(fill=tk.X, pady=(0, 15))
+            
+            # Large welcome icon
+            icon_label = tk.Label(hero_section, text="🚀", 
+                                 bg=self.colors['surface'], font=('Arial', 30))
+            icon_label.pack(pady=(0, 10))
+            
+            title = tk.Label(hero_section, text="Welcome to VirtuKey", 
+                            bg=self.colors['surface'], fg=self.colors['text_primary'], 
+                            font=('Segoe UI', 18, 'bold'))
+            title.pack(pady=(0, 5))
+            
+            subtitle = tk.Label(hero_section, text="Virtual Desktop Manager", 
+                               bg=self.colors['surface'], fg=self.colors['text_secondary'], 
+                               font=('Segoe UI', 11))
+            subtitle.pack(pady=(0, 15))
+            
+            # Features section
+            features_frame = tk.Frame(container, bg=self.colors['surface'])
+            features_frame.pack(fill=tk.X, pady=(0, 15))
+            
+            features_title = tk.Label(features_frame, text="What you'll get:", 
+                                     bg=self.colors['surface'], fg=self.colors['text_primary'],
+                                     font=('Segoe UI', 13, 'bold'))
+            features_title.pack(pady=(0, 8))  # Centered by default
+            
+            features = [
+                ("🖥️", "Multiple virtual desktops"),
+                ("⌨️", "Convenient hotkey shortcuts"),
+                ("⚡", "Lightning-fast desktop switching"),
+                ("🎯", "Better workflow organization")
+            ]
+            
+            for icon, text in features:
+                feature_frame = tk.Frame(features_frame, bg=self.colors['surface'])
+                feature_frame.pack(pady=3)  # Center the entire feature frame
+                
+                # Create inner frame to hold icon and text together
+                feature_content = tk.Frame(feature_frame, bg=self.colors['surface'])
+                feature_content.pack()  # Center the content within the frame
+                
+                icon_label = tk.Label(feature_content, text=icon, 
+                                     bg=self.colors['surface'], font=('Arial', 11))
+                icon_label.pack(side=tk.LEFT, padx=(0, 6))
+                
+                text_label = tk.Label(feature_content, text=text, 
+                                     bg=self.colors['surface'], fg=self.colors['text_secondary'],
+                                     font=('Segoe UI', 10))
+                text_label.pack(side=tk.LEFT)
+            
+            # Call to action
+            cta_frame = tk.Frame(container, bg=self.colors['surface'])
+            cta_frame.pack(fill=tk.X, pady=(15, 0))
+            
+            cta_text = tk.Label(cta_frame, 
+                               text="Click Next to begin the installation process.",
+                               bg=self.colors['surface'], fg=self.colors['text_secondary'],
+                               font=('Segoe UI', 10))
+            cta_text.pack()
+        
+    def build_license(self, parent):
+        """License agreement page"""
+        license_frame = tk.Frame(parent, bg='white')
+        license_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=10)
+        
+        title = tk.Label(license_frame, text="License Agreement", 
+                        bg='white', fg='#2c3e50', font=('Arial', 14, 'bold'))
+        title.pack(pady=(0, 10))
+        
+        # Create a frame for the text area with fixed height
+        text_container = tk.Frame(license_frame, bg='white')
+        text_container.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        
+        # License text with scrollbar - reduced height to fit page
+        license_text = tk.Text(text_container, wrap=tk.WORD, height=12, 
+                              font=('Consolas', 9), bg='#f8f9fa', 
+                              yscrollcommand=lambda *args: scrollbar.set(*args))
+        
+        scrollbar = tk.Scrollbar(text_container, orient=tk.VERTICAL, 
+                                command=license_text.yview)
+        
+        license_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        license_content = """MIT License
+
+Copyright (c) 2024 KamalSDhami
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Additional Terms:
+By installing VirtuKey, you acknowledge that this software is provided as-is 
+and the developer is not responsible for any issues that may arise from its use.
+
+This software is designed to enhance productivity through virtual desktop 
+management and does not collect any personal data or transmit information 
+to external servers."""
+        
+        license_text.insert(tk.END, license_content)
+        license_text.config(state=tk.DISABLED, yscrollcommand=scrollbar.set)
+        
+        # Accept checkbox - fixed at bottom with padding
+        checkbox_frame = tk.Frame(license_frame, bg='white', height=40)
+        checkbox_frame.pack(fill=tk.X, side=tk.BOTTOM)
+        checkbox_frame.pack_propagate(False)
+        
+        self.accept_license = tk.BooleanVar(value=False)
+        accept_cb = tk.Checkbutton(checkbox_frame, text="I accept the license agreement",
+                                  variable=self.accept_license,
+                                  bg='white', font=('Arial', 10, 'bold'),
+                                  command=self.on_license_accept)
+        accept_cb.pack(pady=8, anchor=tk.W)
+        
+    def on_license_accept(self):
+        """Enable/disable Next button based on license acceptance"""
+        if self.accept_license.get():
+            self.next_button.config(state=tk.NORMAL, bg=self.colors['primary'], fg='white')
+        else:
+            self.next_button.config(state=tk.DISABLED, bg='#cbd5e1', fg='#9ca3af')
+            
+    def build_options(self, parent):
+        """Installation options page"""
+        options_frame = tk.Frame(parent, bg='white')
+        options_frame.pack(expand=True, fill=tk.BOTH, padx=15, pady=8)
+        
+        title = tk.Label(options_frame, text="Installation Options", 
+                        bg='white', fg='#2c3e50', font=('Arial', 13, 'bold'))
+        title.pack(pady=(0, 8))
+        
+        # Installation path section
+        path_section = tk.Frame(options_frame, bg='white')
+        path_section.pack(fill=tk.X, pady=(0, 8))
+        
+        path_label = tk.Label(path_section, text="Installation Directory:", 
+                             bg='white', fg='#2c3e50', font=('Arial', 9, 'bold'))
+        path_label.pack(anchor=tk.W, pady=(0, 2))
+        
+        path_frame = tk.Frame(path_section, bg='white')
+        path_frame.pack(fill=tk.X, pady=(0, 2))
+        
+        path_entry = tk.Entry(path_frame, textvariable=self.install_path, 
+                             font=('Arial', 9), width=40)
+        path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 6))
+        
+        browse_btn = tk.Button(path_frame, text="Browse...", 
+                              command=self.browse_folder,
+                              bg='#95a5a6', fg='white', font=('Arial', 8),
+                              padx=10, pady=3)
+        browse_btn.pack(side=tk.RIGHT)
+        
+        # Space info, filled in from the preflight checks
+        self.space_info = tk.Label(path_section, text="Checking free space...", 
+                                  bg='white', fg='#7f8c8d', font=('Arial', 8))
+        self.space_info.pack(anchor=tk.W, pady=(2, 0))
+        
+        # Location info
+        location_info = tk.Label(path_section, text="Default location is in user folder (no admin rights required)", 
+                                bg='white', fg='#27ae60', font=('Arial', 7))
+        location_info.pack(anchor=tk.W, pady=(1, 0))
+        
+        # Separator
+        separator = tk.Frame(options_frame, bg='#bdc3c7', height=1)
+        separator.pack(fill=tk.X, pady=8)
+        
+        # Additional options
+        options_label = tk.Label(options_frame, text="Additional Options:", 
+                                bg='white', fg='#2c3e50', font=('Arial', 9, 'bold'))
+        options_label.pack(anchor=tk.W, pady=(0, 6))
+        
+        # Options checkboxes - more compact spacing
+        options_container = tk.Frame(options_frame, bg='white')
+        options_container.pack(fill=tk.X)
+        
+        desktop_cb = tk.Checkbutton(options_container, text="Create desktop shortcut",
+                                   variable=self.create_desktop_shortcut,
+                                   bg='white', font=('Arial', 9))
+        desktop_cb.pack(anchor=tk.W, pady=1)
+        
+        startmenu_cb = tk.Checkbutton(options_container, text="Create Start Menu shortcuts",
+                                     variable=self.create_startmenu_shortcut,
+                                     bg='white', font=('Arial', 9))
+        startmenu_cb.pack(anchor=tk.W, pady=1)
+        
+        autostart_cb = tk.Checkbutton(options_container, text="Start VirtuKey automatically with Windows",
+                                     variable=self.auto_start,
+                                     bg='white', font=('Arial', 9))
+        autostart_cb.pack(anchor=tk.W, pady=1)
+        
+        def refresh():
+            self.update_space_info()
+        return refresh
+        
+    def update_space_info(self):
+        """Show the preflight verdict for the current path; polls until the probes finish"""
+        # Every path change calls this again; keep a single poll running, not one per change
+        if self.space_poll_after is not None:
+            self.root.after_cancel(self.space_poll_after)
+            self.space_poll_after = None
+        if not self.space_info.winfo_exists():
+            return
+        required = f"Space required: {self.preflight.required_bytes() / MB:.1f} MB"
+        results = [self.preflight.peek(name) for name in (PROBE_INSTALL_DIR, PROBE_DISK_SPACE)]
+        if any(r is None for r in results):
+            self.space_info.config(text=f"{required} (checking...)", fg='#7f8c8d')
+            self.space_poll_after = self.root.after(PREFLIGHT_POLL_MS, self.update_space_info)
+            return
+        problems = [r for r in results if r.status == STATUS_ERROR]
+        if problems:
+            self.space_info.config(text=problems[0].message.splitlines()[0], fg=self.colors['danger'])
+        else:
+            self.space_info.config(text=f"{required} ({results[1].message})", fg='#7f8c8d')
+        
+    def build_uninstall_options(self, parent):
+        """Uninstall options page"""
+        uninstall_frame = tk.Frame(parent, bg='white')
+        uninstall_frame.pack(expand=True, fill=tk.BOTH, padx=15, pady=8)
+        
+        title = tk.Label(uninstall_frame, text="Uninstall Options", 
+                        bg='white', fg='#e74c3c', font=('Arial', 13, 'bold'))
+        title.pack(pady=(0, 12))
+        
+        # Current installation info
+        info_section = tk.Frame(uninstall_frame, bg='white')
+        info_section.pack(fill=tk.X, pady=(0, 12))
+        
+        info_label = tk.Label(info_section, text="Current Installation:", 
+                             bg='white', fg='#2c3e50', font=('Arial', 9, 'bold'))
+        info_label.pack(anchor=tk.W, pady=(0, 4))
+        
+        path_info = tk.Label(info_section, 
+                            bg='white', fg='#34495e', font=('Arial', 9))
+        path_info.pack(anchor=tk.W, pady=1)
+        
+        # Separator
+        separator = tk.Frame(uninstall_frame, bg='#bdc3c7', height=1)
+        separator.pack(fill=tk.X, pady=12)
+        
+        # Removal options
+        options_label = tk.Label(uninstall_frame, text="What to Remove:", 
+                                bg='white', fg='#2c3e50', font=('Arial', 9, 'bold'))
+        options_label.pack(anchor=tk.W, pady=(0, 8))
+        
+        # Initialize uninstall options
+        self.remove_shortcuts = tk.BooleanVar(value=True)
+        self.remove_settings = tk.BooleanVar(value=False)
+        
+        # Options checkboxes
+        options_container = tk.Frame(uninstall_frame, bg='white')
+        options_container.pack(fill=tk.X)
+        
+        shortcuts_cb = tk.Checkbutton(options_container, text="Remove desktop and Start Menu shortcuts",
+                                     variable=self.remove_shortcuts,
+                                     bg='white', font=('Arial', 9))
+        shortcuts_cb.pack(anchor=tk.W, pady=2)
+        
+        settings_cb = tk.Checkbutton(options_container, text="Remove user settings and configuration",
+                                    variable=self.remove_settings,
+                                    bg='white', font=('Arial', 9))
+        settings_cb.pack(anchor=tk.W, pady=2)
+        
+        # Warning
+        warning = tk.Label(uninstall_frame, 
+                          text="⚠️ This action cannot be undone. VirtuKey will be completely removed from your system.",
+                          bg='white', fg='#e74c3c', font=('Arial', 8, 'italic'))
+        warning.pack(pady=12)
+        
+        def refresh():
+            path_info.config(text=f"Location: {self.install_path.get()}")
+        return refresh
+        
+    def build_uninstall_summary(self, parent):
+        """Uninstall summary page"""
+        summary_frame = tk.Frame(parent, bg='white')
+        summary_frame.pack(expand=True, fill=tk.BOTH, padx=15, pady=15)
+        
+        title = tk.Label(summary_frame, text="Ready to Uninstall", 
+                        bg='white', fg='#e74c3c', font=('Arial', 13, 'bold'))
+        title.pack(pady=(0, 15))
+        
+        summary_label = tk.Label(summary_frame, 
+                                bg='white', fg='#34495e', font=('Arial', 9),
+                                justify=tk.LEFT)
+        summary_label.pack(pady=8, anchor=tk.W)
+        
+        def refresh():
+            summary_label.config(text=f"""VirtuKey will be uninstalled with the following settings:
+
+Installation Directory: {self.install_path.get()}
+Remove Shortcuts: {'Yes' if self.remove_shortcuts.get() else 'No'}
+Remove Settings: {'Yes' if self.remove_settings.get() else 'No'}
+
+Note: If VirtuKey is running, you will be asked to close it automatically.
+
+Click Uninstall to begin the removal process.""")
+        return refresh
+        
+    def build_installation(self, parent):
+        """Summary page shown before the Install/Uninstall/Reinstall/Repair click"""
+        install_frame = tk.Frame(parent, bg='white')
+        install_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+        
+        if self.mode == "uninstall":
+            heading = "Ready to Uninstall"
+        elif self.mode == "repair":
+            heading = "Ready to Repair"
+        else:
+            heading = "Ready to Reinstall" if self.mode == "reinstall" else "Ready to Install"
+        
+        title = tk.Label(install_frame, text=heading, 
+                        bg='white', fg='#2c3e50', font=('Arial', 14, 'bold'))
+        title.pack(pady=(0, 20))
+        
+        summary_label = tk.Label(install_frame, 
+                                bg='white', fg='#34495e', font=('Arial', 10),
+                                justify=tk.LEFT)
+        summary_label.pack(pady=10, anchor=tk.W)
+        
+        def refresh():
+            if self.mode == "uninstall":
+                summary_text = f"""VirtuKey will be removed from:
+
+Installation Directory: {self.install_path.get()}
+
+Click Uninstall to begin the removal process."""
+            elif self.mode == "repair":
+                summary_text = f"""VirtuKey will be checked and repaired in:
+
+Installation Directory: {self.install_path.get()}
+
+Missing or damaged program files are restored, and shortcuts and the
+automatic startup setting are recreated if they were removed. Files that
+are intact are left alone.
+
+Click Repair to begin."""
+            else:
+                action = "reinstalled" if self.mode == "reinstall" else "installed"
+                summary_text = f"""VirtuKey will be {action} with the following settings:
+
+Installation Directory: {self.install_path.get()}
+Desktop Shortcut: {'Yes' if self.create_desktop_shortcut.get() else 'No'}
+Start Menu Shortcuts: {'Yes' if self.create_startmenu_shortcut.get() else 'No'}
+Auto-start with Windows: {'Yes' if self.auto_start.get() else 'No'}
+
+Click {'Reinstall' if self.mode == 'reinstall' else 'Install'} to begin the installation."""
+                # Anything the preflight checks already know will be skipped
+                notes = [r.message for r in self.preflight.finished().values()
+                         if r.status == STATUS_WARNING]
+                if notes:
+                    summary_text += "\n\nNote:\n" + "\n".join(f"• {note}" for note in notes)
+            summary_label.config(text=summary_text)
+        return refresh
+        
+    def show_progress_page(self, heading):
+        """Live progress page that replaces the summary while the worker runs"""
+        self.progress_heading = heading
+        self.show_page("progress", self.build_progress)
+        
+    def build_progress(self, parent):
+        """Progress page: heading, status line, bar and percentage"""
+        progress_page = tk.Frame(parent, bg='white')
+        progress_page.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+        
+        title = tk.Label(progress_page, 
+                        bg='white', fg='#2c3e50', font=('Arial', 14, 'bold'))
+        title.pack(pady=(0, 20))
+        
+        self.progress_status = tk.Label(progress_page, text="Preparing...", 
+                                       bg='white', fg='#34495e', font=('Arial', 10),
+                                       anchor=tk.W)
+        self.progress_status.pack(fill=tk.X, pady=(10, 6))
+        
+        self.progress_bar = ttk.Progressbar(progress_page, orient=tk.HORIZONTAL,
+                                           mode='determinate', maximum=100)
+        self.progress_bar.pack(fill=tk.X)
+        
+        self.progress_percent = tk.Label(progress_page, text="0%", 
+                                        bg='white', fg='#7f8c8d', font=('Arial', 8))
+        self.progress_percent.pack(anchor=tk.E, pady=(4, 0))
+        
+        def refresh():
+            # A retried task reuses the page; start it from zero again
+            title.config(text=self.progress_heading)
+            self.progress_status.config(text="Preparing...")
+            self.progress_bar['value'] = 0
+            self.progress_percent.config(text="0%")
+        return refresh
+        
+    def build_complete(self, parent):
+        """Installation/Uninstallation complete page"""
+        complete_frame = tk.Frame(parent, bg='white')
+        complete_frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
+        
+        # Success icon (using text)
+        success_icon = tk.Label(complete_frame, text="✓", 
+                               bg='white', fg='#27ae60', font=('Arial', 48, 'bold'))
+        success_icon.pack(pady=(20, 10))
+        
+        if self.mode == "uninstall":
+            title = tk.Label(complete_frame, text="Uninstallation Complete!", 
+                            bg='white', fg='#2c3e50', font=('Arial', 16, 'bold'))
+            title.pack(pady=(0, 20))
+            
+            desc = tk.Label(complete_frame, 
+                           text="VirtuKey has been successfully removed from your computer.\n\n"
+                                "All selected components have been uninstalled.\n\n"
+                                "Thank you for using VirtuKey!",
+                           bg='white', fg='#34495e', font=('Arial', 11),
+                           justify=tk.CENTER)
+            desc.pack(pady=10)
+            
+        elif self.mode == "repair":
+            title = tk.Label(complete_frame, text="Repair Complete!", 
+                            bg='white', fg='#2c3e50', font=('Arial', 16, 'bold'))
+            title.pack(pady=(0, 20))
+            
+            report = self.repair_report
+            desc = tk.Label(complete_frame, 
+                           text=(report.summary() if report is not None else "VirtuKey has been repaired."),
+                           bg='white', fg='#34495e', font=('Arial', 11),
+                           justify=tk.CENTER, wraplength=520)
+            desc.pack(pady=10)
+            
+            self.launch_now = tk.BooleanVar(value=True)
+            launch_cb = tk.Checkbutton(complete_frame, text="Launch VirtuKey now",
+                                      variable=self.launch_now,
+                                      bg='white', font=('Arial', 10, 'bold'))
+            launch_cb.pack(pady=20)
+            
+        else:
+            title = tk.Label(complete_frame, text="Installation Complete!", 
+                            bg='white', fg='#2c3e50', font=('Arial', 16, 'bold'))
+            title.pack(pady=(0, 20))
+            
+            desc = tk.Label(complete_frame, 
+                           text="VirtuKey has been successfully installed on your computer.\n\n"
+                                "You can now start using VirtuKey to manage your virtual desktops.\n\n"
+                                "Thank you for choosing VirtuKey!",
+                           bg='white', fg='#34495e', font=('Arial', 11),
+                           justify=tk.CENTER)
+            desc.pack(pady=10)
+            
+            # Launch option only for install/reinstall
+            self.launch_now = tk.BooleanVar(value=True)
+            launch_cb = tk.Checkbutton(complete_frame, text="Launch VirtuKey now",
+                                      variable=self.launch_now,
+                                      bg='white', font=('Arial', 10, 'bold'))
+            launch_cb.pack(pady=20)
+        
+    def browse_folder(self):
+        """Browse for installation folder"""
+        folder = filedialog.askdirectory(initialdir=self.install_path.get())
+        if folder:
+            self.install_path.set(os.path.join(folder, "VirtuKey"))
+            # A picked folder is probed right away, without the typing delay
+            self.probe_install_path()
+            
+    def on_install_path_changed(self, *_):
+        """Re-probe the install path once the user stops typing"""
+        if self.path_probe_after is not None:
+            self.root.after_cancel(self.path_probe_after)
+        self.path_probe_after = self.root.after(PATH_PROBE_DELAY_MS, self.probe_install_path)
+        
+    def probe_install_path(self):
+        """Point the preflight checks at the current path; only the path probes re-run"""
+        if self.path_probe_after is not None:
+            self.root.after_cancel(self.path_probe_after)
+            self.path_probe_after = None
+        self.preflight.set_install_path(self.install_path.get().strip())
+        # A copy staged for the old path is useless now; start over at the new one
+        self.update_prestage()
+        if self.pages.get("options") and self.current_page is self.pages["options"][0]:
+            self.update_space_info()
+            
+    def go_back(self):
+        """Go to previous step"""
+        if self.current_step > 0:
+            # Repair has no option pages between the welcome page and its summary
+            if self.mode == "repair" and self.current_step == self.total_steps - 2:
+                self.show_step(0)
+            else:
+                self.show_step(self.current_step - 1)
+            
+    def go_next(self):
+        """Go to next step"""
+        if self.current_step < self.total_steps - 1:
+            if self.current_step == 0 and self.is_installed and self.action_mode.get() == "repair":
+                self.show_step(self.total_steps - 2)
+            else:
+                self.show_step(self.current_step + 1)
+            
+    def collect_options(self):
+        """Snapshot the wizard choices so the worker thread never reads Tk variables"""
+        return InstallOptions(
+            self.install_path.get().strip(),
+            create_desktop_shortcut=self.create_desktop_shortcut.get(),
+            create_startmenu_shortcut=self.create_startmenu_shortcut.get(),
+            auto_start=self.auto_start.get(),
+            remove_shortcuts=hasattr(self, 'remove_shortcuts') and self.remove_shortcuts.get(),
+            remove_settings=hasattr(self, 'remove_settings') and self.remove_settings.get())
+            
+    def start_installation(self):
+        """Start the actual installation process"""
+        # Validate installation path first
+        if not self.install_path.get().strip():
+            messagebox.showerror("Error", "Please specify an installation directory.")
+            return
+        options = self.collect_options()
+        # Already probed in the background; a check still running is left to the install itself
+        errors = self.preflight.errors(options.install_path, timeout=PREFLIGHT_WAIT)
+        if errors:
+            messagebox.showerror("Error", errors[0])
+            return
+        # The summary page said a running VirtuKey will be closed
+        proceed, pid = self.handle_running_virtukey("installation")
+        if not proceed:
+            return
+        
+        prestager = self.prestager
+        
+        def job(progress, cancel):
+            # Usually staged already while the user was on the earlier pages
+            prestaged = prestager.take(options.install_path, progress, cancel)
+            if pid is not None:
+                close_running_virtukey(progress)
+            perform_installation(options, progress, cancel, prestaged=prestaged)
+            
+        self.run_task(job, "Installing VirtuKey", "Installation Error", "Failed to install VirtuKey")
+        
+    def start_uninstallation(self):
+        """Start the uninstallation process"""
+        # First check if VirtuKey is running and handle it
+        proceed, pid = self.handle_running_virtukey()
+        if not proceed:
+            return  # User cancelled
+        options = self.collect_options()
+        
+        def job(progress, cancel):
+            if pid is not None:
+                close_running_virtukey(progress)
+            perform_uninstallation(options, progress, cancel)
+            
+        # Cancel only works until the install folder has been moved aside
+        self.run_task(job, "Uninstalling VirtuKey", "Uninstallation Error", "Failed to uninstall VirtuKey",
+                      "The uninstallation was cancelled before anything was removed.")
+        
+    def start_reinstallation(self):
+        """Start the reinstallation process (stage the new version, then swap it in)"""
+        proceed, pid = self.handle_running_virtukey("reinstallation")
+        if not proceed:
+            return  # User cancelled
+        options = self.collect_options()
+        prestager = self.prestager
+        
+        def job(progress, cancel):
+            # VirtuKey keeps running until the new version is staged and verified
+            close = (lambda: close_running_virtukey(progress)) if pid is not None else None
+            prestaged = prestager.take(options.install_path, progress, cancel)
+            perform_reinstallation(options, progress, cancel, before_swap=close, prestaged=prestaged)
+            
+        self.run_task(job, "Reinstalling VirtuKey", "Reinstallation Error", "Failed to reinstall VirtuKey")
+        
+    def start_repair(self):
+        """Start the repair process (restore only what is missing or damaged)"""
+        proceed, pid = self.handle_running_virtukey("repair")
+        if not proceed:
+            return  # User cancelled
+        options = self.collect_options()
+        self.repair_report = None
+        
+        def job(progress, cancel):
+            # VirtuKey is only closed if a file actually has to be replaced
+            close = (lambda: close_running_virtukey(progress)) if pid is not None else None
+            self.repair_report = perform_repair(options, progress, cancel, before_fix=close)
+            
+        # The complete page shows this run's report
+        self.invalidate_pages(("complete",))
+        self.run_task(job, "Repairing VirtuKey", "Repair Error", "Failed to repair VirtuKey")
+        
+    def handle_running_virtukey(self, action="uninstallation"):
+        """Ask what to do about a running VirtuKey before action; returns (proceed, pid to close)"""
+        is_running, pid = is_virtukey_running()
+        
+        if not is_running:
+            return True, None
+        
+        # Ask user what to do
+        result = messagebox.askyesnocancel(
+            "VirtuKey is Running",
+            f"VirtuKey is currently running and must be closed before the {action}.\n\n"
+            "Would you like to:\n"
+            "• Yes - Automatically close VirtuKey and continue\n"
+            f"• No - Cancel the {action} (you can close it manually)\n"
+            "• Cancel - Return to previous step"
+        )
+        
+        if result is True:  # Yes - close automatically (done by the worker)
+            return True, pid
+        # No / Cancel - stay on this step
+        return False, None
+        
+    def run_task(self, job, heading, error_title, error_prefix, cancelled_message="The operation was cancelled."):
+        """Run job(progress, cancel) on a worker thread while the UI shows live progress"""
+        self.task_error = (error_title, error_prefix)
+        self.task_cancelled = cancelled_message
+        
+        def traced_job(progress, cancel):
+            with span(heading):
+                job(progress, cancel)
+        
+        self.worker = InstallWorker(traced_job)
+        self.show_progress_page(heading)
+        
+        # Only Cancel stays usable while the worker runs
+        self.back_button.config(state=tk.DISABLED, bg='#f8fafc', fg='#cbd5e1')
+        self.next_button.config(state=tk.DISABLED, bg='#cbd5e1', fg='#9ca3af')
+        self.cancel_button.config(command=self.cancel_running_task, state=tk.NORMAL)
+        self.cancel_button.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.worker.start()
+        self.root.after(WORKER_POLL_MS, self.poll_worker)
+        
+    def poll_worker(self):
+        """Apply queued worker events on the Tk thread; reschedules itself until the job ends"""
+        worker = self.worker
+        if worker is None:
+            return
+        
+        message, fraction, final = worker.drain()
+        if message is not None:
+            self.progress_status.config(text=message)
+        if fraction is not None:
+            self.progress_bar['value'] = fraction * 100
+            self.progress_percent.config(text=f"{int(fraction * 100)}%")
+        
+        if final is None:
+            self.root.after(WORKER_POLL_MS, self.poll_worker)
+            return
+        
+        self.worker = None
+        self.cancel_button.config(command=self.cancel_installation, state=tk.NORMAL)
+        kind, payload = final
+        if kind == EVENT_DONE:
+            self.show_step(self.total_steps - 1)
+        elif kind == EVENT_CANCELLED:
+            messagebox.showinfo("Cancelled", self.task_cancelled)
+            self.show_step(self.total_steps - 2)
+        else:
+            error_title, error_prefix = self.task_error
+            messagebox.showerror(error_title, f"{error_prefix}:\n{payload}")
+            # The system may have changed under us; check again before a retry
+            self.preflight.forget()
+            self.preflight.start(self.install_path.get().strip())
+            self.show_step(self.total_steps - 2)
+            
+    def cancel_running_task(self):
+        """Ask the worker to stop at its next checkpoint"""
+        if self.worker is None:
+            return
+        if messagebox.askyesno("Cancel", "Are you sure you want to stop the current operation?"):
+            if self.worker is not None:
+                self.worker.cancel()
+                self.progress_status.config(text="Cancelling...")
+                self.cancel_button.config(state=tk.DISABLED)
+                
+    def on_close(self):
+        """Window close button; a running worker is cancelled instead of abandoned"""
+        if self.worker is not None:
+            self.cancel_running_task()
+            return
+        self.root.destroy()
+        
+    def finish_installation(self):
+        """Finish the installation/uninstallation"""
+        if self.mode != "uninstall" and hasattr(self, 'launch_now') and self.launch_now.get():
+            # Launch the application only for install/reinstall
+            exe_path = Path(self.install_path.get()) / "VirtuKey.exe"
+            if exe_path.exists():
+                os.startfile(str(exe_path))
+                
+        self.root.quit()
+        
+    def cancel_installation(self):
+        """Cancel the installation/uninstallation"""
+        action = "uninstallation" if self.mode == "uninstall" else "installation"
+        result = messagebox.askyesno("Cancel", 
+                                   f"Are you sure you want to cancel the {action}?")
+        if result:
+            self.root.quit()
+            
+    def run(self):
+        """Start the installer"""
+        # Center the window
+        self.root.update_idletasks()
+        x = (self.root.winfo_screenwidth() // 2) - (700 // 2)
+        y = (self.root.winfo_screenheight() // 2) - (600 // 2)
+        self.root.geometry(f"700x600+{x}+{y}")
+        
+        self.root.mainloop()
+        self.preflight.shutdown()
+        self.prestager.discard()
+
+if __name__ == "__main__":
+    installer = VirtuKeyInstaller()
+    installer.run()
\ No newline at end of file
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Install manifest
+A small JSON index, outside the install directory, recording every install:
+root, files (size, mtime, hash), shortcuts and registry values. Detection,
+uninstall and repair read it instead of probing the filesystem.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from reconcile import file_sha256
+
+MANIFEST_VERSION = 1
+MANIFEST_DIR_NAME = "VirtuKey Setup"
+MANIFEST_FILE_NAME = "install-manifest.json"
+
+
+def manifest_path(home=None):
+    """Well-known manifest location: %LOCALAPPDATA%\\VirtuKey Setup\\install-manifest.json"""
+    if home is None and os.environ.get("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"])
+    else:
+        base = Path(home or Path.home()) / "AppData" / "Local"
+    return base / MANIFEST_DIR_NAME / MANIFEST_FILE_NAME
+
+
+def _key(install_path):
+    # Windows paths are case-insensitive; one record per physical location
+    return os.path.normcase(os.path.abspath(str(install_path)))
+
+
+class InstallRecord:
+    """Everything one install put on the machine"""
+
+    def __init__(self, install_path, files=None, shortcuts=None, registry=None, installed_at=None, store=None):
+        self.install_path = str(install_path)
+        self.files = files or {}          # name -> {"size", "mtime_ns", "sha256"}
+        self.shortcuts = shortcuts or []  # absolute .lnk paths
+        self.registry = registry or []    # {"hive", "key", "name", "value"}
+        self.installed_at = installed_at or time.time()
+        self.store = store                # shared content store the files link into (store.py), or None
+
+    @classmethod
+    def capture(cls, install_path, names, shortcuts=(), registry=(), previous=None, hash_func=file_sha256):
+        """Stat and hash the installed files
+
+        Hashes from a previous record are reused for files whose size and
+        mtime are unchanged, so a no-op reinstall doesn't reread the payload.
+        hash_func can answer from a cache (VerifyCache.digest).
+        """
+        install_dir = Path(install_path)
+        old_files = previous.files if previous is not None else {}
+        files = {}
+        for name in names:
+            path = install_dir / name
+            st = path.stat()
+            old = old_files.get(name)
+            if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+                sha256 = old["sha256"]
+            else:
+                sha256 = hash_func(path)
+            files[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+        return cls(install_path, files, [str(s) for s in shortcuts], list(registry))
+
+    def to_dict(self):
+        return {
+            "install_path": self.install_path,
+            "files": self.files,
+            "shortcuts": self.shortcuts,
+            "registry": self.registry,
+            "installed_at": self.installed_at,
+            "store": self.store,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["install_path"], data.get("files"), data.get("shortcuts"),
+                   data.get("registry"), data.get("installed_at"), data.get("store"))
+
+
+class InstallManifest:
+    """The index of install records, keyed by normalised install root"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else manifest_path()
+        self.records = {}
+        self.tombstones = []  # renamed-away install dirs still waiting to be deleted
+
+    @classmethod
+    def load(cls, path=None):
+        """Read the manifest; a missing or unreadable file is an empty index"""
+        manifest = cls(path)
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                for record in data.get("installs", []):
+                    record = InstallRecord.from_dict(record)
+                    manifest.records[_key(record.install_path)] = record
+                manifest.tombstones = [str(p) for p in data.get("tombstones", [])]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        return manifest
+
+    def save(self):
+        """Write atomically so an interrupted run never leaves a torn index"""
+        if not self.records and not self.tombstones:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "installs": [r.to_dict() for r in sorted(self.records.values(), key=lambda r: r.installed_at)],
+            "tombstones": self.tombstones,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def get(self, install_path):
+        return self.records.get(_key(install_path))
+
+    def current(self):
+        """Most recently installed record, or None"""
+        if not self.records:
+            return None
+        return max(self.records.values(), key=lambda r: r.installed_at)
+
+    def put(self, record):
+        self.records[_key(record.install_path)] = record
+
+    def remove(self, install_path):
+        return self.records.pop(_key(install_path), None)
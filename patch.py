@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Binary delta patches
+Upgrades an installed file with a small patch instead of a full copy. A
+patch file (<name>.vkpatch) is a standard BSDIFF40 delta wrapped in a header
+that names the exact source and target builds:
+
+    b"VKPATCH1" | source sha256 (32) | target sha256 (32) | target size (u64 LE) | BSDIFF40 data
+
+The source hash is checked before patching and the target hash after, so a
+patch only ever turns the one build it was made from into the one build it
+was made for; anything else is a PatchError and the caller copies the full
+file instead.
+
+Patches can come from any bsdiff 4 tool (wrap the output with wrap_bsdiff)
+or from make_bsdiff here, which is simpler and produces somewhat larger
+deltas:  python patch.py OLD NEW OUT.vkpatch
+"""
+
+import bz2
+import hashlib
+import os
+import struct
+import sys
+from pathlib import Path
+
+PATCH_MAGIC = b"VKPATCH1"
+BSDIFF_MAGIC = b"BSDIFF40"
+PATCH_SUFFIX = ".vkpatch"
+HEADER = struct.Struct("<8s32s32sQ")
+BSDIFF_HEADER = struct.Struct("<8s8s8s8s")
+
+BLOCK_SIZE = 32     # match seeds for make_bsdiff
+RESYNC_BYTES = 8    # equal bytes needed to carry a match across a few changed ones
+MAX_GAP = 16        # changed bytes a match may carry
+
+
+class PatchError(Exception):
+    """The patch doesn't fit the installed file, is damaged, or produced the wrong result"""
+
+
+class PatchHeader:
+    """Which build a patch applies to and which build it produces"""
+
+    def __init__(self, source_sha256, target_sha256, target_size):
+        self.source_sha256 = source_sha256
+        self.target_sha256 = target_sha256
+        self.target_size = target_size
+
+
+def patch_for(patch_dir, name):
+    """Path of the patch for payload file name in patch_dir, or None"""
+    if not patch_dir:
+        return None
+    path = Path(patch_dir) / (name + PATCH_SUFFIX)
+    return path if path.is_file() else None
+
+
+def _parse_header(data, path):
+    if len(data) < HEADER.size:
+        raise PatchError(f"{Path(path).name} is too short to be a patch")
+    magic, source, target, size = HEADER.unpack_from(data)
+    if magic != PATCH_MAGIC:
+        raise PatchError(f"{Path(path).name} is not a VirtuKey patch")
+    return PatchHeader(source.hex(), target.hex(), size)
+
+
+def read_header(path):
+    """Just the PatchHeader, without reading the delta"""
+    try:
+        with open(path, "rb") as f:
+            return _parse_header(f.read(HEADER.size), path)
+    except OSError as e:
+        raise PatchError(f"Cannot read {Path(path).name}: {e}")
+
+
+def read_patch(path):
+    """Split a patch file into (PatchHeader, BSDIFF40 data)"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise PatchError(f"Cannot read {Path(path).name}: {e}")
+    return _parse_header(data, path), data[HEADER.size:]
+
+
+def wrap_bsdiff(bsdiff_data, source_sha256, target_sha256, target_size):
+    """Prefix raw BSDIFF40 data with the VirtuKey patch header"""
+    return HEADER.pack(PATCH_MAGIC, bytes.fromhex(source_sha256), bytes.fromhex(target_sha256),
+                       target_size) + bsdiff_data
+
+
+def _offtin(buf, pos):
+    """bsdiff's 64-bit sign-magnitude integer"""
+    value = int.from_bytes(buf[pos:pos + 8], "little")
+    if value & (1 << 63):
+        return -(value & ~(1 << 63))
+    return value
+
+
+def _offtout(value):
+    if value < 0:
+        return ((-value) | (1 << 63)).to_bytes(8, "little")
+    return value.to_bytes(8, "little")
+
+
+def _add_bytes(a, b):
+    """Bytewise (a + b) mod 256, as big-integer arithmetic instead of a Python loop"""
+    n = len(a)
+    if not b.strip(b"\0"):
+        return bytes(a)
+    x = int.from_bytes(a, "little")
+    y = int.from_bytes(b, "little")
+    low = int.from_bytes(b"\x7f" * n, "little")
+    high = int.from_bytes(b"\x80" * n, "little")
+    return (((x & low) + (y & low)) ^ ((x ^ y) & high)).to_bytes(n, "little")
+
+
+def _sub_bytes(a, b):
+    """Bytewise (a - b) mod 256"""
+    n = len(a)
+    if a == b:
+        return bytes(n)
+    x = int.from_bytes(a, "little")
+    y = int.from_bytes(b, "little")
+    high = int.from_bytes(b"\x80" * n, "little")
+    # SWAR subtraction: borrow can't cross bytes because the high bits are set first
+    return (((x | high) - (y & ~high)) ^ ((x ^ ~y) & high)).to_bytes(n, "little")
+
+
+def apply_bsdiff(old, patch):
+    """Rebuild the new file from old and BSDIFF40 data"""
+    if len(patch) < BSDIFF_HEADER.size or patch[:8] != BSDIFF_MAGIC:
+        raise PatchError("not BSDIFF40 data")
+    ctrl_len = _offtin(patch, 8)
+    diff_len = _offtin(patch, 16)
+    new_size = _offtin(patch, 24)
+    if ctrl_len < 0 or diff_len < 0 or new_size < 0 or BSDIFF_HEADER.size + ctrl_len + diff_len > len(patch):
+        raise PatchError("corrupt BSDIFF40 header")
+    start = BSDIFF_HEADER.size
+    try:
+        ctrl = bz2.decompress(patch[start:start + ctrl_len])
+        diff = bz2.decompress(patch[start + ctrl_len:start + ctrl_len + diff_len])
+        extra = bz2.decompress(patch[start + ctrl_len + diff_len:])
+    except (OSError, ValueError) as e:
+        raise PatchError(f"corrupt BSDIFF40 data: {e}")
+
+    new = bytearray()
+    old_pos = diff_pos = extra_pos = ctrl_pos = 0
+    old_size = len(old)
+    while len(new) < new_size:
+        if ctrl_pos + 24 > len(ctrl):
+            raise PatchError("truncated control block")
+        add = _offtin(ctrl, ctrl_pos)
+        copy = _offtin(ctrl, ctrl_pos + 8)
+        seek = _offtin(ctrl, ctrl_pos + 16)
+        ctrl_pos += 24
+        if add < 0 or copy < 0 or len(new) + add + copy > new_size:
+            raise PatchError("corrupt control block")
+        if diff_pos + add > len(diff) or extra_pos + copy > len(extra):
+            raise PatchError("truncated diff or extra block")
+
+        # Bytes outside the old file count as zero, as in bsdiff's bspatch
+        lo = min(max(old_pos, 0), old_size)
+        hi = min(max(old_pos + add, 0), old_size)
+        base = bytes(lo - old_pos if old_pos < 0 else 0) + old[lo:hi]
+        base += bytes(add - len(base))
+        new += _add_bytes(base, diff[diff_pos:diff_pos + add])
+        diff_pos += add
+        old_pos += add
+
+        new += extra[extra_pos:extra_pos + copy]
+        extra_pos += copy
+        old_pos += seek
+    return bytes(new)
+
+
+def _first_mismatch(a, b, start_a, start_b, length):
+    """Offset of the first differing byte within length, or length if none"""
+    lo, hi = 0, length
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[start_a:start_a + mid] == b[start_b:start_b + mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _extend(old, new, o, n):
+    """Length of the match at old[o:], new[n:], carried across short runs of changed bytes"""
+    length = 0
+    limit = min(len(old) - o, len(new) - n)
+    while length < limit:
+        step = min(4096, limit - length)
+        if old[o + length:o + length + step] == new[n + length:n + length + step]:
+            length += step
+            continue
+        length += _first_mismatch(old, new, o + length, n + length, step)
+        resync = None
+        for gap in range(1, MAX_GAP + 1):
+            a = o + length + gap
+            b = n + length + gap
+            if a + RESYNC_BYTES > len(old) or b + RESYNC_BYTES > len(new):
+                break
+            if old[a:a + RESYNC_BYTES] == new[b:b + RESYNC_BYTES]:
+                resync = gap
+                break
+        if resync is None:
+            break
+        length += resync
+    return min(length, limit)
+
+
+def make_bsdiff(old, new):
+    """BSDIFF40 data turning old into new
+
+    Matches are seeded from aligned blocks of old and grown across small
+    edits (changed addresses, timestamps), which is where builds of the
+    same program differ. Unmatched bytes go to the extra block.
+    """
+    old = bytes(old)
+    new = bytes(new)
+    index = {}
+    for pos in range(0, len(old) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        index.setdefault(old[pos:pos + BLOCK_SIZE], pos)
+
+    ctrl, diff, extra = bytearray(), bytearray(), bytearray()
+    match_old, match_new, match_len = 0, 0, 0  # the match waiting to be written
+    pos = 0
+    while pos + BLOCK_SIZE <= len(new):
+        o = index.get(new[pos:pos + BLOCK_SIZE])
+        if o is None:
+            pos += 1
+            continue
+        # Grow backwards into bytes not yet claimed by the previous match
+        back = 0
+        floor = match_new + match_len
+        while pos - back > floor and o - back > 0 and old[o - back - 1] == new[pos - back - 1]:
+            back += 1
+        o -= back
+        start = pos - back
+        length = _extend(old, new, o, start)
+
+        ctrl += _offtout(match_len) + _offtout(start - (match_new + match_len)) + \
+            _offtout(o - (match_old + match_len))
+        diff += _sub_bytes(new[match_new:match_new + match_len], old[match_old:match_old + match_len])
+        extra += new[match_new + match_len:start]
+        match_old, match_new, match_len = o, start, length
+        pos = start + max(length, 1)
+
+    ctrl += _offtout(match_len) + _offtout(len(new) - (match_new + match_len)) + _offtout(0)
+    diff += _sub_bytes(new[match_new:match_new + match_len], old[match_old:match_old + match_len])
+    extra += new[match_new + match_len:]
+
+    ctrl_bz = bz2.compress(bytes(ctrl))
+    diff_bz = bz2.compress(bytes(diff))
+    extra_bz = bz2.compress(bytes(extra))
+    header = BSDIFF_MAGIC + _offtout(len(ctrl_bz)) + _offtout(len(diff_bz)) + _offtout(len(new))
+    return header + ctrl_bz + diff_bz + extra_bz
+
+
+def make_patch(old_path, new_path, patch_path):
+    """Write a .vkpatch that upgrades old_path's build to new_path's"""
+    with open(old_path, "rb") as f:
+        old = f.read()
+    with open(new_path, "rb") as f:
+        new = f.read()
+    data = wrap_bsdiff(make_bsdiff(old, new), hashlib.sha256(old).hexdigest(),
+                       hashlib.sha256(new).hexdigest(), len(new))
+    with open(patch_path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def apply_patch(patch_path, source_path, dest_path, source_sha256=None):
+    """Patch source_path into dest_path and return the result's SHA-256
+
+    source_sha256 may come from a cache; otherwise the source is hashed.
+    dest_path is written through a temporary file, so a failure never
+    leaves a half-patched file behind. Raises PatchError.
+    """
+    header, body = read_patch(patch_path)
+    try:
+        with open(source_path, "rb") as f:
+            old = f.read()
+    except OSError as e:
+        raise PatchError(f"Cannot read {Path(source_path).name}: {e}")
+    if source_sha256 is None:
+        source_sha256 = hashlib.sha256(old).hexdigest()
+    if source_sha256 != header.source_sha256:
+        raise PatchError(f"{Path(source_path).name} is not the build this patch was made for")
+
+    new = apply_bsdiff(old, body)
+    if len(new) != header.target_size or hashlib.sha256(new).hexdigest() != header.target_sha256:
+        raise PatchError(f"Patching {Path(source_path).name} produced the wrong result")
+
+    dest_path = Path(dest_path)
+    tmp_path = dest_path.with_name(dest_path.name + ".patching")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(new)
+        os.replace(tmp_path, dest_path)
+    except OSError as e:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise PatchError(f"Cannot write {dest_path.name}: {e}")
+    return header.target_sha256
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python patch.py OLD NEW OUT.vkpatch", file=sys.stderr)
+        sys.exit(2)
+    size = make_patch(*sys.argv[1:])
+    print(f"{sys.argv[3]}: {size} bytes")
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Preflight checks
+Probes the target system (install folder, free space, registry, shortcut
+folders, running instances) on background threads as soon as the wizard
+opens, so the results are ready by the time Install is clicked. Results are
+cached per install path; changing the path only re-runs the probes that
+depend on it.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from pathlib import Path
+
+import install_core
+from tracing import span
+
+# Probe outcomes
+STATUS_OK = "ok"
+STATUS_WARNING = "warning"  # the install can go ahead, with that step skipped
+STATUS_ERROR = "error"      # the install would fail
+
+PROBE_INSTALL_DIR = "install_dir"
+PROBE_DISK_SPACE = "disk_space"
+PROBE_REGISTRY = "registry"
+PROBE_SHORTCUTS = "shortcut_dirs"
+PROBE_RUNNING = "running"
+
+# Probes whose answer depends on the chosen install path
+PATH_PROBES = (PROBE_INSTALL_DIR, PROBE_DISK_SPACE)
+SYSTEM_PROBES = (PROBE_REGISTRY, PROBE_SHORTCUTS, PROBE_RUNNING)
+
+SPACE_MARGIN = 1024 * 1024  # headroom on top of the payload size
+MB = 1024 * 1024
+
+
+class ProbeResult:
+    """Outcome of one probe: status, a message for the user and the raw value"""
+
+    def __init__(self, name, status, message, value=None, elapsed=0.0):
+        self.name = name
+        self.status = status
+        self.message = message
+        self.value = value
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.status == STATUS_OK
+
+    def __repr__(self):
+        return f"ProbeResult({self.name!r}, {self.status!r}, {self.message!r})"
+
+
+def nearest_existing(path):
+    """The path itself or its closest ancestor that exists"""
+    path = Path(path)
+    for candidate in (path, *path.parents):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _writable(directory):
+    """Create and drop a temporary file in directory; raises OSError if that is refused"""
+    with tempfile.TemporaryFile(dir=directory, prefix="virtukey-preflight-"):
+        pass
+
+
+def probe_install_dir(install_path):
+    """Can the install folder be created (or written, if it already exists)?
+
+    Nothing is created: the check writes a temporary file into the nearest
+    folder that already exists.
+    """
+    install_path = str(install_path).strip()
+    if not install_path:
+        return ProbeResult(PROBE_INSTALL_DIR, STATUS_ERROR, "Please specify an installation directory.")
+    target = Path(install_path)
+    if target.exists() and not target.is_dir():
+        return ProbeResult(PROBE_INSTALL_DIR, STATUS_ERROR,
+                           f"Cannot access the installation directory:\n{install_path} is a file\n\n"
+                           f"Please choose a different location.")
+    existing = nearest_existing(target)
+    if existing is None or not existing.is_dir():
+        return ProbeResult(PROBE_INSTALL_DIR, STATUS_ERROR,
+                           f"Cannot access the installation directory:\n{install_path}\n\n"
+                           f"Please choose a different location.")
+    try:
+        _writable(existing)
+    except PermissionError:
+        return ProbeResult(PROBE_INSTALL_DIR, STATUS_ERROR,
+                           f"Cannot write to the selected directory:\n{install_path}\n\n"
+                           f"Please choose a different location or run as administrator.")
+    except OSError as e:
+        return ProbeResult(PROBE_INSTALL_DIR, STATUS_ERROR,
+                           f"Cannot access the installation directory:\n{str(e)}\n\n"
+                           f"Please choose a different location.")
+    return ProbeResult(PROBE_INSTALL_DIR, STATUS_OK, "Installation directory is writable", str(existing))
+
+
+def payload_size(payload_dir=None):
+    """Total bytes of the payload files that exist"""
+    bundle = install_core.open_payload_bundle(payload_dir)
+    if bundle is not None:
+        return sum(entry.size for name, entry in bundle.entries.items() if name in install_core.PAYLOAD_FILES)
+    total = 0
+    for file_name in install_core.PAYLOAD_FILES:
+        if payload_dir:
+            source = Path(payload_dir) / file_name
+        else:
+            source = Path(install_core.get_resource_path(file_name))
+        try:
+            total += source.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def probe_disk_space(install_path, required):
+    """Is there room for the payload on the install volume?"""
+    existing = nearest_existing(str(install_path).strip() or ".")
+    if existing is None:
+        return ProbeResult(PROBE_DISK_SPACE, STATUS_ERROR, "The installation drive does not exist.")
+    try:
+        free = shutil.disk_usage(existing).free
+    except OSError as e:
+        return ProbeResult(PROBE_DISK_SPACE, STATUS_WARNING, f"Could not check free space: {e}")
+    if free < required + SPACE_MARGIN:
+        return ProbeResult(PROBE_DISK_SPACE, STATUS_ERROR,
+                           f"Not enough free space: {required / MB:.1f} MB required, "
+                           f"{free / MB:.1f} MB available.", free)
+    return ProbeResult(PROBE_DISK_SPACE, STATUS_OK, f"{free / MB:,.0f} MB free", free)
+
+
+def probe_registry(user_sid=None):
+    """Can the Run key be opened for writing (needed for auto-start)?"""
+    winreg = install_core.winreg
+    if winreg is None:
+        return ProbeResult(PROBE_REGISTRY, STATUS_WARNING, "Registry is not available; auto-start will be skipped")
+    hive, hive_name, key_path = install_core._run_key(user_sid)
+    try:
+        with winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE):
+            pass
+    except OSError as e:
+        return ProbeResult(PROBE_REGISTRY, STATUS_WARNING, f"Cannot write {hive_name}\\{key_path}: {e}")
+    return ProbeResult(PROBE_REGISTRY, STATUS_OK, "Startup registry key is writable")
+
+
+def probe_shortcut_dirs(profile_dir=None):
+    """Can shortcuts be written to the Start Menu and the Desktop?"""
+    problems = []
+    for label, directory in (("Start Menu", install_core.startmenu_dir(profile_dir)),
+                             ("Desktop", install_core.desktop_dir(profile_dir))):
+        existing = nearest_existing(directory)
+        try:
+            if existing is None:
+                raise OSError(f"{directory} does not exist")
+            _writable(existing)
+        except OSError as e:
+            problems.append(f"{label}: {e}")
+    if problems:
+        return ProbeResult(PROBE_SHORTCUTS, STATUS_WARNING,
+                           "Some shortcuts cannot be created (" + "; ".join(problems) + ")", problems)
+    return ProbeResult(PROBE_SHORTCUTS, STATUS_OK, "Shortcut folders are writable")
+
+
+def probe_running():
+    """Is VirtuKey running right now? (value: (is_running, pid))"""
+    running, pid = install_core.is_virtukey_running()
+    if running:
+        return ProbeResult(PROBE_RUNNING, STATUS_WARNING, "VirtuKey is running and will be closed",
+                           (running, pid))
+    return ProbeResult(PROBE_RUNNING, STATUS_OK, "VirtuKey is not running", (running, pid))
+
+
+def _timed(name, func, *args):
+    start = time.perf_counter()
+    with span(f"preflight:{name}"):
+        try:
+            result = func(*args)
+        except Exception as e:
+            # A broken probe must not take the wizard down; report it instead
+            result = ProbeResult(name, STATUS_WARNING, f"Check failed: {e}")
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+class Preflight:
+    """Runs every probe concurrently and caches the results
+
+    Path-dependent probes are cached per normalized install path, so going
+    back to an earlier choice reuses its answers. System probes run once.
+    """
+
+    def __init__(self, profile_dir=None, user_sid=None, payload_dir=None, max_workers=None):
+        self.profile_dir = profile_dir
+        self.user_sid = user_sid
+        self.payload_dir = payload_dir
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or len(PATH_PROBES) + len(SYSTEM_PROBES),
+                                           thread_name_prefix="VirtuKeyPreflight")
+        self.futures = {}  # (probe name, path key or None) -> Future
+        self.lock = threading.Lock()
+        self.install_path = None
+        self._required = None
+
+    @staticmethod
+    def _key(install_path):
+        return os.path.normcase(os.path.abspath(str(install_path).strip() or "."))
+
+    def _submit(self, name, key, func, *args):
+        with self.lock:
+            future = self.futures.get((name, key))
+            if future is None:
+                future = self.executor.submit(_timed, name, func, *args)
+                self.futures[(name, key)] = future
+            return future
+
+    def required_bytes(self):
+        if self._required is None:
+            self._required = payload_size(self.payload_dir)
+        return self._required
+
+    def start(self, install_path):
+        """Kick off every probe; returns immediately"""
+        self._submit(PROBE_REGISTRY, None, probe_registry, self.user_sid)
+        self._submit(PROBE_SHORTCUTS, None, probe_shortcut_dirs, self.profile_dir)
+        self._submit(PROBE_RUNNING, None, probe_running)
+        self.set_install_path(install_path)
+
+    def set_install_path(self, install_path):
+        """Switch to another install path; only its path probes run, and only once"""
+        self.install_path = str(install_path)
+        self._probe_path(self.install_path)
+
+    def _probe_path(self, install_path):
+        key = self._key(install_path)
+        self._submit(PROBE_INSTALL_DIR, key, probe_install_dir, install_path)
+        self._submit(PROBE_DISK_SPACE, key, lambda path: probe_disk_space(path, self.required_bytes()),
+                     install_path)
+
+    def _future(self, name, install_path=None):
+        key = None
+        if name in PATH_PROBES:
+            path = self.install_path if install_path is None else install_path
+            if path is None:
+                return None
+            key = self._key(path)
+        with self.lock:
+            return self.futures.get((name, key))
+
+    def peek(self, name, install_path=None):
+        """The cached result if that probe has finished, else None (never blocks)"""
+        future = self._future(name, install_path)
+        if future is None or not future.done():
+            return None
+        return future.result()
+
+    def result(self, name, install_path=None, timeout=None):
+        """The probe's result, waiting for it if it is still running"""
+        if install_path is not None and name in PATH_PROBES:
+            self._probe_path(str(install_path))
+        future = self._future(name, install_path)
+        if future is None:
+            return None
+        return future.result(timeout)
+
+    def results(self, install_path=None, timeout=None):
+        """Every probe's result for install_path (the current one by default)"""
+        names = PATH_PROBES + SYSTEM_PROBES
+        return {name: self.result(name, install_path, timeout) for name in names}
+
+    def finished(self, install_path=None):
+        """Results of the probes that are already done (never blocks)"""
+        names = PATH_PROBES + SYSTEM_PROBES
+        return {name: r for name, r in ((name, self.peek(name, install_path)) for name in names) if r is not None}
+
+    def pending(self, install_path=None):
+        """True while any probe for install_path is still running"""
+        names = PATH_PROBES + SYSTEM_PROBES
+        return any(self.peek(name, install_path) is None for name in names)
+
+    def errors(self, install_path=None, timeout=None):
+        """Messages of the probes that would make the install fail
+
+        A probe still running after timeout seconds (for all of them) is left out, so the Tk
+        thread never waits on a slow drive for long.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results = []
+        for name in PATH_PROBES:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                results.append(self.result(name, install_path, remaining))
+            except TimeoutError:
+                pass
+        return [r.message for r in results if r is not None and r.status == STATUS_ERROR]
+
+    def forget(self, names=SYSTEM_PROBES + PATH_PROBES):
+        """Drop cached results so they are probed again (e.g. after a failed install)"""
+        with self.lock:
+            for cache_key in [k for k in self.futures if k[0] in names]:
+                del self.futures[cache_key]
+
+    def shutdown(self):
+        """Stop accepting probes; ones still running finish in the background"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
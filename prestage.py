@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Speculative pre-staging
+While the user reads the license and picks options, the payload is copied
+into the hidden staging directory beside the chosen install path (the same
+one a staged reinstall uses). Changing the path cancels that copy and starts
+over at the new place. When Install is clicked, the copy is usually done
+already and the install only has to rename it into place.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from copy_engine import CopyEngine
+from install_core import CancelToken, InstallCancelled, payload_sources, make_patcher, patch_dir_for
+from staging import build_staging, verify_staging, staging_paths, leftover_dirs, discard_tree
+from tracing import span
+from verify_cache import VerifyCache, cache_path
+
+STATE_RUNNING = "running"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+
+WAIT_POLL_SECONDS = 0.1
+
+
+def _path_key(install_path):
+    return os.path.normcase(os.path.abspath(str(install_path).strip()))
+
+
+class PrestageJob(threading.Thread):
+    """Stage and verify the payload for one install path on a background thread"""
+
+    def __init__(self, install_path, payload_dir=None, profile_dir=None, patch_dir=None, after=None):
+        # A daemon: leftovers of an interrupted stage are cleaned up by the next run
+        super().__init__(name="VirtuKeyPrestage", daemon=True)
+        self.after = after  # an earlier job's cleanup of the same staging dir, waited for first
+        self.install_path = str(install_path).strip()
+        self.key = _path_key(install_path)
+        self.payload_dir = payload_dir
+        self.profile_dir = profile_dir
+        self.patch_dir = patch_dir
+        self.staging_dir = staging_paths(self.install_path)[0]
+        self.cancel_token = CancelToken()
+        self.state = STATE_RUNNING
+        self.error = None
+        self.fraction = 0.0
+        self.created = []  # parent folders this job had to create, innermost last
+
+    def run(self):
+        if self.after is not None:
+            self.after.join()
+        try:
+            with span("prestage", path=self.install_path) as s:
+                install_dir = Path(self.install_path)
+                for leftover in leftover_dirs(install_dir):
+                    if leftover != self.staging_dir:
+                        discard_tree(leftover)
+                self._create_parents(install_dir.parent)
+                sources = payload_sources(self.payload_dir)
+                cache = VerifyCache.load(cache_path(self.profile_dir))
+                engine = CopyEngine(cancel=self.cancel_token, hash_files=True, known_digest=cache.lookup)
+                engine.on_progress = lambda p: setattr(self, "fraction", p.fraction)
+                patcher = make_patcher(patch_dir_for(self.payload_dir, self.patch_dir), cache)
+                copied = build_staging(sources, install_dir, self.staging_dir, engine, cache.digest, patcher,
+                                       known_digest=cache.lookup)
+                self.cancel_token.check()
+                verify_staging(copied, engine.digests, cache.lookup)
+                self.cancel_token.check()
+                # The install picks these hashes up after renaming the stage into place
+                cache.record_copies(copied, engine.digests)
+                cache.save()
+                s.set(copied=len(copied))
+            self.fraction = 1.0
+            self.state = STATE_READY
+        except InstallCancelled:
+            self.cleanup()
+            self.state = STATE_CANCELLED
+        except Exception as e:
+            self.cleanup()
+            self.error = str(e)
+            self.state = STATE_FAILED
+
+    def _create_parents(self, parent):
+        missing = []
+        while not parent.exists():
+            missing.append(parent)
+            parent = parent.parent
+        for folder in reversed(missing):
+            folder.mkdir(exist_ok=True)
+            self.created.append(folder)
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+    def cleanup(self):
+        """Remove the staging dir and any parent folders created only for it"""
+        discard_tree(self.staging_dir)
+        for folder in reversed(self.created):
+            try:
+                folder.rmdir()
+            except OSError:
+                break  # not empty: something else lives there now
+        self.created = []
+
+
+class Prestager:
+    """Keeps at most one speculative stage going, for the latest install path"""
+
+    def __init__(self, payload_dir=None, profile_dir=None, patch_dir=None):
+        self.payload_dir = payload_dir
+        self.profile_dir = profile_dir
+        self.patch_dir = patch_dir
+        self.job = None
+        self.lock = threading.Lock()
+        self.dropping = {}  # path key -> thread still cancelling and removing a dropped stage
+
+    def stage(self, install_path):
+        """Start staging for install_path; a running stage for another path is dropped"""
+        if not str(install_path).strip():
+            self.discard()
+            return
+        with self.lock:
+            job = self.job
+            if job is not None and job.key == _path_key(install_path) and job.state in (STATE_RUNNING, STATE_READY):
+                return
+            self.job = None
+        if job is not None:
+            self._drop(job)
+        with self.lock:
+            dropping = self.dropping.get(_path_key(install_path))
+            job = PrestageJob(install_path, self.payload_dir, self.profile_dir, self.patch_dir,
+                              after=dropping if dropping is not None and dropping.is_alive() else None)
+            self.job = job
+        job.start()
+
+    def _drop(self, job, wait=False):
+        """Cancel job and remove what it staged; off the calling thread unless wait
+
+        The GUI calls this on every path change, so the Tk thread never waits
+        for a copy to stop or a staged payload to be deleted. Not a daemon: a
+        closing installer finishes the cleanup before it exits.
+        """
+        def finish():
+            job.join()
+            if job.state == STATE_READY:
+                job.cleanup()
+
+        job.cancel()
+        if wait:
+            finish()
+            return
+        thread = threading.Thread(target=finish, name="VirtuKeyPrestageDrop")
+        with self.lock:
+            self.dropping = {key: t for key, t in self.dropping.items() if t.is_alive()}
+            self.dropping[job.key] = thread
+        thread.start()
+
+    def discard(self):
+        """Cancel any stage; what it copied is removed in the background"""
+        with self.lock:
+            job, self.job = self.job, None
+        if job is not None:
+            self._drop(job)
+
+    def take(self, install_path, progress=None, cancel=None):
+        """Hand over the staging dir for install_path, waiting for it to finish
+
+        Returns None if nothing usable was staged for that path; the caller
+        then copies the normal way. Once taken, the caller owns the directory.
+        """
+        with self.lock:
+            job = self.job
+            if job is None or job.key != _path_key(install_path):
+                job = None
+            else:
+                self.job = None
+        if job is None:
+            self.discard()
+            with self.lock:
+                dropping = self.dropping.get(_path_key(install_path))
+            if dropping is not None:
+                dropping.join()  # the install is about to stage in the same dir
+            return None
+        while job.is_alive():
+            if cancel is not None and cancel.cancelled:
+                self._drop(job, wait=True)
+                raise InstallCancelled("Operation cancelled by user")
+            if progress is not None:
+                progress("Finishing file preparation...", 0.85 * job.fraction)
+            job.join(WAIT_POLL_SECONDS)
+        if job.state != STATE_READY:
+            if job.error:
+                print(f"Warning: Pre-staging failed, copying instead: {job.error}")
+            return None
+        return job.staging_dir
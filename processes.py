@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Process locator
+Finds running VirtuKey instances in three tiers, cheapest first:
+  1. the PID file VirtuKey writes on start (one read + one name check)
+  2. a name-only process scan (never fetches exe paths)
+  3. one tasklist CSV call, parsed with the csv module
+and terminates them all at once, waiting on exit notifications.
+"""
+
+import csv
+import io
+import os
+import select
+import signal
+import sys
+import tempfile
+import time
+
+from shellhost import default_runner
+from tracing import traced
+
+# Try to import psutil, fall back to tasklist if not available
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+IMAGE_NAME = "VirtuKey.exe"
+PID_FILE_NAME = "VirtuKey.pid"
+
+# Where each locate() answer came from
+SOURCE_PID_FILE = "pid-file"
+SOURCE_SCAN = "scan"
+SOURCE_TASKLIST = "tasklist"
+
+
+def default_pid_file():
+    """Mirror AutoHotkey's A_Temp (GetTempPath: TMP, then TEMP)"""
+    temp_dir = os.environ.get("TMP") or os.environ.get("TEMP") or tempfile.gettempdir()
+    return os.path.join(temp_dir, PID_FILE_NAME)
+
+
+def parse_tasklist_csv(output, image_name=IMAGE_NAME):
+    """PIDs of every row in `tasklist /FO CSV` output whose image name matches"""
+    wanted = image_name.casefold()
+    pids = []
+    for row in csv.reader(io.StringIO(output)):
+        # Header row, blank lines and the "INFO: No tasks..." notice all fail here
+        if len(row) < 2 or row[0].casefold() != wanted or not row[1].isdigit():
+            continue
+        pids.append(int(row[1]))
+    return pids
+
+
+def _windows_process_name(pid):
+    import ctypes
+    from ctypes import wintypes
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.QueryFullProcessImageNameW.argtypes = [wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR,
+                                                    ctypes.POINTER(wintypes.DWORD)]
+    kernel32.QueryFullProcessImageNameW.restype = wintypes.BOOL
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    kernel32.CloseHandle.restype = wintypes.BOOL
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return None
+    try:
+        size = wintypes.DWORD(1024)
+        buffer = ctypes.create_unicode_buffer(size.value)
+        if not kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+            return None
+        return os.path.basename(buffer.value)
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def process_name(pid):
+    """Image name of a PID, or None if it doesn't exist or can't be queried"""
+    if PSUTIL_AVAILABLE:
+        try:
+            return psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError):
+            return None
+    if sys.platform == "win32":
+        try:
+            return _windows_process_name(pid)
+        except Exception:
+            return None
+    try:
+        with open(f"/proc/{pid}/comm", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class ProcessLocator:
+    """Locate VirtuKey instances; process_iter, run and name_of are injectable for tests
+
+    run(args) starts a program and returns a shellhost.CommandResult
+    (CommandRunner.run by default).
+    """
+
+    def __init__(self, image_name=IMAGE_NAME, pid_file=None, process_iter=None, run=None, name_of=None):
+        self.image_name = image_name
+        self.pid_file = pid_file or default_pid_file()
+        self.process_iter = process_iter
+        if self.process_iter is None and PSUTIL_AVAILABLE:
+            self.process_iter = psutil.process_iter
+        self.run = run or default_runner().run
+        self.name_of = name_of or process_name
+
+    def _matches(self, name):
+        return bool(name) and name.casefold() == self.image_name.casefold()
+
+    @traced("locate_pid_file")
+    def from_pid_file(self):
+        """Tier 1: PID recorded by VirtuKey, verified against the image name (PID reuse)"""
+        try:
+            with open(self.pid_file, "r", encoding="utf-8-sig") as f:
+                text = f.read().strip()
+        except OSError:
+            return None
+        if not text.isdigit():
+            return None
+        pid = int(text)
+        return pid if self._matches(self.name_of(pid)) else None
+
+    @traced("locate_scan")
+    def scan(self):
+        """Tier 2: every matching PID, fetching only process names"""
+        pids = []
+        for proc in self.process_iter(['name']):
+            try:
+                if self._matches(proc.info['name']):
+                    pids.append(proc.pid)
+            except Exception:
+                continue  # NoSuchProcess / AccessDenied for this entry only
+        return pids
+
+    @traced("locate_tasklist")
+    def tasklist(self):
+        """Tier 3: every matching PID from a single tasklist call"""
+        result = self.run(['tasklist', '/FI', f'IMAGENAME eq {self.image_name}', '/FO', 'CSV', '/NH']).check()
+        return parse_tasklist_csv(result.stdout, self.image_name)
+
+    def find_all(self):
+        """Every running instance, ignoring the PID file; returns (pids, source)"""
+        if self.process_iter is not None:
+            try:
+                return self.scan(), SOURCE_SCAN
+            except Exception:
+                pass
+        try:
+            return self.tasklist(), SOURCE_TASKLIST
+        except Exception:
+            return [], SOURCE_TASKLIST
+
+    def locate(self):
+        """Fastest answer to "is VirtuKey running?"; returns (pids, source)"""
+        pid = self.from_pid_file()
+        if pid is not None:
+            return [pid], SOURCE_PID_FILE
+        return self.find_all()
+
+    def is_running(self):
+        """(True, pid) for the first instance found, else (False, None)"""
+        pids, _ = self.locate()
+        if pids:
+            return True, pids[0]
+        return False, None
+
+
+# --- Termination -------------------------------------------------------------
+
+DEFAULT_GRACE = 5.0       # seconds every instance shares to exit after the polite request
+DEFAULT_KILL_GRACE = 2.0  # seconds for the force-killed stragglers
+
+
+class TerminationResult:
+    """Outcome of terminate_processes"""
+
+    def __init__(self):
+        self.exited = []     # left on the polite request
+        self.killed = []     # needed a force kill
+        self.survivors = []  # still running after both deadlines
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return not self.survivors
+
+    def __repr__(self):
+        return (f"TerminationResult(exited={self.exited}, killed={self.killed}, "
+                f"survivors={self.survivors}, elapsed={self.elapsed:.3f})")
+
+
+@traced("terminate_processes")
+def terminate_processes(pids, timeout=DEFAULT_GRACE, kill_timeout=DEFAULT_KILL_GRACE):
+    """Ask every PID to exit at once, wait on exit notifications, kill only stragglers
+
+    All processes share one deadline, so N instances cost as long as the
+    slowest one takes to exit rather than N polling loops.
+    """
+    start = time.perf_counter()
+    pids = sorted(set(pids))
+    if not pids:
+        result = TerminationResult()
+    elif PSUTIL_AVAILABLE:
+        result = _terminate_psutil(pids, timeout, kill_timeout)
+    elif sys.platform == "win32":
+        result = _terminate_windows(pids, timeout, kill_timeout)
+    else:
+        result = _terminate_posix(pids, timeout, kill_timeout)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _terminate_psutil(pids, timeout, kill_timeout):
+    result = TerminationResult()
+    procs = []
+    for pid in pids:
+        try:
+            proc = psutil.Process(pid)
+            proc.terminate()
+            procs.append(proc)
+        except psutil.NoSuchProcess:
+            result.exited.append(pid)
+        except psutil.AccessDenied:
+            result.survivors.append(pid)
+
+    gone, alive = psutil.wait_procs(procs, timeout=timeout)
+    result.exited += [p.pid for p in gone]
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied:
+            result.survivors.append(proc.pid)
+    gone, alive = psutil.wait_procs(alive, timeout=kill_timeout)
+    result.killed += [p.pid for p in gone]
+    result.survivors += [p.pid for p in alive if p.pid not in result.survivors]
+    return result
+
+
+def _terminate_windows(pids, timeout, kill_timeout):
+    import ctypes
+    from ctypes import wintypes
+
+    SYNCHRONIZE = 0x00100000
+    PROCESS_TERMINATE = 0x0001
+    WAIT_OBJECT_0 = 0
+    MAXIMUM_WAIT_OBJECTS = 64
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    # Without these, 64-bit handles would be truncated to a C int on the way in or out
+    kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE),
+                                                wintypes.BOOL, wintypes.DWORD]
+    kernel32.WaitForMultipleObjects.restype = wintypes.DWORD
+    kernel32.WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+    kernel32.WaitForSingleObject.restype = wintypes.DWORD
+    kernel32.TerminateProcess.argtypes = [wintypes.HANDLE, wintypes.UINT]
+    kernel32.TerminateProcess.restype = wintypes.BOOL
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    kernel32.CloseHandle.restype = wintypes.BOOL
+
+    result = TerminationResult()
+    # Open handles before signalling so a recycled PID can't be mistaken for ours
+    handles = {}
+    for pid in pids:
+        handle = kernel32.OpenProcess(SYNCHRONIZE | PROCESS_TERMINATE, False, pid)
+        if handle:
+            handles[pid] = handle
+        else:
+            result.exited.append(pid)  # already gone
+
+    def wait_all(waiting, seconds):
+        deadline = time.perf_counter() + seconds
+        items = list(waiting.items())
+        for i in range(0, len(items), MAXIMUM_WAIT_OBJECTS):
+            chunk = items[i:i + MAXIMUM_WAIT_OBJECTS]
+            array = (wintypes.HANDLE * len(chunk))(*[h for _, h in chunk])
+            remaining = max(0, int((deadline - time.perf_counter()) * 1000))
+            kernel32.WaitForMultipleObjects(len(chunk), array, True, remaining)
+        return [pid for pid, h in items if kernel32.WaitForSingleObject(h, 0) == WAIT_OBJECT_0]
+
+    try:
+        if handles:
+            # One taskkill for every instance; it posts WM_CLOSE so VirtuKey exits cleanly
+            args = ['taskkill']
+            for pid in handles:
+                args += ['/PID', str(pid)]
+            # Its exit status only says whether every PID was still there; the wait below decides
+            default_runner().run(args)
+
+            exited = wait_all(handles, timeout)
+            result.exited += exited
+            alive = {pid: h for pid, h in handles.items() if pid not in exited}
+            for handle in alive.values():
+                kernel32.TerminateProcess(handle, 1)
+            killed = wait_all(alive, kill_timeout) if alive else []
+            result.killed += killed
+            result.survivors += [pid for pid in alive if pid not in killed]
+    finally:
+        for handle in handles.values():
+            kernel32.CloseHandle(handle)
+    return result
+
+
+def _terminate_posix(pids, timeout, kill_timeout):
+    result = TerminationResult()
+    # pidfds (Linux 5.3+) give exit notifications; open them before signalling
+    pidfds = {}
+    for pid in pids:
+        try:
+            pidfds[pid] = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+        except ProcessLookupError:
+            result.exited.append(pid)
+        except OSError:
+            pidfds[pid] = None
+
+    try:
+        waiting = list(pidfds)
+        for pid in waiting:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        exited = _wait_posix(waiting, pidfds, timeout)
+        result.exited += exited
+        alive = [pid for pid in waiting if pid not in exited]
+        for pid in alive:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        killed = _wait_posix(alive, pidfds, kill_timeout) if alive else []
+        result.killed += killed
+        result.survivors += [pid for pid in alive if pid not in killed]
+    finally:
+        for fd in pidfds.values():
+            if fd is not None:
+                os.close(fd)
+    return result
+
+
+def _posix_exited(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def _wait_posix(pids, pidfds, seconds):
+    deadline = time.perf_counter() + seconds
+    pending = set(pids)
+    exited = []
+    delay = 0.001
+    while pending:
+        fds = {pidfds[pid]: pid for pid in pending if pidfds.get(pid) is not None}
+        for pid in [pid for pid in pending if pidfds.get(pid) is None]:
+            if _posix_exited(pid):
+                pending.discard(pid)
+                exited.append(pid)
+        remaining = deadline - time.perf_counter()
+        if not pending or remaining <= 0:
+            break
+        if fds and len(fds) == len(pending):
+            ready, _, _ = select.select(list(fds), [], [], remaining)
+            for fd in ready:
+                pending.discard(fds[fd])
+                exited.append(fds[fd])
+        else:
+            # No pidfd support for some PIDs: short, backed-off liveness checks
+            ready, _, _ = select.select(list(fds), [], [], min(delay, remaining))
+            for fd in ready:
+                pending.discard(fds[fd])
+                exited.append(fds[fd])
+            delay = min(delay * 2, 0.05)
+    return exited
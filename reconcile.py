@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Delta reconciliation
+Compares the payload against an existing install and plans the smallest set
+of copies and deletions that makes them identical.
+"""
+
+import hashlib
+import mmap
+import os
+from pathlib import Path
+
+from bundle import BundleEntry, as_source, copy_source_stat
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 8 * 1024 * 1024  # larger files are hashed straight from a memory map
+
+
+def file_sha256(path):
+    """Streaming SHA-256 of a file, as hex"""
+    if isinstance(path, BundleEntry):
+        return path.sha256  # recorded when the bundle was built
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            # No read() copies: the hash reads the page cache directly
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def same_content(source, dest):
+    """Do source and dest hold the same bytes? Stops reading at the first difference"""
+    with as_source(source).open('rb') as a, open(dest, 'rb') as b:
+        while True:
+            chunk = a.read(HASH_CHUNK_SIZE)
+            if chunk != b.read(HASH_CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+def scan_tree(root):
+    """Map relative POSIX path -> absolute Path for every file under root"""
+    root = Path(root)
+    files = {}
+    if not root.is_dir():
+        return files
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = Path(dirpath) / name
+            files[path.relative_to(root).as_posix()] = path
+    return files
+
+
+class SyncPlan:
+    """Result of plan_sync: what to copy, what to delete, what is already right"""
+
+    def __init__(self, install_dir):
+        self.install_dir = Path(install_dir)
+        self.copy = []        # (source, dest) pairs
+        self.delete = []      # orphaned installed files
+        self.unchanged = []   # relative names left untouched
+        self.touch = []       # (source, dest) identical content, metadata to refresh
+        self.hashed = 0       # files whose content had to be hashed
+
+    @property
+    def is_noop(self):
+        return not self.copy and not self.delete and not self.touch
+
+    def summary(self):
+        return (f"{len(self.copy)} to copy, {len(self.delete)} to delete, "
+                f"{len(self.unchanged) + len(self.touch)} unchanged")
+
+
+def plan_sync(sources, install_dir, keep=(), hash_func=file_sha256, known_digest=None):
+    """Plan how to turn install_dir into an exact copy of sources
+
+    sources maps relative name -> source path or BundleEntry. Files are considered equal when
+    size and mtime match (copy2 preserves mtime), which keeps a no-op check to
+    one stat per file. Equal sizes with different mtimes fall back to the
+    content: the source is hashed with hash_func (a VerifyCache.digest keeps
+    that hash for the copy to verify against) and compared with the installed
+    file's hash from known_digest, or byte by byte when that is unknown, so a
+    changed file is not hashed on both sides. Installed files not in sources
+    are orphans, except names in keep.
+    """
+    plan = SyncPlan(install_dir)
+    installed = scan_tree(install_dir)
+
+    for name, source in sorted(sources.items()):
+        source = as_source(source)
+        dest = plan.install_dir / name
+        if name not in installed:
+            plan.copy.append((source, dest))
+            continue
+
+        src_stat = source.stat()
+        dst_stat = os.stat(dest)
+        if src_stat.st_size != dst_stat.st_size:
+            plan.copy.append((source, dest))
+        elif src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+            plan.unchanged.append(name)
+        else:
+            plan.hashed += 1
+            sha256 = hash_func(source)
+            known = known_digest(dest) if known_digest is not None else None
+            if known is not None:
+                same = sha256 == known
+            else:
+                same = same_content(source, dest)
+            if same:
+                plan.touch.append((source, dest))
+            else:
+                plan.copy.append((source, dest))
+
+    keep = set(keep)
+    for name, path in sorted(installed.items()):
+        if name not in sources and name not in keep:
+            plan.delete.append(path)
+
+    return plan
+
+
+def apply_sync(plan, engine):
+    """Carry out a SyncPlan: copy through engine, refresh metadata, drop orphans"""
+    if plan.copy:
+        engine.copy(plan.copy)
+
+    # Same bytes, different timestamps: align them so the next check is stat-only
+    for source, dest in plan.touch:
+        copy_source_stat(source, dest)
+
+    for path in plan.delete:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    # Remove directories the deletions left empty, deepest first
+    parents = sorted({p.parent for p in plan.delete}, key=lambda p: len(p.parts), reverse=True)
+    for directory in parents:
+        while directory != plan.install_dir and plan.install_dir in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
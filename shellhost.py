@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Command runner
+Every external command the installer runs goes through one CommandRunner,
+which times it and records its exit status:
+
+  - programs (tasklist, taskkill) are started directly, one process each
+  - scripts (the PowerShell shortcut fallback) go to a long-lived shell
+    host that reads them from stdin, so they share one process instead of
+    each paying a PowerShell start-up; several can be sent as one batch
+
+The host protocol is one line per script: the script is run with its
+output captured, then a marker line carrying a per-host token, a sequence
+number and the exit status is written, and the runner reads up to it.
+
+    SHELL_POWERSHELL   powershell -NoProfile -NonInteractive -Command -
+    SHELL_SH           sh; a stand-in with the same protocol, so the host
+                       can be exercised on Linux without PowerShell
+"""
+
+import atexit
+import os
+import queue
+import secrets
+import subprocess
+import threading
+import time
+from base64 import b64encode
+
+from tracing import span
+
+SHELL_POWERSHELL = "powershell"
+SHELL_SH = "sh"
+
+DEFAULT_TIMEOUT = 60.0  # seconds a command may take before its host is killed
+
+# No console window flashes up for hosts started by the GUI
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class CommandError(Exception):
+    """A command could not be started, timed out or exited with an error"""
+
+
+class CommandResult:
+    """Outcome of one command: exit status, output and how long it took"""
+
+    def __init__(self, name, returncode, stdout="", stderr="", elapsed=0.0, timed_out=False, via="process"):
+        self.name = name
+        self.returncode = returncode  # None if it never finished
+        self.stdout = stdout
+        self.stderr = stderr          # empty for host scripts; their stderr is merged into stdout
+        self.elapsed = elapsed
+        self.timed_out = timed_out
+        self.via = via                # "process" or the host's shell
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    def check(self):
+        """Return self, or raise CommandError if the command failed"""
+        if self.timed_out:
+            raise CommandError(f"{self.name} did not finish within its time limit")
+        if self.returncode is None:
+            raise CommandError(f"{self.name} could not be run: {(self.stderr or self.stdout).strip()}")
+        if not self.ok:
+            detail = (self.stderr or self.stdout).strip().splitlines()
+            message = f"{self.name} failed with exit status {self.returncode}"
+            raise CommandError(f"{message}: {detail[-1]}" if detail else message)
+        return self
+
+    def __repr__(self):
+        return f"CommandResult({self.name!r}, {self.returncode!r}, {self.elapsed:.3f}s, via={self.via!r})"
+
+
+class CommandMetrics:
+    """Per-command counts, failures and timings, plus how many processes were started"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands = {}  # name -> {"count", "failures", "total", "max"}
+        self.spawns = 0
+
+    def spawned(self):
+        with self._lock:
+            self.spawns += 1
+
+    def record(self, result):
+        with self._lock:
+            stats = self.commands.setdefault(result.name, {"count": 0, "failures": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["failures"] += 0 if result.ok else 1
+            stats["total"] += result.elapsed
+            stats["max"] = max(stats["max"], result.elapsed)
+
+    def to_dict(self):
+        with self._lock:
+            return {"spawns": self.spawns,
+                    "commands": {name: {**stats, "total": round(stats["total"], 6), "max": round(stats["max"], 6)}
+                                 for name, stats in self.commands.items()}}
+
+    def summary(self):
+        data = self.to_dict()
+        lines = [f"{data['spawns']} process(es) started"]
+        for name, stats in sorted(data["commands"].items()):
+            lines.append(f"{name:<24} {stats['count']:>5}x  {stats['failures']:>3} failed  "
+                         f"{stats['total'] / stats['count'] * 1000:8.1f} ms avg  {stats['max'] * 1000:8.1f} ms max")
+        return "\n".join(lines)
+
+
+def _sh_quote(text):
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+class ShellDialect:
+    """How to start one kind of shell host and frame a script for it"""
+
+    def __init__(self, name, argv, setup, frame):
+        self.name = name
+        self.argv = argv
+        self.setup = setup  # lines sent once after start-up
+        self.frame = frame  # frame(script, marker) -> one line for the host's stdin
+
+
+def _frame_powershell(script, marker):
+    # -Command - runs stdin line by line, so the script travels as one base64 literal
+    encoded = b64encode(script.encode("utf-8")).decode("ascii")
+    return ("$global:LASTEXITCODE = 0; $__vkc = 0; "
+            "try { $__vko = & ([ScriptBlock]::Create([Text.Encoding]::UTF8.GetString("
+            f"[Convert]::FromBase64String('{encoded}')))) 2>&1 | Out-String -Width 4096; "
+            "if ($LASTEXITCODE) { $__vkc = $LASTEXITCODE } } "
+            "catch { $__vko = $_ | Out-String; $__vkc = 1 }; "
+            "[Console]::Out.Write($__vko); [Console]::Out.WriteLine(''); "
+            f"[Console]::Out.WriteLine('{marker}' + $__vkc); [Console]::Out.Flush()")
+
+
+def _frame_sh(script, marker):
+    # A subshell, so "exit" in a script ends only that script; stdin stays with the host
+    return f"( eval {_sh_quote(script)} ) </dev/null 2>&1; printf '\\n%s%d\\n' '{marker}' $?"
+
+
+DIALECTS = {
+    SHELL_POWERSHELL: ShellDialect(
+        SHELL_POWERSHELL,
+        ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", "-"],
+        ["$ErrorActionPreference = 'Stop'; $ProgressPreference = 'SilentlyContinue'; "
+         "[Console]::OutputEncoding = [Text.Encoding]::UTF8"],
+        _frame_powershell),
+    SHELL_SH: ShellDialect(SHELL_SH, ["sh"], [], _frame_sh),
+}
+
+
+class ShellHost:
+    """One long-lived shell process running scripts sent over its stdin, one at a time"""
+
+    def __init__(self, dialect, metrics=None):
+        self.dialect = DIALECTS[dialect] if isinstance(dialect, str) else dialect
+        self.metrics = metrics or CommandMetrics()
+        self._lock = threading.Lock()
+        self._proc = None
+        self._lines = None
+        self._token = None
+        self._seq = 0
+
+    @property
+    def running(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self):
+        with span("shell_host_start", shell=self.dialect.name):
+            try:
+                self._proc = subprocess.Popen(self.dialect.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                              stderr=subprocess.STDOUT, text=True, encoding="utf-8",
+                                              errors="replace", bufsize=1, creationflags=CREATE_NO_WINDOW)
+            except OSError as e:
+                raise CommandError(f"Could not start {self.dialect.name}: {e}")
+        self.metrics.spawned()
+        self._token = secrets.token_hex(8)
+        self._seq = 0
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc.stdout, self._lines),
+                         name="VirtuKeyShellHost", daemon=True).start()
+        for line in self.dialect.setup:
+            self._proc.stdin.write(line + "\n")
+
+    @staticmethod
+    def _pump(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)  # the host exited
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def run(self, script, name="script", timeout=DEFAULT_TIMEOUT):
+        return self.batch([(name, script)], timeout)[0]
+
+    def batch(self, scripts, timeout=DEFAULT_TIMEOUT):
+        """Run (name, script) pairs in order in one round trip; returns a CommandResult for each
+
+        timeout covers the whole batch. If it runs out, or the host dies,
+        the unfinished scripts come back as failed and the host is
+        restarted for the next call.
+        """
+        with self._lock:
+            if not self.running:
+                self._stop()
+                self._start()
+            markers = []
+            framed = []
+            for _, script in scripts:
+                self._seq += 1
+                marker = f"<<vk-{self._token}-{self._seq}>>"
+                markers.append(marker)
+                framed.append(self.dialect.frame(script, marker))
+            start = time.perf_counter()
+            deadline = start + timeout
+            results = []
+            try:
+                self._proc.stdin.write("\n".join(framed) + "\n")
+                self._proc.stdin.flush()
+            except OSError:
+                pass  # the host died; reading below finds out
+            last = start
+            for (name, _), marker in zip(scripts, markers):
+                code, output, timed_out = self._read_until(marker, deadline)
+                now = time.perf_counter()
+                # The host runs one script at a time, so each took from the previous marker to its own
+                result = CommandResult(name, code, output, elapsed=now - last, timed_out=timed_out,
+                                       via=self.dialect.name)
+                last = now
+                results.append(result)
+                if code is None:
+                    self._stop()
+                    results += [CommandResult(n, None, via=self.dialect.name, timed_out=timed_out)
+                                for n, _ in scripts[len(results):]]
+                    break
+            return results
+
+    def _read_until(self, marker, deadline):
+        """(exit status, output, timed out) of the script ending at marker"""
+        output = []
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0)) if remaining > 0 else self._lines.get_nowait()
+            except queue.Empty:
+                return None, "".join(output), True
+            if line is None:
+                return None, "".join(output), False
+            if line.startswith(marker):
+                text = "".join(output)
+                # The frame puts a line break before the marker; it isn't the script's output
+                if text.endswith("\n"):
+                    text = text[:-1]
+                code = line[len(marker):].strip()
+                return (int(code) if code.lstrip("-").isdigit() else 1), text, False
+            output.append(line)
+
+
+class CommandRunner:
+    """Runs programs and scripts, keeping one shell host per shell and metrics for all of them"""
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics or CommandMetrics()
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, shell):
+        with self._lock:
+            if shell not in self.hosts:
+                self.hosts[shell] = ShellHost(shell, self.metrics)
+            return self.hosts[shell]
+
+    def run(self, args, timeout=DEFAULT_TIMEOUT):
+        """Start a program and wait for it; returns a CommandResult"""
+        name = os.path.basename(str(args[0]))
+        with span("command", program=name) as s:
+            start = time.perf_counter()
+            try:
+                self.metrics.spawned()
+                proc = subprocess.run(args, capture_output=True, text=True, errors="replace", timeout=timeout,
+                                      creationflags=CREATE_NO_WINDOW)
+                result = CommandResult(name, proc.returncode, proc.stdout, proc.stderr)
+            except subprocess.TimeoutExpired as e:
+                result = CommandResult(name, None, e.stdout or "", e.stderr or "", timed_out=True)
+            except OSError as e:
+                result = CommandResult(name, None, stderr=str(e))
+            result.elapsed = time.perf_counter() - start
+            s.set(exit=result.returncode)
+        self.metrics.record(result)
+        return result
+
+    def script(self, script, name="script", shell=SHELL_POWERSHELL, timeout=DEFAULT_TIMEOUT):
+        """Run a script in the shell's host; returns a CommandResult"""
+        return self.batch([(name, script)], shell, timeout)[0]
+
+    def batch(self, scripts, shell=SHELL_POWERSHELL, timeout=DEFAULT_TIMEOUT):
+        """Run (name, script) pairs in one round trip to the shell's host"""
+        with span("command_batch", shell=shell, commands=len(scripts)) as s:
+            try:
+                results = self.host(shell).batch(scripts, timeout)
+            except CommandError as e:
+                results = [CommandResult(name, None, stderr=str(e), via=shell) for name, _ in scripts]
+            s.set(failed=sum(1 for r in results if not r.ok))
+        for result in results:
+            self.metrics.record(result)
+        return results
+
+    def close(self):
+        with self._lock:
+            hosts = list(self.hosts.values())
+            self.hosts = {}
+        for host in hosts:
+            host.close()
+
+
+_default_runner = None
+_default_lock = threading.Lock()
+
+
+def default_runner():
+    """The process-wide runner; its hosts are closed when the interpreter exits"""
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = CommandRunner()
+            atexit.register(_default_runner.close)
+        return _default_runner
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Shell Link (.lnk) writer and reader
+Builds MS-SHLLINK binaries in-process so shortcuts don't need a PowerShell
+spawn each. Pure byte generation, so it runs (and round-trips) on any OS.
+"""
+
+import os
+import struct
+
+# ShellLinkHeader constants
+HEADER_SIZE = 0x4C
+LINK_CLSID = bytes.fromhex("0114020000000000c000000000000046")  # 00021401-0000-0000-C000-000000000046
+
+# LinkFlags
+HAS_LINK_TARGET_ID_LIST = 0x00000001
+HAS_LINK_INFO = 0x00000002
+HAS_NAME = 0x00000004
+HAS_RELATIVE_PATH = 0x00000008
+HAS_WORKING_DIR = 0x00000010
+HAS_ARGUMENTS = 0x00000020
+HAS_ICON_LOCATION = 0x00000040
+IS_UNICODE = 0x00000080
+
+# LinkInfo / VolumeID constants
+VOLUME_ID_AND_LOCAL_BASE_PATH = 0x00000001
+LINK_INFO_HEADER_SIZE_UNICODE = 0x24
+DRIVE_FIXED = 3
+
+FILE_ATTRIBUTE_NORMAL = 0x00000080
+SW_SHOWNORMAL = 1
+SW_SHOWMINNOACTIVE = 7
+
+# Seconds between 1601-01-01 and 1970-01-01, in 100 ns ticks
+FILETIME_EPOCH_OFFSET = 116444736000000000
+
+
+class ShellLinkError(Exception):
+    """Raised when a shortcut cannot be represented or parsed natively"""
+
+
+def _filetime(timestamp):
+    if not timestamp:
+        return 0
+    return int(timestamp * 10_000_000) + FILETIME_EPOCH_OFFSET
+
+
+def _ansi(text):
+    # LinkInfo always carries an ANSI copy; Windows prefers the Unicode one we also write
+    return text.encode("cp1252", errors="replace") + b"\0"
+
+
+def _utf16z(text):
+    return text.encode("utf-16-le") + b"\0\0"
+
+
+def _string_data(text):
+    encoded = text.encode("utf-16-le")
+    count = len(encoded) // 2
+    if count > 0xFFFF:
+        raise ShellLinkError("String too long for a shell link")
+    return struct.pack("<H", count) + encoded
+
+
+def _is_local_absolute(path):
+    return len(path) >= 3 and path[1] == ":" and path[2] == "\\" and path[0].isalpha()
+
+
+class ShellLink:
+    """In-memory description of a .lnk file"""
+
+    def __init__(self, target, arguments="", working_dir="", description="",
+                 icon_location="", icon_index=0, show_command=SW_SHOWNORMAL,
+                 file_size=0, creation_time=0, access_time=0, write_time=0,
+                 file_attributes=FILE_ATTRIBUTE_NORMAL):
+        self.target = str(target)
+        self.arguments = arguments
+        self.working_dir = str(working_dir) if working_dir else ""
+        self.description = description
+        self.icon_location = str(icon_location) if icon_location else ""
+        self.icon_index = icon_index
+        self.show_command = show_command
+        self.file_size = file_size
+        self.creation_time = creation_time
+        self.access_time = access_time
+        self.write_time = write_time
+        self.file_attributes = file_attributes
+
+    def __eq__(self, other):
+        if not isinstance(other, ShellLink):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def __repr__(self):
+        return f"ShellLink({self.target!r}, arguments={self.arguments!r})"
+
+    def to_bytes(self):
+        """Serialize to MS-SHLLINK bytes"""
+        if not _is_local_absolute(self.target):
+            raise ShellLinkError(f"Target must be an absolute local path: {self.target}")
+
+        flags = HAS_LINK_INFO | IS_UNICODE
+        strings = []
+        # StringData order is fixed by the spec
+        for flag, value in ((HAS_NAME, self.description),
+                            (HAS_WORKING_DIR, self.working_dir),
+                            (HAS_ARGUMENTS, self.arguments),
+                            (HAS_ICON_LOCATION, self.icon_location)):
+            if value:
+                flags |= flag
+                strings.append(_string_data(value))
+
+        header = struct.pack(
+            "<I16sIIQQQIiIHHII",
+            HEADER_SIZE, LINK_CLSID, flags, self.file_attributes,
+            _filetime(self.creation_time), _filetime(self.access_time), _filetime(self.write_time),
+            self.file_size & 0xFFFFFFFF, self.icon_index, self.show_command,
+            0, 0, 0, 0)
+
+        return header + self._link_info() + b"".join(strings) + b"\0\0\0\0"
+
+    def _link_info(self):
+        volume_id = struct.pack("<IIII", 0x11, DRIVE_FIXED, 0, 0x10) + b"\0"
+        base_ansi = _ansi(self.target)
+        suffix_ansi = b"\0"
+        base_unicode = _utf16z(self.target)
+        suffix_unicode = b"\0\0"
+
+        volume_offset = LINK_INFO_HEADER_SIZE_UNICODE
+        base_offset = volume_offset + len(volume_id)
+        suffix_offset = base_offset + len(base_ansi)
+        base_unicode_offset = suffix_offset + len(suffix_ansi)
+        suffix_unicode_offset = base_unicode_offset + len(base_unicode)
+        size = suffix_unicode_offset + len(suffix_unicode)
+
+        return struct.pack(
+            "<IIIIIIIII", size, LINK_INFO_HEADER_SIZE_UNICODE, VOLUME_ID_AND_LOCAL_BASE_PATH,
+            volume_offset, base_offset, 0, suffix_offset,
+            base_unicode_offset, suffix_unicode_offset
+        ) + volume_id + base_ansi + suffix_ansi + base_unicode + suffix_unicode
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Parse MS-SHLLINK bytes; only the fields this installer writes are kept"""
+        try:
+            (header_size, clsid, flags, attributes, ctime, atime, wtime, file_size,
+             icon_index, show_command) = struct.unpack_from("<I16sIIQQQIiI", data, 0)
+        except struct.error:
+            raise ShellLinkError("Truncated shell link header")
+        if header_size != HEADER_SIZE or clsid != LINK_CLSID:
+            raise ShellLinkError("Not a shell link file")
+
+        offset = HEADER_SIZE
+        try:
+            if flags & HAS_LINK_TARGET_ID_LIST:
+                (id_list_size,) = struct.unpack_from("<H", data, offset)
+                offset += 2 + id_list_size
+
+            target = ""
+            if flags & HAS_LINK_INFO:
+                target = _parse_link_info(data, offset)
+                (link_info_size,) = struct.unpack_from("<I", data, offset)
+                offset += link_info_size
+
+            unicode = bool(flags & IS_UNICODE)
+            values = {}
+            for flag in (HAS_NAME, HAS_RELATIVE_PATH, HAS_WORKING_DIR, HAS_ARGUMENTS, HAS_ICON_LOCATION):
+                if flags & flag:
+                    (count,) = struct.unpack_from("<H", data, offset)
+                    offset += 2
+                    width = 2 if unicode else 1
+                    raw = data[offset:offset + count * width]
+                    if len(raw) != count * width:
+                        raise ShellLinkError("Truncated string data")
+                    values[flag] = raw.decode("utf-16-le" if unicode else "cp1252")
+                    offset += count * width
+        except struct.error:
+            raise ShellLinkError("Truncated shell link")
+
+        if not target and HAS_RELATIVE_PATH in values:
+            target = values[HAS_RELATIVE_PATH]
+
+        def from_filetime(value):
+            return (value - FILETIME_EPOCH_OFFSET) / 10_000_000 if value else 0
+
+        return cls(target,
+                   arguments=values.get(HAS_ARGUMENTS, ""),
+                   working_dir=values.get(HAS_WORKING_DIR, ""),
+                   description=values.get(HAS_NAME, ""),
+                   icon_location=values.get(HAS_ICON_LOCATION, ""),
+                   icon_index=icon_index,
+                   show_command=show_command,
+                   file_size=file_size,
+                   creation_time=from_filetime(ctime),
+                   access_time=from_filetime(atime),
+                   write_time=from_filetime(wtime),
+                   file_attributes=attributes)
+
+
+def _parse_link_info(data, offset):
+    (size, header_size, info_flags, _, base_offset, _, suffix_offset) = struct.unpack_from("<IIIIIII", data, offset)
+    if not info_flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+        return ""
+
+    if header_size >= LINK_INFO_HEADER_SIZE_UNICODE:
+        base_unicode_offset, suffix_unicode_offset = struct.unpack_from("<II", data, offset + 28)
+        if base_unicode_offset:
+            return _read_utf16z(data, offset + base_unicode_offset) + _read_utf16z(data, offset + suffix_unicode_offset)
+
+    return _read_ansiz(data, offset + base_offset) + _read_ansiz(data, offset + suffix_offset)
+
+
+def _read_ansiz(data, offset):
+    end = data.index(b"\0", offset)
+    return data[offset:end].decode("cp1252", errors="replace")
+
+
+def _read_utf16z(data, offset):
+    end = offset
+    while data[end:end + 2] != b"\0\0":
+        end += 2
+        if end >= len(data):
+            raise ShellLinkError("Unterminated string in link info")
+    return data[offset:end].decode("utf-16-le")
+
+
+def shortcut_for(target, arguments="", working_dir="", description="", icon_location="", icon_index=0):
+    """Build a ShellLink, filling size/times/attributes from the target file when it exists"""
+    link = ShellLink(target, arguments, working_dir, description, icon_location, icon_index)
+    try:
+        st = os.stat(target)
+    except OSError:
+        return link
+    link.file_size = st.st_size
+    link.creation_time = getattr(st, "st_birthtime", st.st_ctime)
+    link.access_time = st.st_atime
+    link.write_time = st.st_mtime
+    link.file_attributes = getattr(st, "st_file_attributes", FILE_ATTRIBUTE_NORMAL) or FILE_ATTRIBUTE_NORMAL
+    return link
+
+
+def write_shortcut(path, link):
+    """Write a ShellLink to path, replacing any existing file atomically"""
+    data = link.to_bytes()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_shortcut(path):
+    """Read a .lnk file into a ShellLink"""
+    with open(path, "rb") as f:
+        return ShellLink.from_bytes(f.read())
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Staged reinstall
+Builds the new version in a hidden sibling of the install directory,
+verifies it there, then switches over with two directory renames. The old
+install stays untouched (and usable) until the switch, so a failed or
+cancelled reinstall leaves it exactly as it was.
+"""
+
+import os
+import shutil
+import stat
+import threading
+import time
+from pathlib import Path
+
+from bundle import as_source
+from reconcile import plan_sync, file_sha256
+from tracing import span
+
+STAGING_SUFFIX = ".staging"
+RETIRED_SUFFIX = ".old"
+TOMBSTONE_SUFFIX = ".deleted"
+RENAME_ATTEMPTS = 10
+RENAME_RETRY_DELAY = 0.05  # virus scanners and indexers briefly hold new files open
+
+
+def staging_paths(install_dir):
+    """(staging dir, retired dir): hidden siblings on the same volume, so renames stay atomic"""
+    install_dir = Path(install_dir)
+    tag = f"{os.getpid()}"
+    staging = install_dir.with_name(f".{install_dir.name}{STAGING_SUFFIX}-{tag}")
+    retired = install_dir.with_name(f".{install_dir.name}{RETIRED_SUFFIX}-{tag}")
+    return staging, retired
+
+
+def leftover_dirs(install_dir):
+    """Staging, retired and tombstone directories abandoned by earlier runs"""
+    install_dir = Path(install_dir)
+    parent = install_dir.parent
+    if not parent.is_dir():
+        return []
+    prefixes = tuple(f".{install_dir.name}{suffix}-" for suffix in
+                     (STAGING_SUFFIX, RETIRED_SUFFIX, TOMBSTONE_SUFFIX))
+    return [parent / name for name in os.listdir(parent)
+            if name.startswith(prefixes) and (parent / name).is_dir()]
+
+
+def remove_file(path):
+    """Delete a file even if it is read-only (a hard link into the shared store)"""
+    try:
+        os.unlink(path)
+    except PermissionError:
+        os.chmod(path, os.stat(path).st_mode | stat.S_IWUSR)
+        os.unlink(path)
+
+
+def remove_tree(path, ignore_errors=False):
+    """shutil.rmtree that also removes read-only files (hard links into the shared store)"""
+    def retry_writable(func, failed, exc_info):
+        try:
+            if not issubclass(exc_info[0], PermissionError):
+                raise exc_info[1]
+            os.chmod(failed, os.stat(failed).st_mode | stat.S_IWUSR)
+            func(failed)
+        except OSError:
+            if not ignore_errors:
+                raise
+
+    shutil.rmtree(path, onerror=retry_writable)
+
+
+def discard_tree(path):
+    """Best-effort removal of a staging or retired tree"""
+    try:
+        remove_tree(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Warning: Could not remove {path}: {e}")
+
+
+def build_staging(sources, install_dir, staging_dir, engine, hash_func=file_sha256, patcher=None, known_digest=None):
+    """Fill staging_dir with the payload; returns the (source, staged) pairs that were copied
+
+    Files the current install already has byte-for-byte are hard-linked from
+    it instead of copied, so an unchanged payload stages in milliseconds.
+    hash_func and known_digest are handed to plan_sync (e.g. VerifyCache.digest
+    and VerifyCache.lookup). Changed
+    files that patcher(name, source, installed, staged) can produce from the
+    installed build are patched instead of copied (see install_core.make_patcher).
+    """
+    install_dir = Path(install_dir)
+    staging_dir = Path(staging_dir)
+    discard_tree(staging_dir)
+    staging_dir.mkdir(parents=True)
+
+    plan = plan_sync(sources, install_dir, hash_func=hash_func, known_digest=known_digest)
+    reusable = list(plan.unchanged) + [dest.relative_to(install_dir).as_posix() for _, dest in plan.touch]
+    copies = []
+    for source, dest in plan.copy:
+        name = dest.relative_to(install_dir).as_posix()
+        staged = staging_dir / name
+        if patcher is not None:
+            staged.parent.mkdir(parents=True, exist_ok=True)
+            if patcher(name, source, dest, staged):
+                continue
+        copies.append((source, staged))
+
+    for name in reusable:
+        staged = staging_dir / name
+        staged.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(install_dir / name, staged)
+        except OSError:
+            copies.append((as_source(sources[name]), staged))  # no hard links on this volume
+
+    if copies:
+        engine.copy(copies)
+    return copies
+
+
+def verify_staging(copied, digests=None, expected=None):
+    """Check every copied file against its source; raises on the first mismatch
+
+    digests are the copy engine's hashes of the staged files (dest Path ->
+    SHA-256) and expected(source) a known source hash or None. When both
+    are known they are compared without reading anything; otherwise the
+    staged copy and, if needed, the source are hashed here, and the staged
+    copy's hash is added to digests so the cache can keep it.
+    """
+    for source, staged in copied:
+        source = as_source(source)
+        staged = Path(staged)
+        if source.stat().st_size != os.path.getsize(staged):
+            raise Exception(f"Staged copy of {source.name} has the wrong size")
+        digest = digests.get(staged) if digests is not None else None
+        known = expected(source) if expected is not None else None
+        if digest is None:
+            digest = file_sha256(staged)
+            if digests is not None:
+                digests[staged] = digest
+        if known is None:
+            known = file_sha256(source)
+        if known != digest:
+            raise Exception(f"Staged copy of {source.name} does not match the payload")
+
+
+def _rename(source, dest):
+    for attempt in range(RENAME_ATTEMPTS):
+        try:
+            os.rename(source, dest)
+            return
+        except PermissionError:
+            if attempt == RENAME_ATTEMPTS - 1:
+                raise
+            time.sleep(RENAME_RETRY_DELAY)
+
+
+def swap_directories(staging_dir, install_dir, retired_dir):
+    """Make staging_dir the install; returns the retired old tree, or None if there was none
+
+    Two renames: install -> retired, staging -> install. If the second one
+    fails the first is undone, so the old install is never lost.
+    """
+    install_dir = Path(install_dir)
+    if not install_dir.exists():
+        _rename(staging_dir, install_dir)
+        return None
+
+    try:
+        _rename(install_dir, retired_dir)
+    except PermissionError:
+        raise Exception("The installed files are in use. Please close VirtuKey and try again.")
+    try:
+        _rename(staging_dir, install_dir)
+    except OSError:
+        _rename(retired_dir, install_dir)
+        raise
+    return Path(retired_dir)
+
+
+def adopt_staging(staging_dir, install_dir):
+    """Move a finished staging dir into place for a fresh install
+
+    One rename when the install folder doesn't exist yet; otherwise each
+    staged file is renamed into it, leaving anything else there alone.
+    """
+    staging_dir = Path(staging_dir)
+    install_dir = Path(install_dir)
+    if not install_dir.exists():
+        install_dir.parent.mkdir(parents=True, exist_ok=True)
+        _rename(staging_dir, install_dir)
+        return
+    for dirpath, _, filenames in os.walk(staging_dir):
+        for name in filenames:
+            staged = Path(dirpath) / name
+            dest = install_dir / staged.relative_to(staging_dir)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staged, dest)
+    discard_tree(staging_dir)
+
+
+def entomb(path):
+    """Rename path to a tombstone beside it; returns the tombstone
+
+    The rename is atomic and takes the same time for any tree size, so the
+    install is gone at once and the actual deletion can happen later.
+    """
+    path = Path(path)
+    tombstone = path.with_name(f".{path.name}{TOMBSTONE_SUFFIX}-{os.getpid()}-{time.time_ns()}")
+    _rename(path, tombstone)
+    return tombstone
+
+
+def delete_tombstones(paths):
+    """Delete tombstones; whatever can't be removed now is retried on the next run"""
+    for path in paths:
+        with span("delete_tombstone", path=path):
+            # Another installer may be deleting the same tree; missing files are fine
+            remove_tree(path, ignore_errors=True)
+
+
+def delete_in_background(paths, then=None):
+    """Delete tombstones on a background thread and return it
+
+    Not a daemon: a finished installer process waits for the deletion
+    before it exits, after its window or JSON result is already out.
+    then() runs on the same thread once the tombstones are gone.
+    """
+    def run():
+        delete_tombstones(paths)
+        if then is not None:
+            then()
+
+    paths = list(paths)
+    thread = threading.Thread(target=run, name="VirtuKeyTombstoneDelete")
+    thread.start()
+    return thread
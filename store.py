@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Shared content store
+An optional machine-wide store for terminal servers and other multi-user
+machines. Each payload file is kept once, under its SHA-256, and every
+per-user install hard-links to it instead of holding its own copy, so the
+second and later users cost a few metadata operations instead of a
+payload copy.
+
+    %ProgramData%\\VirtuKey\\store\\
+        objects\\ab\\ab12...    one file per content hash
+        refs.json             install path -> hashes it links to
+        verify-cache.json     source and object hashes (see verify_cache.py)
+        store.lock            held while links and refs.json change
+
+Objects are read-only: every install shares their bytes, so nothing may
+write through one of its links. An object is deleted once no install refers
+to it and no other hard link to it is left. Several installer processes
+(e.g. a fleet deployment) can use the store at once; changes to refs.json
+happen under a lock file.
+"""
+
+import json
+import os
+import stat
+import threading
+import time
+from pathlib import Path
+
+from bundle import BundleEntry, as_source
+from staging import remove_file
+from tracing import span
+from verify_cache import VerifyCache
+
+STORE_VERSION = 1
+STORE_DIR_NAME = "store"
+LOCK_TIMEOUT = 30.0      # seconds to wait for another process
+LOCK_HEARTBEAT = 5.0     # the holder refreshes the lock file's mtime this often
+LOCK_STALE_AFTER = 30.0  # no refresh for this long: the holder died
+LOCK_POLL = 0.05
+
+STRATEGY_HARDLINK = "hardlink"
+
+
+def default_store_dir():
+    """%ProgramData%\\VirtuKey\\store"""
+    base = os.environ.get("PROGRAMDATA") or os.environ.get("ALLUSERSPROFILE")
+    if base:
+        return Path(base) / "VirtuKey" / STORE_DIR_NAME
+    return Path.home() / ".virtukey" / STORE_DIR_NAME
+
+
+def _holder_key(install_path):
+    return os.path.normcase(os.path.abspath(str(install_path)))
+
+
+def _protect(path):
+    """Make an object read-only (FILE_ATTRIBUTE_READONLY on Windows)"""
+    mode = os.stat(path).st_mode
+    if mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+        os.chmod(path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+class StoreLock:
+    """Cross-process lock: an exclusively created file, removed on release
+
+    While held, a heartbeat thread keeps the file's mtime fresh, so a lock
+    is only broken once its holder has stopped running, however long it
+    holds on.
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.released = threading.Event()
+        self.heartbeat = None
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode("ascii"))
+                os.close(fd)
+                self.released.clear()
+                self.heartbeat = threading.Thread(target=self._beat, name="VirtuKeyStoreLock", daemon=True)
+                self.heartbeat.start()
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(self.path).st_mtime > LOCK_STALE_AFTER:
+                        os.unlink(self.path)
+                        continue
+                except OSError:
+                    continue  # released in between
+            if time.monotonic() > deadline:
+                raise Exception(f"The shared store is busy ({self.path} is held by another installer).")
+            time.sleep(LOCK_POLL)
+
+    def _beat(self):
+        while not self.released.wait(LOCK_HEARTBEAT):
+            try:
+                os.utime(self.path)
+            except OSError:
+                pass
+
+    def __exit__(self, *exc):
+        self.released.set()
+        self.heartbeat.join()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class ContentStore:
+    """Objects addressed by SHA-256 plus the installs that link to them"""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else default_store_dir()
+        self.objects_dir = self.root / "objects"
+        self.refs_path = self.root / "refs.json"
+        self.cache = VerifyCache(self.root / "verify-cache.json")
+        self.cache_loaded = False
+
+    def object_path(self, sha256):
+        return self.objects_dir / sha256[:2] / sha256
+
+    def lock(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        return StoreLock(self.root / "store.lock")
+
+    def load_refs(self):
+        """install key -> list of hashes; missing or unreadable means none"""
+        try:
+            with open(self.refs_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == STORE_VERSION:
+                return {k: list(v) for k, v in data.get("installs", {}).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+        return {}
+
+    def save_refs(self, refs):
+        tmp_path = self.refs_path.with_name(self.refs_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "installs": refs}, f, indent=1)
+        os.replace(tmp_path, self.refs_path)
+
+    def load_cache(self):
+        if not self.cache_loaded:
+            self.cache = VerifyCache.load(self.root / "verify-cache.json")
+            self.cache_loaded = True
+        return self.cache
+
+    def save_cache(self):
+        try:
+            if self.cache.dirty:
+                self.cache.save()
+        except OSError as e:
+            print(f"Warning: Could not save the shared store's verification cache: {e}")
+
+    def has(self, sha256):
+        """Is the object present and, as far as stat can tell, unmodified?"""
+        path = self.object_path(sha256)
+        if not path.is_file():
+            return False
+        return self.load_cache().digest(path) == sha256
+
+    def add(self, source, sha256, engine):
+        """Copy source into the store as the object for sha256"""
+        path = self.object_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{sha256}.{os.getpid()}.tmp")
+        engine.copy([(source, tmp_path)])
+        digest = engine.digests.get(tmp_path)
+        if digest is not None and digest != sha256:
+            os.unlink(tmp_path)
+            raise Exception(f"{as_source(source).name} changed while it was added to the shared store")
+        _protect(tmp_path)
+        # Replacing a damaged object leaves existing links on the old inode, untouched
+        try:
+            os.replace(tmp_path, path)
+        except PermissionError:
+            remove_file(path)  # Windows won't replace a read-only file
+            os.replace(tmp_path, path)
+        self.load_cache().store(path, sha256)
+        return path
+
+    def retain(self, install_path, hashes):
+        """Record that install_path now links to exactly these objects; collects what it dropped"""
+        with self.lock():
+            refs = self.load_refs()
+            dropped = set(refs.get(_holder_key(install_path), [])) - set(hashes)
+            refs[_holder_key(install_path)] = sorted(set(hashes))
+            self.save_refs(refs)
+            self._collect(refs, dropped)
+
+    def release(self, install_path):
+        """Forget install_path's references and collect objects nobody uses any more
+
+        When the last install is released the store's own files go too, and
+        the store folder with them if nothing else is left in it.
+        """
+        with self.lock():
+            refs = self.load_refs()
+            dropped = set(refs.pop(_holder_key(install_path), []))
+            self.save_refs(refs)
+            self._collect(refs, dropped)
+            if refs:
+                return
+            emptied = self._remove_state()
+        if emptied:
+            # After the lock file is gone; rmdir refuses if anything appeared meanwhile
+            folders = [self.root] + ([self.root.parent] if self.root == default_store_dir() else [])
+            for folder in folders:
+                try:
+                    folder.rmdir()
+                except OSError:
+                    break
+
+    def _remove_state(self):
+        """Delete refs.json, the verification cache and empty object folders; True if no object is left"""
+        if self.objects_dir.is_dir():
+            for folder in self.objects_dir.iterdir():
+                try:
+                    folder.rmdir()
+                except OSError:
+                    pass
+            try:
+                self.objects_dir.rmdir()
+            except OSError:
+                return False  # objects still linked from somewhere stay, and so does their bookkeeping
+        for path in (self.refs_path, self.cache.path):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self.cache.entries = {}
+        self.cache.dirty = False
+        return True
+
+    def collect(self):
+        """Delete every unreferenced object that has no other links"""
+        with self.lock():
+            refs = self.load_refs()
+            candidates = set()
+            if self.objects_dir.is_dir():
+                for folder in self.objects_dir.iterdir():
+                    if folder.is_dir():
+                        candidates.update(p.name for p in folder.iterdir() if not p.name.endswith(".tmp"))
+            return self._collect(refs, candidates)
+
+    def _collect(self, refs, candidates):
+        used = set()
+        for hashes in refs.values():
+            used.update(hashes)
+        removed = []
+        with span("store_collect", candidates=len(candidates)) as s:
+            # Deleting a read-only link on Windows clears the attribute for every link; restore it
+            for sha256 in candidates & used:
+                try:
+                    _protect(self.object_path(sha256))
+                except OSError:
+                    pass
+            for sha256 in candidates - used:
+                path = self.object_path(sha256)
+                try:
+                    # A link the refs don't know about (e.g. a tombstone still being deleted) keeps it
+                    if os.stat(path).st_nlink > 1:
+                        _protect(path)
+                        continue
+                    remove_file(path)
+                    removed.append(sha256)
+                except OSError:
+                    continue
+                try:
+                    path.parent.rmdir()
+                except OSError:
+                    pass
+            s.set(removed=len(removed))
+        return removed
+
+    def drop_damaged(self, install_dir, files):
+        """Delete the objects that damaged files (name -> expected SHA-256) in install_dir link to
+
+        A hard-linked file shares its content with the object, so damage to
+        one is damage to the other; without the object the next add copies
+        a good one. Returns the names whose object was dropped.
+        """
+        dropped = []
+        with self.lock():
+            for name, sha256 in files.items():
+                path = self.object_path(sha256)
+                try:
+                    if os.path.samestat(os.stat(Path(install_dir) / name), os.stat(path)):
+                        remove_file(path)
+                        dropped.append(name)
+                except OSError:
+                    pass
+        return dropped
+
+    def linked_hashes(self, install_dir, files):
+        """Which of files (name -> SHA-256) in install_dir are hard links into the store"""
+        hashes = []
+        for name, sha256 in files.items():
+            try:
+                if os.path.samestat(os.stat(Path(install_dir) / name), os.stat(self.object_path(sha256))):
+                    hashes.append(sha256)
+            except OSError:
+                pass
+        return hashes
+
+
+class StoreCopier:
+    """Stands in for a CopyEngine: places files as hard links into the shared store
+
+    Objects missing from the store are added through engine first, so only
+    the first install on a machine copies data. Where a link can't be made
+    (another volume, a filesystem without hard links) the file is copied
+    from the store instead.
+    """
+
+    def __init__(self, store, engine, hash_func):
+        self.store = store
+        self.engine = engine
+        self.hash_func = hash_func  # source hashes, e.g. the store's VerifyCache.digest
+        # The engine verifies only files whose hash it can look up; the store's cache knows
+        # every source hashed above and every object, so adds and fallback copies are checked
+        known = engine.known_digest
+        store_cache = store.load_cache()
+        engine.known_digest = lambda source: (known(source) if known else None) or store_cache.lookup(source)
+        self.completed = []
+        self.digests = {}
+        self.used = {}
+
+    @property
+    def on_progress(self):
+        return self.engine.on_progress
+
+    @on_progress.setter
+    def on_progress(self, callback):
+        self.engine.on_progress = callback  # only adding objects takes long enough to report
+
+    def copy(self, pairs):
+        self.completed = []
+        self.digests = {}
+        self.used = {}
+        pairs = [(as_source(source), Path(dest)) for source, dest in pairs]
+        hashes = {}
+        with span("store_hash", files=len(pairs)):
+            for source, dest in pairs:
+                hashes[dest] = source.sha256 if isinstance(source, BundleEntry) else self.hash_func(source)
+
+        with span("store_add") as s:
+            added = 0
+            for source, dest in pairs:
+                if not self.store.has(hashes[dest]):
+                    self.store.add(source, hashes[dest], self.engine)
+                    added += 1
+            s.set(added=added)
+
+        fallback = []
+        # Under the lock, so a collection in another process can't remove an object before it's linked
+        with self.store.lock(), span("store_link", files=len(pairs)):
+            for source, dest in pairs:
+                path = self.store.object_path(hashes[dest])
+                if not path.is_file():
+                    self.store.add(source, hashes[dest], self.engine)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = dest.with_name(dest.name + ".linking")
+                try:
+                    _protect(path)
+                    if os.path.lexists(tmp_path):
+                        remove_file(tmp_path)
+                    os.link(path, tmp_path)
+                    try:
+                        os.replace(tmp_path, dest)
+                    except PermissionError:
+                        remove_file(dest)  # a read-only link from an earlier install
+                        os.replace(tmp_path, dest)
+                except OSError as e:
+                    if not fallback:
+                        print(f"Warning: Could not link to the shared store, copying instead: {e}")
+                    fallback.append((path, dest))
+                    continue
+                self.completed.append(dest)
+                self.digests[dest] = hashes[dest]
+                self.used[dest] = STRATEGY_HARDLINK
+        if fallback:
+            self.engine.copy(fallback)
+            self.completed += self.engine.completed
+            self.digests.update(self.engine.digests)
+            self.used.update(self.engine.used)
+        self.store.save_cache()
+
+    def strategy_counts(self):
+        counts = {}
+        for strategy in self.used.values():
+            counts[strategy] = counts.get(strategy, 0) + 1
+        return counts
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Step graph
+Runs the steps of an install or uninstall as a small dependency graph on a
+thread pool: a step starts as soon as the steps it depends on have
+finished, so independent ones (the shortcuts, the Run-key value, the
+payload copy) overlap and the wall time approaches the longest chain
+instead of the sum of all steps.
+
+Every step gets its own result. A failed critical step stops the graph:
+nothing new is started, running steps are waited for, and the undo
+callbacks of finished steps run in reverse order before its exception is
+raised again. A failed non-critical step becomes a warning and only skips
+the steps that depend on it.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from tracing import span
+
+# Step outcomes
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"  # a step it depends on failed, or the graph was stopped first
+
+
+class StepResult:
+    """Outcome of one step: status, return value or exception, and how long it ran"""
+
+    def __init__(self, name):
+        self.name = name
+        self.status = STATUS_PENDING
+        self.value = None
+        self.error = None
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return self.status == STATUS_DONE
+
+    def __repr__(self):
+        return f"StepResult({self.name!r}, {self.status!r})"
+
+
+class Step:
+    """A node of the graph; see TaskGraph.add"""
+
+    def __init__(self, name, func, deps, critical, warning, undo):
+        self.name = name
+        self.func = func
+        self.deps = deps
+        self.critical = critical
+        self.warning = warning
+        self.undo = undo
+
+
+def _timed(func):
+    start = time.perf_counter()
+    try:
+        return func(), None, time.perf_counter() - start
+    except BaseException as e:
+        return None, e, time.perf_counter() - start
+
+
+class TaskGraph:
+    """Install steps and the steps each one waits for"""
+
+    def __init__(self, max_workers=None):
+        self.steps = {}  # name -> Step, in the order added
+        self.results = {}
+        self.max_workers = max_workers
+
+    def add(self, name, func, deps=(), critical=True, warning=None, undo=None):
+        """Add step name running func(); deps must name steps added earlier
+
+        warning is the message printed (with the error) when a non-critical
+        step fails. undo(value) reverts a finished step if a critical one
+        fails later.
+        """
+        if name in self.steps:
+            raise ValueError(f"step {name!r} is already in the graph")
+        for dep in deps:
+            if dep not in self.steps:
+                raise ValueError(f"step {name!r} depends on unknown step {dep!r}")
+        self.steps[name] = Step(name, func, tuple(deps), critical, warning, undo)
+        self.results[name] = StepResult(name)
+        return self
+
+    def value(self, name, default=None):
+        """What step name returned, or default if it didn't finish"""
+        result = self.results.get(name)
+        return result.value if result is not None and result.ok else default
+
+    def errors(self):
+        """name -> exception for every step that failed"""
+        return {name: r.error for name, r in self.results.items() if r.status == STATUS_FAILED}
+
+    def _ready(self, name):
+        """True when every dependency is done; None when one of them can no longer finish"""
+        statuses = [self.results[dep].status for dep in self.steps[name].deps]
+        if any(s in (STATUS_FAILED, STATUS_SKIPPED) for s in statuses):
+            return None
+        return all(s == STATUS_DONE for s in statuses)
+
+    def run(self, cancel=None):
+        """Run every step; returns the results (name -> StepResult)
+
+        cancel.check() runs before each step starts and once more after the
+        last one, and stops the graph like a failed critical step does.
+        """
+        waiting = list(self.steps)
+        running = {}  # future -> step name
+        finished = []
+        failure = None
+        workers = self.max_workers or max(len(self.steps), 1)
+        with span("task_graph", steps=len(self.steps)) as s, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="VirtuKeyStep") as pool:
+            while waiting or running:
+                if failure is None:
+                    for name in list(waiting):
+                        ready = self._ready(name)
+                        if ready is None:
+                            self.results[name].status = STATUS_SKIPPED
+                            waiting.remove(name)
+                        elif ready:
+                            try:
+                                if cancel is not None:
+                                    cancel.check()
+                            except BaseException as e:
+                                failure = e
+                                break
+                            waiting.remove(name)
+                            running[pool.submit(_timed, self._traced(name))] = name
+                if failure is not None:
+                    for name in waiting:
+                        self.results[name].status = STATUS_SKIPPED
+                    waiting = []
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    step = self.steps[name]
+                    result = self.results[name]
+                    result.value, result.error, result.elapsed = future.result()
+                    if result.error is None:
+                        result.status = STATUS_DONE
+                        finished.append(name)
+                        continue
+                    result.status = STATUS_FAILED
+                    if step.critical or not isinstance(result.error, Exception):
+                        failure = failure or result.error
+                    elif step.warning:
+                        print(f"Warning: {step.warning}: {result.error}")
+
+            if failure is None and cancel is not None:
+                try:
+                    cancel.check()
+                except BaseException as e:
+                    failure = e
+            s.set(failed=sorted(self.errors()))
+
+        if failure is not None:
+            self._undo(finished)
+            raise failure
+        return self.results
+
+    def _traced(self, name):
+        func = self.steps[name].func
+
+        def run():
+            with span(name):
+                return func()
+        return run
+
+    def _undo(self, finished):
+        for name in reversed(finished):
+            step = self.steps[name]
+            if step.undo is None:
+                continue
+            try:
+                step.undo(self.results[name].value)
+            except Exception as e:
+                print(f"Warning: Could not undo {name}: {e}")
@@ -0,0 +1,109 @@
+"""Payload bundles: building, reading back and refusing damaged data"""
+
+import hashlib
+import os
+
+import pytest
+
+from bundle import METHOD_STORED, METHOD_ZLIB, TRAILER, Bundle, BundleError, build_bundle
+
+
+@pytest.fixture
+def payload(tmp_path):
+    files = {
+        "VirtuKey.exe": os.urandom(300 * 1024),              # incompressible: stored
+        "Icon.png": b"",
+        "docs/readme.txt": b"VirtuKey virtual desktops\n" * 5000,  # compresses: zlib
+    }
+    paths = {}
+    for name, data in files.items():
+        path = tmp_path / "payload" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        paths[name] = path
+    return files, paths
+
+
+def test_round_trip(tmp_path, payload):
+    files, paths = payload
+    build_bundle(paths, tmp_path / "payload.vkb")
+    bundle = Bundle.open(tmp_path / "payload.vkb")
+
+    assert sorted(bundle.names()) == sorted(files)
+    assert bundle.entry("VirtuKey.exe").method == METHOD_STORED
+    assert bundle.entry("docs/readme.txt").method == METHOD_ZLIB
+    for name, data in files.items():
+        entry = bundle.entry(name)
+        assert entry.size == len(data)
+        assert entry.sha256 == hashlib.sha256(data).hexdigest()
+        assert entry.stat().st_mtime_ns == paths[name].stat().st_mtime_ns
+        with entry.open() as f:
+            assert f.read() == data
+        dest = tmp_path / "out" / name.replace("/", "_")
+        dest.parent.mkdir(exist_ok=True)
+        assert bundle.extract(name, dest) == entry.sha256
+        assert dest.read_bytes() == data
+
+
+def test_appended_to_executable(tmp_path, payload):
+    files, paths = payload
+    exe = tmp_path / "setup.exe"
+    stub = b"MZ" + os.urandom(10000)
+    exe.write_bytes(stub)
+    build_bundle(paths, exe, append=True)
+
+    bundle = Bundle.open(exe)
+    assert bundle.start == len(stub)
+    with bundle.entry("docs/readme.txt").open() as f:
+        assert f.read() == files["docs/readme.txt"]
+    assert exe.read_bytes()[:len(stub)] == stub
+
+
+def test_missing_entry(tmp_path, payload):
+    build_bundle(payload[1], tmp_path / "payload.vkb")
+    with pytest.raises(BundleError):
+        Bundle.open(tmp_path / "payload.vkb").entry("missing.dll")
+
+
+@pytest.mark.parametrize("name", ["VirtuKey.exe", "docs/readme.txt"])
+def test_corrupted_entry_fails_extract(tmp_path, payload, name):
+    build_bundle(payload[1], tmp_path / "payload.vkb")
+    entry = Bundle.open(tmp_path / "payload.vkb").entry(name)
+    data = bytearray((tmp_path / "payload.vkb").read_bytes())
+    data[entry.offset + entry.length // 2] ^= 0xFF
+    (tmp_path / "payload.vkb").write_bytes(bytes(data))
+
+    dest = tmp_path / "extracted"
+    with pytest.raises(BundleError):
+        Bundle.open(tmp_path / "payload.vkb").extract(name, dest)
+    assert not dest.exists()
+
+
+def test_no_bundle(tmp_path):
+    (tmp_path / "plain.exe").write_bytes(b"MZ" + os.urandom(1000))
+    (tmp_path / "tiny").write_bytes(b"MZ")
+    for path in (tmp_path / "plain.exe", tmp_path / "tiny", tmp_path / "missing"):
+        with pytest.raises(BundleError):
+            Bundle.open(path)
+
+
+def test_damaged_trailer_and_index(tmp_path, payload):
+    build_bundle(payload[1], tmp_path / "payload.vkb")
+    good = (tmp_path / "payload.vkb").read_bytes()
+    magic, bundle_size, index_size = TRAILER.unpack(good[-TRAILER.size:])
+
+    oversized = good[:-TRAILER.size] + TRAILER.pack(magic, len(good) + 1, index_size)
+    index_start = len(good) - TRAILER.size - index_size
+    garbled = good[:index_start] + b"{" * index_size + good[-TRAILER.size:]
+    for data in (oversized, garbled):
+        (tmp_path / "payload.vkb").write_bytes(data)
+        with pytest.raises(BundleError):
+            Bundle.open(tmp_path / "payload.vkb")
+
+
+def test_truncated_bundle(tmp_path, payload):
+    build_bundle(payload[1], tmp_path / "payload.vkb")
+    data = (tmp_path / "payload.vkb").read_bytes()
+    (tmp_path / "payload.vkb").write_bytes(data[:len(data) // 2] + data[-TRAILER.size:])
+    with pytest.raises(BundleError):
+        Bundle.open(tmp_path / "payload.vkb")
@@ -0,0 +1,94 @@
+"""Install manifest: records survive a save and load, and damage reads as empty"""
+
+import hashlib
+import os
+
+from manifest import InstallManifest, InstallRecord, manifest_path
+
+
+def _install(tmp_path, files):
+    install_dir = tmp_path / "VirtuKey"
+    install_dir.mkdir()
+    for name, data in files.items():
+        (install_dir / name).write_bytes(data)
+    return install_dir
+
+
+def test_capture_hashes_files(tmp_path):
+    files = {"VirtuKey.exe": b"exe", "Icon.png": b"png"}
+    install_dir = _install(tmp_path, files)
+    record = InstallRecord.capture(install_dir, files, shortcuts=[tmp_path / "VirtuKey.lnk"])
+
+    for name, data in files.items():
+        info = record.files[name]
+        assert info["sha256"] == hashlib.sha256(data).hexdigest()
+        assert info["size"] == len(data)
+        assert info["mtime_ns"] == (install_dir / name).stat().st_mtime_ns
+    assert record.shortcuts == [str(tmp_path / "VirtuKey.lnk")]
+
+
+def test_capture_reuses_unchanged_hashes(tmp_path):
+    install_dir = _install(tmp_path, {"a.bin": b"one", "b.bin": b"two"})
+    previous = InstallRecord.capture(install_dir, ["a.bin", "b.bin"])
+    (install_dir / "b.bin").write_bytes(b"three")
+    os.utime(install_dir / "b.bin", ns=(1, 1))
+
+    hashed = []
+
+    def hash_func(path):
+        hashed.append(path.name)
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    record = InstallRecord.capture(install_dir, ["a.bin", "b.bin"], previous=previous, hash_func=hash_func)
+    assert hashed == ["b.bin"]
+    assert record.files["a.bin"] == previous.files["a.bin"]
+    assert record.files["b.bin"]["sha256"] == hashlib.sha256(b"three").hexdigest()
+
+
+def test_save_and_load(tmp_path):
+    path = manifest_path(tmp_path)
+    manifest = InstallManifest(path)
+    older = InstallRecord(tmp_path / "old", {"a.bin": {"size": 1, "mtime_ns": 2, "sha256": "00"}},
+                          registry=[{"hive": "HKCU", "key": "Run", "name": "VirtuKey", "value": "x"}],
+                          installed_at=100.0)
+    newer = InstallRecord(tmp_path / "new", installed_at=200.0, store=str(tmp_path / "store"))
+    manifest.put(older)
+    manifest.put(newer)
+    manifest.tombstones.append(str(tmp_path / ".VirtuKey.deleted-1"))
+    manifest.save()
+
+    loaded = InstallManifest.load(path)
+    assert set(loaded.records) == set(manifest.records)
+    assert loaded.get(tmp_path / "old").to_dict() == older.to_dict()
+    assert loaded.current().install_path == str(tmp_path / "new")
+    assert loaded.current().store == str(tmp_path / "store")
+    assert loaded.tombstones == manifest.tombstones
+
+    # The same place spelled differently is the same record
+    assert loaded.get(str(tmp_path / "old" / ".." / "old")) is not None
+    assert loaded.remove(tmp_path / "old").install_path == str(tmp_path / "old")
+    assert loaded.get(tmp_path / "old") is None
+
+
+def test_saving_nothing_removes_the_file(tmp_path):
+    path = manifest_path(tmp_path)
+    manifest = InstallManifest(path)
+    manifest.put(InstallRecord(tmp_path / "VirtuKey"))
+    manifest.save()
+    assert path.exists()
+
+    manifest.remove(tmp_path / "VirtuKey")
+    manifest.save()
+    assert not path.exists()
+
+
+def test_damaged_manifest_reads_as_empty(tmp_path):
+    path = manifest_path(tmp_path)
+    path.parent.mkdir(parents=True)
+    for text in ("", "{not json", '{"version": 99, "installs": [{"install_path": "x"}]}',
+                 '{"version": 1, "installs": [{"files": {}}]}', "[]"):
+        path.write_text(text, encoding="utf-8")
+        manifest = InstallManifest.load(path)
+        assert manifest.records == {}
+        assert manifest.current() is None
+    assert InstallManifest.load(tmp_path / "missing.json").records == {}
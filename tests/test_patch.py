@@ -0,0 +1,79 @@
+"""Binary patches: bsdiff round trips and the .vkpatch header checks"""
+
+import hashlib
+import os
+import random
+
+import pytest
+
+from patch import (PatchError, apply_bsdiff, apply_patch, make_bsdiff, make_patch, read_header)
+
+
+def _upgrade(old, seed=1):
+    """A new build: old with some bytes changed, a block inserted and a tail dropped"""
+    rng = random.Random(seed)
+    new = bytearray(old)
+    for _ in range(50):
+        new[rng.randrange(len(new))] = rng.randrange(256)
+    middle = len(new) // 2
+    new[middle:middle] = os.urandom(3000)
+    return bytes(new[:-1000])
+
+
+@pytest.mark.parametrize("old, new", [
+    (b"", b""),
+    (b"", b"brand new file"),
+    (b"old contents", b""),
+    (b"same bytes" * 100, b"same bytes" * 100),
+])
+def test_bsdiff_round_trip_edge_cases(old, new):
+    assert apply_bsdiff(old, make_bsdiff(old, new)) == new
+
+
+def test_bsdiff_round_trip_upgrade():
+    old = os.urandom(200 * 1024)
+    new = _upgrade(old)
+    patch = make_bsdiff(old, new)
+    assert apply_bsdiff(old, patch) == new
+    assert len(patch) < len(new) // 4  # mostly unchanged, so the patch is small
+
+
+def test_patch_file_round_trip(tmp_path):
+    old = os.urandom(64 * 1024)
+    new = _upgrade(old, seed=2)
+    (tmp_path / "old.bin").write_bytes(old)
+    (tmp_path / "new.bin").write_bytes(new)
+    make_patch(tmp_path / "old.bin", tmp_path / "new.bin", tmp_path / "new.vkpatch")
+
+    header = read_header(tmp_path / "new.vkpatch")
+    assert header.source_sha256 == hashlib.sha256(old).hexdigest()
+    assert header.target_sha256 == hashlib.sha256(new).hexdigest()
+    assert header.target_size == len(new)
+
+    sha256 = apply_patch(tmp_path / "new.vkpatch", tmp_path / "old.bin", tmp_path / "out.bin")
+    assert (tmp_path / "out.bin").read_bytes() == new
+    assert sha256 == header.target_sha256
+
+
+def test_patch_rejects_other_source(tmp_path):
+    (tmp_path / "old.bin").write_bytes(b"version one" * 100)
+    (tmp_path / "new.bin").write_bytes(b"version two" * 100)
+    (tmp_path / "other.bin").write_bytes(b"version zero" * 100)
+    make_patch(tmp_path / "old.bin", tmp_path / "new.bin", tmp_path / "new.vkpatch")
+
+    with pytest.raises(PatchError):
+        apply_patch(tmp_path / "new.vkpatch", tmp_path / "other.bin", tmp_path / "out.bin")
+    assert not (tmp_path / "out.bin").exists()
+
+
+def test_damaged_patch_is_rejected(tmp_path):
+    (tmp_path / "old.bin").write_bytes(os.urandom(4096))
+    (tmp_path / "new.bin").write_bytes(os.urandom(4096))
+    make_patch(tmp_path / "old.bin", tmp_path / "new.bin", tmp_path / "new.vkpatch")
+    data = bytearray((tmp_path / "new.vkpatch").read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    (tmp_path / "new.vkpatch").write_bytes(bytes(data))
+
+    with pytest.raises(PatchError):
+        apply_patch(tmp_path / "new.vkpatch", tmp_path / "old.bin", tmp_path / "out.bin")
+    assert not (tmp_path / "out.bin").exists()
@@ -0,0 +1,91 @@
+"""Delta reconciliation: what plan_sync decides to copy, touch and delete"""
+
+import hashlib
+import os
+
+from copy_engine import CopyEngine
+from reconcile import apply_sync, file_sha256, plan_sync, same_content, scan_tree
+
+
+def _write(path, data, mtime_ns=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def _tree(tmp_path):
+    """A payload and an install that differs from it in every way plan_sync knows about"""
+    src = tmp_path / "payload"
+    dst = tmp_path / "install"
+    sources = {
+        "same.bin": _write(src / "same.bin", b"unchanged", 1_000_000_000),
+        "touched.bin": _write(src / "touched.bin", b"same bytes", 2_000_000_000),
+        "changed.bin": _write(src / "changed.bin", b"new build!", 3_000_000_000),
+        "resized.bin": _write(src / "resized.bin", b"longer than before", 4_000_000_000),
+        "added/new.bin": _write(src / "added" / "new.bin", b"new file"),
+    }
+    _write(dst / "same.bin", b"unchanged", 1_000_000_000)
+    _write(dst / "touched.bin", b"same bytes", 5_000_000_000)
+    _write(dst / "changed.bin", b"old build!", 5_000_000_000)
+    _write(dst / "resized.bin", b"shorter", 4_000_000_000)
+    _write(dst / "orphans" / "old.dll", b"gone in this version")
+    _write(dst / "settings.ini", b"user settings")
+    return sources, dst
+
+
+def test_plan(tmp_path):
+    sources, dst = _tree(tmp_path)
+    plan = plan_sync(sources, dst, keep=["settings.ini"])
+
+    assert sorted(d.relative_to(dst).as_posix() for _, d in plan.copy) == \
+        ["added/new.bin", "changed.bin", "resized.bin"]
+    assert [d.relative_to(dst).as_posix() for _, d in plan.touch] == ["touched.bin"]
+    assert plan.unchanged == ["same.bin"]
+    assert plan.delete == [dst / "orphans" / "old.dll"]
+    assert plan.hashed == 2  # only the same-size, different-mtime files
+    assert not plan.is_noop
+
+
+def test_known_installed_hash_skips_reading_it(tmp_path):
+    sources, dst = _tree(tmp_path)
+    known = {dst / "touched.bin": file_sha256(sources["touched.bin"]),
+             dst / "changed.bin": file_sha256(sources["changed.bin"])}  # stale: the file was changed
+    plan = plan_sync(sources, dst, keep=["settings.ini"], known_digest=known.get)
+    assert [d.name for _, d in plan.touch] == ["changed.bin", "touched.bin"]
+
+    # Without a cached hash the installed file is compared byte by byte
+    assert [d.name for _, d in plan_sync(sources, dst, keep=["settings.ini"]).touch] == ["touched.bin"]
+
+
+def test_same_content(tmp_path):
+    data = os.urandom(3 * 1024 * 1024)
+    a = _write(tmp_path / "a", data)
+    b = _write(tmp_path / "b", data)
+    c = _write(tmp_path / "c", data[:-1] + bytes([data[-1] ^ 0xFF]))  # differs in the last chunk only
+    assert same_content(a, b)
+    assert not same_content(a, c)
+
+
+def test_apply_makes_an_exact_copy(tmp_path):
+    sources, dst = _tree(tmp_path)
+    plan = plan_sync(sources, dst, keep=["settings.ini"])
+    apply_sync(plan, CopyEngine())
+
+    installed = scan_tree(dst)
+    assert sorted(installed) == sorted(list(sources) + ["settings.ini"])
+    assert not (dst / "orphans").exists()  # emptied by the deletions
+    for name, source in sources.items():
+        assert installed[name].read_bytes() == source.read_bytes()
+        assert installed[name].stat().st_mtime_ns == source.stat().st_mtime_ns
+
+    # Everything lines up now, down to the timestamps
+    again = plan_sync(sources, dst, keep=["settings.ini"])
+    assert again.is_noop
+    assert again.hashed == 0
+
+
+def test_file_sha256_large_file(tmp_path):
+    data = os.urandom(9 * 1024 * 1024)  # above the memory-map threshold
+    assert file_sha256(_write(tmp_path / "big", data)) == hashlib.sha256(data).hexdigest()
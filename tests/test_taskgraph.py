@@ -0,0 +1,123 @@
+"""Step graph: dependency order, failure handling and undo"""
+
+import threading
+import time
+
+import pytest
+
+from taskgraph import STATUS_DONE, STATUS_FAILED, STATUS_SKIPPED, TaskGraph
+
+
+class Recorder:
+    """Steps that log when they start and finish"""
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def step(self, name, delay=0.0, error=None):
+        def run():
+            with self.lock:
+                self.events.append(("start", name))
+            time.sleep(delay)
+            with self.lock:
+                self.events.append(("end", name))
+            if error is not None:
+                raise error
+            return name.upper()
+        return run
+
+    def index(self, kind, name):
+        return self.events.index((kind, name))
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelAfter:
+    """cancel.check() that starts failing once the given steps have run"""
+
+    def __init__(self, recorder, names):
+        self.recorder = recorder
+        self.names = names
+
+    def check(self):
+        if all(("end", name) in self.recorder.events for name in self.names):
+            raise Cancelled()
+
+
+def test_dependencies_run_first():
+    rec = Recorder()
+    graph = TaskGraph()
+    graph.add("dir", rec.step("dir", 0.02))
+    graph.add("copy", rec.step("copy", 0.05), deps=["dir"])
+    graph.add("shortcut", rec.step("shortcut", 0.01), deps=["dir"])
+    graph.add("record", rec.step("record"), deps=["copy", "shortcut"])
+    results = graph.run()
+
+    assert all(r.status == STATUS_DONE for r in results.values())
+    assert rec.index("end", "dir") < rec.index("start", "copy")
+    assert rec.index("end", "dir") < rec.index("start", "shortcut")
+    assert rec.index("end", "copy") < rec.index("start", "record")
+    assert rec.index("end", "shortcut") < rec.index("start", "record")
+    # Independent steps overlap: the shortcut starts while the copy is still running
+    assert rec.index("start", "shortcut") < rec.index("end", "copy")
+    assert graph.value("record") == "RECORD"
+    assert results["copy"].elapsed >= 0.05
+
+
+def test_add_checks_names():
+    graph = TaskGraph().add("a", lambda: None)
+    with pytest.raises(ValueError):
+        graph.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        graph.add("b", lambda: None, deps=["later"])
+
+
+def test_critical_failure_undoes_finished_steps():
+    rec = Recorder()
+    undone = []
+    graph = TaskGraph()
+    graph.add("dir", rec.step("dir"), undo=lambda value: undone.append(("dir", value)))
+    graph.add("registry", rec.step("registry"), deps=["dir"], undo=lambda value: undone.append(("registry", value)))
+    graph.add("copy", rec.step("copy", 0.02, OSError("disk full")), deps=["registry"])
+    graph.add("record", rec.step("record"), deps=["copy"])
+
+    with pytest.raises(OSError, match="disk full"):
+        graph.run()
+    assert undone == [("registry", "REGISTRY"), ("dir", "DIR")]  # newest first
+    assert graph.results["copy"].status == STATUS_FAILED
+    assert graph.results["record"].status == STATUS_SKIPPED
+    assert ("start", "record") not in rec.events
+    assert set(graph.errors()) == {"copy"}
+
+
+def test_noncritical_failure_skips_only_its_dependents(capsys):
+    rec = Recorder()
+    graph = TaskGraph()
+    graph.add("shortcut", rec.step("shortcut", error=OSError("no Desktop")), critical=False,
+              warning="Could not create the desktop shortcut")
+    graph.add("pin", rec.step("pin"), deps=["shortcut"])
+    graph.add("copy", rec.step("copy"))
+    results = graph.run()
+
+    assert results["shortcut"].status == STATUS_FAILED
+    assert results["pin"].status == STATUS_SKIPPED
+    assert results["copy"].status == STATUS_DONE
+    assert graph.value("pin", "default") == "default"
+    assert "Warning: Could not create the desktop shortcut: no Desktop" in capsys.readouterr().out
+
+
+def test_cancel_stops_before_the_next_step():
+    rec = Recorder()
+    undone = []
+    graph = TaskGraph()
+    graph.add("first", rec.step("first"), undo=lambda value: undone.append(value))
+    graph.add("second", rec.step("second"), deps=["first"])
+
+    with pytest.raises(Cancelled):
+        graph.run(cancel=CancelAfter(rec, ["first"]))
+    assert graph.results["second"].status == STATUS_SKIPPED
+    assert ("start", "second") not in rec.events
+    assert undone == ["FIRST"]
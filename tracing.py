@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Phase tracing
+Timing spans around each install phase, kept in a fixed-size ring buffer
+and written as Chrome trace-event JSON (open in chrome://tracing or
+ui.perfetto.dev).
+
+Tracing is off by default; span() then returns a shared no-op context, so
+instrumented code pays one global lookup and a function call per span.
+"""
+
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+DEFAULT_CAPACITY = 65536  # spans kept; the oldest are dropped first
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        tid = threading.get_ident()
+        if tid not in self.tracer.thread_names:
+            self.tracer.thread_names[tid] = threading.current_thread().name
+        self.tracer.events.append((self.name, self.start, end - self.start, tid, self.args))
+        return False
+
+    def set(self, **args):
+        """Attach results discovered inside the span (sizes, counts, PIDs)"""
+        self.args.update(args)
+
+
+class Tracer:
+    """Ring buffer of completed spans: (name, start ns, duration ns, thread id, args)"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        # deque.append is atomic, so worker threads record without a lock
+        self.events = collections.deque(maxlen=capacity)
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def chrome_trace(self):
+        """The buffered spans as a Chrome trace-event document"""
+        pid = os.getpid()
+        events = []
+        for name, start, duration, tid, args in list(self.events):
+            events.append({"name": name, "cat": "installer", "ph": "X", "pid": pid, "tid": tid,
+                           "ts": (start - self.origin) / 1000.0, "dur": duration / 1000.0,
+                           "args": {k: str(v) for k, v in args.items()}})
+        for tid, thread_name in list(self.thread_names.items()):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": thread_name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+_tracer = None
+
+
+def enable(capacity=DEFAULT_CAPACITY):
+    """Start recording spans (replaces any earlier buffer)"""
+    global _tracer
+    _tracer = Tracer(capacity)
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **args):
+    """Context manager timing one phase; a no-op unless tracing is enabled"""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **args)
+
+
+def traced(name):
+    """Decorator form of span() for whole functions"""
+    def wrap(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return wrap
+
+
+def write_trace(path):
+    """Write the recorded spans to path; returns False when tracing is off"""
+    if _tracer is None:
+        return False
+    _tracer.write(path)
+    return True
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+VirtuKey Installer - Verification cache
+Remembers the SHA-256 of files the installer has copied or hashed, keyed by
+(path, size, mtime, inode). A later install, reinstall or repair looks a
+file up with one stat() and only rehashes it if any of those changed.
+Lives next to the install manifest.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from bundle import BundleEntry
+from manifest import manifest_path
+from reconcile import file_sha256
+
+CACHE_VERSION = 1
+CACHE_FILE_NAME = "verify-cache.json"
+MAX_ENTRIES = 10000
+
+
+def cache_path(home=None):
+    """%LOCALAPPDATA%\\VirtuKey Setup\\verify-cache.json (beside the manifest)"""
+    return manifest_path(home).with_name(CACHE_FILE_NAME)
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def _identity(st):
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class VerifyCache:
+    """path -> (size, mtime_ns, inode, sha256) for files whose content is known"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else cache_path()
+        self.entries = {}
+        self.dirty = False  # changed since load/save
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path=None):
+        """Read the cache; a missing or unreadable file is an empty cache"""
+        cache = cls(path)
+        try:
+            with open(cache.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                cache.entries = {k: list(v) for k, v in data.get("files", {}).items() if len(v) == 4}
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+        return cache
+
+    def save(self):
+        """Write atomically, keeping only entries whose file still exists"""
+        entries = {}
+        for key, entry in self.entries.items():
+            try:
+                if _identity(os.stat(key)) == entry[:3]:
+                    entries[key] = entry
+            except OSError:
+                pass
+        if len(entries) > MAX_ENTRIES:
+            entries = dict(list(entries.items())[-MAX_ENTRIES:])
+        self.entries = entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "files": entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def lookup(self, path):
+        """The cached SHA-256 if the file is unchanged since it was recorded, else None"""
+        if isinstance(path, BundleEntry):
+            return path.sha256  # the bundle index already knows
+        entry = self.entries.get(_key(path))
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if _identity(st) != entry[:3]:
+            return None
+        return entry[3]
+
+    def store(self, path, sha256):
+        """Record the content hash of a file as it is right now"""
+        if isinstance(path, BundleEntry):
+            return
+        key = _key(path)
+        # Re-inserting moves the entry to the end, so the oldest are trimmed first
+        self.entries.pop(key, None)
+        self.entries[key] = _identity(os.stat(path)) + [sha256]
+        self.dirty = True
+
+    def digest(self, path):
+        """SHA-256 of path, from the cache when possible; drop-in for reconcile's hash_func"""
+        sha256 = self.lookup(path)
+        if sha256 is not None:
+            self.hits += 1
+            return sha256
+        self.misses += 1
+        sha256 = file_sha256(path)
+        self.store(path, sha256)
+        return sha256
+
+    def record_copies(self, pairs, digests):
+        """Check streamed digests against known source hashes and remember both sides
+
+        pairs are (source, dest); digests maps dest Path -> SHA-256 as copied.
+        Returns the dest paths whose data did not match a cached source hash.
+        """
+        mismatched = []
+        for source, dest in pairs:
+            sha256 = digests.get(Path(dest))
+            if sha256 is None:
+                continue
+            expected = self.lookup(source)
+            if expected is not None and expected != sha256:
+                mismatched.append(Path(dest))
+                continue
+            self.store(source, sha256)
+            self.store(dest, sha256)
+        return mismatched
+
+    def move(self, old_root, new_root):
+        """Re-key entries after old_root was renamed to new_root (inodes and mtimes survive renames)"""
+        old_prefix = _key(old_root) + os.sep
+        new_prefix = _key(new_root) + os.sep
+        for key in [k for k in self.entries if k.startswith(old_prefix)]:
+            self.entries[new_prefix + key[len(old_prefix):]] = self.entries.pop(key)
+            self.dirty = True